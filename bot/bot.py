@@ -20,6 +20,8 @@ try:
     import json
     import logging
     import base64
+    import time
+    import uuid
 
     from io import BytesIO
     from dotenv import load_dotenv
@@ -183,10 +185,26 @@ async def command_start_handler(message: Message) -> None:
 # ------------------------------------------------------------------------------
 @dp.message(F.content_type.in_('sticker'))
 async def handle_sticker(message: types.Message):
+    # Trace - the server measures each stage until the sticker is on the walls
+    trace = {
+        "id": uuid.uuid4().hex,
+        "telegram_at": message.date.timestamp(),  # When Telegram got the message (1s resolution)
+        "bot_received_at": time.time()
+    }
+
     telegram_user_id = message.from_user.id
     telegram_username = message.from_user.username or "No username"
     telegram_full_username = message.from_user.full_name or "No name"
 
+    # Static stickers are webp, animated ones are Lottie (tgs) and video ones are webm
+    # The server transcodes the animated/video ones for the wall
+    if message.sticker.is_animated:
+        file_extension = "tgs"
+    elif message.sticker.is_video:
+        file_extension = "webm"
+    else:
+        file_extension = "webp"
+
     # Get the sticker file
     sticker: File = await bot.get_file(message.sticker.file_id)
     file_url = f"https://api.telegram.org/file/bot{TELEGRAM_TOKEN}/{sticker.file_path}"
@@ -207,10 +225,14 @@ async def handle_sticker(message: types.Message):
                     "telegram_user_id": telegram_user_id,
                     "sticker_id": message.sticker.file_id,
                     "sticker_data": base64_sticker,
-                    "file_extension": "webp"  # Telegram stickers are always webp
+                    "emoji": message.sticker.emoji,
+                    "set_name": message.sticker.set_name,
+                    "file_extension": file_extension,
+                    "trace": trace
                 }
 
                 # Send to WebSocket server
+                trace["bot_sent_at"] = time.time()
                 await send_sticker_to_ws(json.dumps(sticker_message))
                 logger.info(f"Sticker sent to server from user: {telegram_username}")
             else:
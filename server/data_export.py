@@ -0,0 +1,202 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Streaming export of the stickers, users and sticker history
+#
+# Rows are read in batches by id (keyset - WHERE id > last id), each batch
+# with its own short read, so an export of millions of rows uses the memory
+# of one batch and never keeps the database locked while the client reads.
+# Output is CSV or JSON Lines, optionally gzip, produced chunk by chunk.
+# Used by the /api/admin/export endpoints and tools/export.py.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import io
+    import sys
+    import csv
+    import json
+    import zlib
+
+    from datetime import datetime
+    from sqlalchemy import text
+
+    import history_archive
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+EXPORT_BATCH_SIZE:int = 5000
+EXPORT_FORMATS:dict = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# table -> columns (as exported), SELECT, time column of the range filter, datetime columns
+# The history has the same columns as the archive files (history_archive)
+EXPORT_TABLES:dict = {
+    "stickers": {
+        "columns": ("id", "sticker_uuid", "sticker_id", "sticker_path", "created_at", "visible", "banned", "reason",
+                    "boost_factor", "emoji", "set_name"),
+        "select": "SELECT id, sticker_uuid, sticker_id, sticker_path, created_at, visible, banned, reason, "
+                  "       boost_factor, emoji, set_name "
+                  "FROM stickers",
+        "id_column": "id",
+        "time_column": "created_at",
+        "datetimes": ("created_at",),
+        "booleans": ("visible", "banned")
+    },
+    "telegram_users": {
+        "columns": ("id", "userid", "username", "fullusername", "created_at", "last_message", "banned", "reason", "admin"),
+        "select": "SELECT id, userid, username, fullusername, created_at, last_message, banned, reason, admin "
+                  "FROM telegram_users",
+        "id_column": "id",
+        "time_column": "created_at",
+        "datetimes": ("created_at", "last_message"),
+        "booleans": ("banned", "admin")
+    },
+    "telegram_user_stickers": {
+        "columns": ("id", "user_id", "sticker_id", "sent_at", "blocked_by_policy", "telegram_user_id", "telegram_sticker_id"),
+        "select": "SELECT history.id, history.user_id, history.sticker_id, history.sent_at, history.blocked_by_policy, "
+                  "       telegram_users.userid, stickers.sticker_id "
+                  "FROM telegram_user_stickers AS history "
+                  "LEFT JOIN telegram_users ON telegram_users.id = history.user_id "
+                  "LEFT JOIN stickers ON stickers.id = history.sticker_id",
+        "id_column": "history.id",
+        "time_column": "history.sent_at",
+        "datetimes": ("sent_at",),
+        "booleans": ("blocked_by_policy",)
+    }
+}
+
+
+# ------------------------------------------------------------------------------
+def sqlite_datetime(moment: datetime) -> str:
+    # Same text as SQLAlchemy stores in the datetime columns
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+# ------------------------------------------------------------------------------
+def local_datetime(moment: datetime | None) -> datetime | None:
+    # The columns store datetime.now() (local, naive): an aware since/until (...Z, +02:00) is converted
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone().replace(tzinfo=None)
+# ------------------------------------------------------------------------------
+def normalize_row(table: dict, row: dict) -> dict:
+    """Datetimes as ISO text (database and archive rows look the same), flags as booleans"""
+    for column in table["datetimes"]:
+        if isinstance(row[column], str):
+            row[column] = datetime.fromisoformat(row[column]).isoformat()
+    for column in table["booleans"]:
+        if row[column] is not None:
+            row[column] = bool(row[column])
+    return row
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def iter_table_batches(engine, table_name: str, since: datetime | None = None, until: datetime | None = None,
+                       batch_size: int = EXPORT_BATCH_SIZE):
+    """Rows (dicts) of a table by id, a list per batch - since is included, until is not"""
+    table = EXPORT_TABLES[table_name]
+    conditions = [f"{table['id_column']} > :after_id"]
+    params = {"limit": batch_size}
+    if since:
+        conditions.append(f"{table['time_column']} >= :since")
+        params["since"] = sqlite_datetime(since)
+    if until:
+        conditions.append(f"{table['time_column']} < :until")
+        params["until"] = sqlite_datetime(until)
+    query = text(f"{table['select']} WHERE {' AND '.join(conditions)} ORDER BY {table['id_column']} LIMIT :limit")
+
+    after_id = 0
+    while True:
+        with engine.connect() as connection:
+            rows = connection.execute(query, {**params, "after_id": after_id}).all()
+        if not rows:
+            return
+        yield [normalize_row(table, dict(zip(table["columns"], row))) for row in rows]
+        if len(rows) < batch_size:
+            return
+        after_id = rows[-1][0]
+# ------------------------------------------------------------------------------
+def iter_archived_history_batches(engine, archive_directory: str, since: datetime | None = None,
+                                  until: datetime | None = None, batch_size: int = EXPORT_BATCH_SIZE):
+    """
+    Archived history rows in the range, a list per batch. Rows still in the database
+    (archived again after a crash before the delete) are left out - the database has them.
+    """
+    table = EXPORT_TABLES["telegram_user_stickers"]
+
+    def still_in_database(batch: list) -> set:
+        with engine.connect() as connection:
+            return set(connection.execute(
+                text(f"SELECT id FROM telegram_user_stickers WHERE id IN ({','.join(str(int(row['id'])) for row in batch)})")
+            ).scalars())
+
+    batch = []
+    for row in history_archive.read_rows(archive_directory):
+        sent_at = datetime.fromisoformat(row["sent_at"])
+        if (since and sent_at < since) or (until and sent_at >= until):
+            continue
+        batch.append(normalize_row(table, {column: row.get(column) for column in table["columns"]}))
+        if len(batch) >= batch_size:
+            known = still_in_database(batch)
+            yield [item for item in batch if item["id"] not in known]
+            batch = []
+    if batch:
+        known = still_in_database(batch)
+        yield [item for item in batch if item["id"] not in known]
+# ------------------------------------------------------------------------------
+def iter_export_batches(engine, table_name: str, since: datetime | None = None, until: datetime | None = None,
+                        archive_directory: str | None = None):
+    """Batches of an export - for the history, the archived rows first when archive_directory is given"""
+    if table_name == "telegram_user_stickers" and archive_directory:
+        yield from iter_archived_history_batches(engine, archive_directory, since, until)
+    yield from iter_table_batches(engine, table_name, since, until)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def format_batches(batches, table_name: str, output_format: str):
+    """Text chunks (one per batch) - CSV with a header line, or one JSON object per line"""
+    columns = EXPORT_TABLES[table_name]["columns"]
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        yield buffer.getvalue()
+        for batch in batches:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+    else:
+        for batch in batches:
+            if batch:
+                yield "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in batch)
+# ------------------------------------------------------------------------------
+def gzip_chunks(chunks):
+    """Compress text chunks as one gzip stream"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip header
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+# ------------------------------------------------------------------------------
+def export(engine, table_name: str, output_format: str = "csv", since: datetime | None = None,
+           until: datetime | None = None, compress: bool = False, archive_directory: str | None = None):
+    """
+    Stream an export.
+
+    Returns:
+        generator: bytes chunks (gzip when compress) - or text chunks without compression
+    """
+    since, until = local_datetime(since), local_datetime(until)
+    chunks = format_batches(iter_export_batches(engine, table_name, since, until, archive_directory), table_name, output_format)
+    return gzip_chunks(chunks) if compress else chunks
+# ------------------------------------------------------------------------------
+def get_export_file_name(table_name: str, output_format: str, compress: bool) -> str:
+    return f"{table_name}-{datetime.now():%Y%m%d-%H%M%S}.{output_format}{'.gz' if compress else ''}"
+# ------------------------------------------------------------------------------
@@ -0,0 +1,111 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Archive files of the sticker history (telegram_user_stickers)
+#
+# One file per month with one JSON object per line, compressed with zstd
+# (or gzip when zstandard is not installed). Each retention run appends a
+# new compressed frame / member to the file, so nothing is rewritten and
+# the standard tools read the whole file (zstdcat, zcat).
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import sys
+    import io
+    import json
+    import gzip
+
+    from datetime import datetime
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Optional - without it the archives are gzip files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+# ######################################################################
+
+
+ARCHIVE_PREFIX:str = "telegram_user_stickers-"
+ARCHIVE_EXTENSIONS:dict = {"zstd": ".jsonl.zst", "gzip": ".jsonl.gz"}
+ZSTD_LEVEL:int = 10
+
+
+# ------------------------------------------------------------------------------
+def get_archive_path(directory: str, month: str) -> str:
+    """
+    Archive file of a month (YYYY-MM). A month already started with the other
+    compression keeps it - the frames of one file are always the same format.
+    """
+    for extension in ARCHIVE_EXTENSIONS.values():
+        file_path = os.path.join(directory, f"{ARCHIVE_PREFIX}{month}{extension}")
+        if os.path.exists(file_path):
+            return file_path
+    extension = ARCHIVE_EXTENSIONS["zstd" if zstandard is not None else "gzip"]
+    return os.path.join(directory, f"{ARCHIVE_PREFIX}{month}{extension}")
+# ------------------------------------------------------------------------------
+def compress(data: bytes, file_path: str) -> bytes:
+    if file_path.endswith(ARCHIVE_EXTENSIONS["zstd"]):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is not installed - cannot append to {file_path}")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=6)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def append_rows(directory: str, rows: list) -> dict:
+    """
+    Append history rows (dicts with a "sent_at" datetime) to the archive of their month.
+    The data is on disk (fsync) when this returns.
+
+    Returns:
+        dict: archive file path -> rows written
+    """
+    months = {}
+    for row in rows:
+        months.setdefault(row["sent_at"].strftime("%Y-%m"), []).append(row)
+
+    os.makedirs(directory, exist_ok=True)
+    written = {}
+    for month, month_rows in sorted(months.items()):
+        file_path = get_archive_path(directory, month)
+        lines = "".join(json.dumps(row, default=datetime.isoformat, separators=(",", ":")) + "\n" for row in month_rows)
+        with open(file_path, "ab") as f:
+            f.write(compress(lines.encode("utf-8"), file_path))
+            f.flush()
+            os.fsync(f.fileno())
+        written[file_path] = len(month_rows)
+    return written
+# ------------------------------------------------------------------------------
+def list_archives(directory: str) -> list:
+    """Archive files (oldest month first) with their size"""
+    if not os.path.isdir(directory):
+        return []
+    return [
+        {"file": name, "size": os.path.getsize(os.path.join(directory, name))}
+        for name in sorted(os.listdir(directory))
+        if name.startswith(ARCHIVE_PREFIX) and name.endswith(tuple(ARCHIVE_EXTENSIONS.values()))
+    ]
+# ------------------------------------------------------------------------------
+def read_rows(directory: str):
+    """All the archived rows (dicts, sent_at as ISO text), oldest month first"""
+    for archive in list_archives(directory):
+        file_path = os.path.join(directory, archive["file"])
+        with open(file_path, "rb") as f:
+            if file_path.endswith(ARCHIVE_EXTENSIONS["zstd"]):
+                if zstandard is None:
+                    raise RuntimeError(f"zstandard is not installed - cannot read {file_path}")
+                stream = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+            else:
+                stream = gzip.GzipFile(fileobj=f)
+            for line in io.TextIOWrapper(stream, encoding="utf-8"):
+                if line.strip():
+                    yield json.loads(line)
+# ------------------------------------------------------------------------------
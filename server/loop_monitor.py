@@ -0,0 +1,230 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Event loop lag monitor and slow callback profiler
+#
+# A task on the event loop ticks every few milliseconds (heartbeat). A
+# watchdog thread checks the heartbeat: when the loop stops ticking for
+# longer than the threshold, something is blocking it and the thread
+# samples the stack of the loop thread until it ticks again. The samples
+# are attributed to the endpoint / websocket handler found in the stack.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import sys
+    import json
+    import time
+    import asyncio
+    import threading
+    import traceback
+
+    from collections import deque, Counter
+    from datetime import datetime
+
+    from metrics import percentile
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+MAX_STACK_DEPTH:int = 30          # Frames kept per sample (the innermost ones)
+MAX_STACKS_PER_HANDLER:int = 50   # Distinct stacks kept per handler
+
+
+# ------------------------------------------------------------------------------
+class LoopMonitor:
+    """
+    Measure the event loop lag and profile what blocks the loop.
+
+    Arguments:
+        handler_codes (dict): code object -> handler name (endpoints and websocket handlers).
+        threshold (float): Seconds without a heartbeat before the loop is considered blocked.
+        interval (float): Seconds between heartbeats.
+        sample_interval (float): Seconds between stack samples while the loop is blocked.
+        on_lag (callable): Called on the loop with the lag of each heartbeat.
+        on_slow_callback (callable): Called on the loop with each slow callback event.
+    """
+
+    def __init__(self, handler_codes: dict, threshold: float = 0.1, interval: float = 0.05,
+                 sample_interval: float = 0.01, max_events: int = 200, on_lag=None, on_slow_callback=None):
+        self.handler_codes = handler_codes
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_interval = sample_interval
+        self.on_lag = on_lag
+        self.on_slow_callback = on_slow_callback
+
+        self.loop = None
+        self.loop_thread_id = None
+        self.heartbeat = time.perf_counter()
+        self.heartbeat_task = None
+        self.watchdog_thread = None
+        self.stopping = threading.Event()
+
+        # Written by the watchdog thread, read by the admin endpoint
+        self.lock = threading.Lock()
+        self.lag_samples = deque(maxlen=int(60 / interval))  # ~1 minute
+        self.events = deque(maxlen=max_events)
+        self.handlers = {}  # handler -> {"count", "total_seconds", "max_seconds", "stacks": Counter}
+        self.started_at = datetime.now()
+
+    # --------------------------------------------------------------------------
+    def start(self) -> None:
+        """Start the heartbeat (must be called from the event loop) and the watchdog thread"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.heartbeat = time.perf_counter()
+        self.stopping.clear()
+        self.heartbeat_task = asyncio.create_task(self.run_heartbeat())
+        self.watchdog_thread = threading.Thread(target=self.run_watchdog, name="loop-monitor", daemon=True)
+        self.watchdog_thread.start()
+
+    def stop(self) -> None:
+        self.stopping.set()
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    async def run_heartbeat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self.heartbeat = now
+            lag = max(0.0, now - expected)
+            self.lag_samples.append(lag)
+            if self.on_lag:
+                self.on_lag(lag)
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    def run_watchdog(self) -> None:
+        block_start = None   # Heartbeat value when the current block was detected
+        samples = []         # (handler, stack) while blocked
+
+        while not self.stopping.wait(self.sample_interval):
+            heartbeat = self.heartbeat
+            blocked_for = time.perf_counter() - heartbeat - self.interval
+
+            if block_start is not None and heartbeat != block_start:
+                # The loop ticked again - the block is over
+                self.record_block(time.perf_counter() - block_start - self.interval, samples)
+                block_start, samples = None, []
+                continue
+
+            if blocked_for < self.threshold:
+                continue
+
+            if block_start is None:
+                block_start = heartbeat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is not None:
+                samples.append(self.describe_stack(frame))
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    def describe_stack(self, frame) -> tuple:
+        """(handler, folded stack) of a frame of the loop thread"""
+        handler = None
+        fallback = None
+        current = frame
+        while current is not None:
+            code = current.f_code
+            if code in self.handler_codes:
+                handler = self.handler_codes[code]  # Keep going - the outermost one wins
+            elif fallback is None and os.path.basename(code.co_filename) == "server.py":
+                fallback = f"server.{code.co_name}"
+            current = current.f_back
+
+        stack = traceback.extract_stack(frame)[-MAX_STACK_DEPTH:]
+        folded = ";".join(f"{os.path.basename(item.filename)}:{item.name}:{item.lineno}" for item in stack)
+        return handler or fallback or "unknown", folded
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    def record_block(self, duration: float, samples: list) -> None:
+        if not samples:
+            return
+
+        # The handler seen in most samples gets the blame
+        handler = Counter(sample[0] for sample in samples).most_common(1)[0][0]
+        top_stack = Counter(sample[1] for sample in samples).most_common(1)[0][0]
+        event = {
+            "time": datetime.now().isoformat(timespec="milliseconds"),
+            "duration": round(duration, 4),
+            "handler": handler,
+            "samples": len(samples),
+            "stack": top_stack.split(";")
+        }
+
+        with self.lock:
+            self.events.append(event)
+            stats = self.handlers.setdefault(
+                handler, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "stacks": Counter()}
+            )
+            stats["count"] += 1
+            stats["total_seconds"] += duration
+            stats["max_seconds"] = max(stats["max_seconds"], duration)
+            for sample_handler, stack in samples:
+                if sample_handler == handler and (stack in stats["stacks"] or len(stats["stacks"]) < MAX_STACKS_PER_HANDLER):
+                    stats["stacks"][stack] += 1
+
+        if self.on_slow_callback and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.on_slow_callback, event)
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    def snapshot(self, recent: int = 20, stacks: int = 5) -> dict:
+        """Current state - lag percentiles, blocking time per handler and the last slow callbacks"""
+        lag = list(self.lag_samples)
+        with self.lock:
+            handlers = [
+                {
+                    "handler": handler,
+                    "count": stats["count"],
+                    "total_seconds": round(stats["total_seconds"], 4),
+                    "max_seconds": round(stats["max_seconds"], 4),
+                    "top_stacks": [
+                        {"samples": count, "stack": stack.split(";")}
+                        for stack, count in stats["stacks"].most_common(stacks)
+                    ]
+                }
+                for handler, stats in self.handlers.items()
+            ]
+            events = list(self.events)[-recent:]
+
+        handlers.sort(key=lambda item: item["total_seconds"], reverse=True)
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "threshold": self.threshold,
+            "lag": {
+                "samples": len(lag),
+                "p50": round(percentile(lag, 0.50), 4),
+                "p99": round(percentile(lag, 0.99), 4),
+                "max": round(max(lag), 4) if lag else 0.0
+            },
+            "handlers": handlers,
+            "recent": events
+        }
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    def dump(self, directory: str, keep: int) -> str:
+        """Write the snapshot (with all the stacks) to <directory>/loop-<time>.json, keep the last files"""
+        os.makedirs(directory, exist_ok=True)
+        file_path = os.path.join(directory, f"loop-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(recent=self.events.maxlen, stacks=MAX_STACKS_PER_HANDLER), f, indent=1)
+
+        dumps = sorted(name for name in os.listdir(directory) if name.startswith("loop-") and name.endswith(".json"))
+        for name in dumps[:-keep] if keep > 0 else []:
+            os.remove(os.path.join(directory, name))
+        return file_path
+    # --------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
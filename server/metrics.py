@@ -0,0 +1,187 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Small in-process metrics collectors (Prometheus text format)
+#
+# The collectors are plain counters in dicts and lists, without locks: they
+# are only updated from the event loop thread, so an update is a dict lookup
+# and an addition. The text for Prometheus is only built when scraped.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import sys
+    import math
+
+    from bisect import bisect_left
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+# Seconds - from a cheap dict update to a slow transcode
+DEFAULT_BUCKETS:tuple = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ------------------------------------------------------------------------------
+def percentile(values: list, fraction: float) -> float:
+    """Nearest rank percentile of a list (0 if empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+# ------------------------------------------------------------------------------
+def format_labels(label_names: tuple, label_values: tuple, extra: str = "") -> str:
+    """{name="value",...} - empty string when there is nothing to show"""
+    items = [f'{name}="{escape_label(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        items.append(extra)
+    return "{" + ",".join(items) + "}" if items else ""
+# ------------------------------------------------------------------------------
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+# ------------------------------------------------------------------------------
+def format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class Metric:
+    """Base of the collectors: name, help text and label names"""
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+
+    def label_key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def samples(self) -> list:
+        """List of (suffix, label text, value)"""
+        return []
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        for suffix, label_text, value in self.samples():
+            lines.append(f"{self.name}{suffix}{label_text} {format_value(value)}")
+        return "\n".join(lines)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class Counter(Metric):
+    """Value that only goes up (events, errors...)"""
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        super().__init__(name, documentation, labels)
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self.label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> list:
+        return [("_total", format_labels(self.label_names, key), value) for key, value in self.values.items()]
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class Gauge(Metric):
+    """
+    Value that goes up and down. With a function, the value is read when scraped
+    (connected clients, queue sizes...) so nothing has to be updated by the code.
+    """
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), function=None):
+        super().__init__(name, documentation, labels)
+        self.values = {}
+        self.function = function
+
+    def set(self, value: float, **labels) -> None:
+        self.values[self.label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self.label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> list:
+        if self.function is not None:
+            return [("", "", self.function())]
+        return [("", format_labels(self.label_names, key), value) for key, value in self.values.items()]
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class Histogram(Metric):
+    """
+    Distribution of values (latencies). Each observation increments a single
+    bucket - the cumulative counts Prometheus wants are computed when scraped.
+    """
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # label key -> [bucket counts (+Inf last), sum, count]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.label_key(labels)
+        data = self.values.get(key)
+        if data is None:
+            data = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        data[0][bisect_left(self.buckets, value)] += 1
+        data[1] += value
+        data[2] += 1
+
+    def samples(self) -> list:
+        samples = []
+        for key, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = f'le="{format_value(bound)}"'
+                samples.append(("_bucket", format_labels(self.label_names, key, le), cumulative))
+            samples.append(("_sum", format_labels(self.label_names, key), total))
+            samples.append(("_count", format_labels(self.label_names, key), count))
+        return samples
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class Registry:
+    """All the collectors exposed by the /metrics endpoint"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: tuple = (), function=None) -> Gauge:
+        return self.register(Gauge(name, documentation, labels, function))
+
+    def histogram(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+# ------------------------------------------------------------------------------
@@ -0,0 +1,114 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Near duplicate lookup of the sticker perceptual hashes
+#
+# Multi-index hashing over 64 bit hashes with the Hamming distance: the
+# hash is cut in (max distance + 1) chunks, and two hashes within the
+# distance always have at least one chunk exactly the same. A lookup reads
+# one bucket per chunk and only compares against what is in them, so "is
+# this sticker close to a banned one" does not compare against every ban.
+# Plain data structure, updated from the event loop thread only.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import sys
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+HASH_BITS:int = 64
+
+
+# ------------------------------------------------------------------------------
+def hash_to_text(value: int) -> str:
+    """Hash as stored in the database (16 hex digits - SQLite integers are signed)"""
+    return f"{value:016x}"
+# ------------------------------------------------------------------------------
+def hash_from_text(value: str) -> int:
+    return int(value, 16)
+# ------------------------------------------------------------------------------
+def hamming_distance(first: int, second: int) -> int:
+    return (first ^ second).bit_count()
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+class MultiIndexHashTable:
+    """
+    Hashes with the keys (sticker ids) that have them, searchable up to max_distance bits.
+
+    One dict per chunk: chunk value -> {hash: set of keys}.
+    """
+
+    def __init__(self, max_distance: int):
+        self.max_distance = max(0, min(max_distance, HASH_BITS - 1))
+        # (shift, mask) of each chunk - the first ones get the remaining bits
+        chunk_count = self.max_distance + 1
+        self.chunks = []
+        shift = HASH_BITS
+        for index in range(chunk_count):
+            bits = HASH_BITS // chunk_count + (1 if index < HASH_BITS % chunk_count else 0)
+            shift -= bits
+            self.chunks.append((shift, (1 << bits) - 1))
+        self.tables = [{} for _ in self.chunks]
+        self.size = 0
+
+    def add(self, value: int, key) -> None:
+        added = False
+        for (shift, mask), table in zip(self.chunks, self.tables):
+            keys = table.setdefault((value >> shift) & mask, {}).setdefault(value, set())
+            if key not in keys:
+                keys.add(key)
+                added = True
+        if added:
+            self.size += 1
+
+    def remove(self, value: int, key) -> bool:
+        removed = False
+        for (shift, mask), table in zip(self.chunks, self.tables):
+            chunk = (value >> shift) & mask
+            bucket = table.get(chunk)
+            if not bucket or key not in bucket.get(value, ()):
+                continue
+            bucket[value].discard(key)
+            removed = True
+            # Empty entries would make the next lookups slower
+            if not bucket[value]:
+                del bucket[value]
+                if not bucket:
+                    del table[chunk]
+        if removed:
+            self.size -= 1
+        return removed
+
+    def search(self, value: int, max_distance: int | None = None) -> list:
+        """(distance, hash, key) of every key within max_distance (at most the one of the table), closest first"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+
+        candidates = set()
+        for (shift, mask), table in zip(self.chunks, self.tables):
+            bucket = table.get((value >> shift) & mask)
+            if bucket:
+                candidates.update(bucket)
+
+        results = []
+        for candidate in candidates:
+            distance = hamming_distance(value, candidate)
+            if distance <= max_distance:
+                keys = self.tables[0][(candidate >> self.chunks[0][0]) & self.chunks[0][1]][candidate]
+                results.extend((distance, candidate, key) for key in keys)
+        results.sort(key=lambda result: result[0])
+        return results
+
+    def find_nearest(self, value: int, max_distance: int | None = None):
+        """Closest (distance, hash, key) or None"""
+        results = self.search(value, max_distance)
+        return results[0] if results else None
+# ------------------------------------------------------------------------------
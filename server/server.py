@@ -19,12 +19,22 @@ try:
     import base64
     import secrets
     import time
+    import asyncio
+    import hashlib
+    import multiprocessing
+    import shutil
+    import re
+    import gzip
+    import mimetypes
+    import signal
 
     from enum import Enum
+    from collections import OrderedDict, deque
+    from concurrent.futures import ProcessPoolExecutor
 
     from contextlib import asynccontextmanager
 
-    from fastapi import FastAPI, WebSocket, HTTPException, Security, Response, Depends
+    from fastapi import FastAPI, WebSocket, HTTPException, Security, Response, Depends, Query
     from fastapi.security.api_key import APIKeyHeader
     from fastapi.staticfiles import StaticFiles
     from fastapi.middleware.cors import CORSMiddleware
@@ -32,19 +42,32 @@ try:
     from dotenv import load_dotenv, dotenv_values
 
     from starlette.websockets import WebSocketDisconnect
-    from starlette.status import HTTP_403_FORBIDDEN
+    from starlette.status import HTTP_403_FORBIDDEN, HTTP_503_SERVICE_UNAVAILABLE
+    from starlette.staticfiles import NotModifiedResponse
+    from starlette.datastructures import Headers, QueryParams
+    from starlette.responses import FileResponse, StreamingResponse
 
     from typing import List, Annotated, Optional, Dict
 
     from datetime import datetime, timezone, timedelta
 
-    from sqlalchemy import Column, JSON, Index, inspect
-    from sqlmodel import Field, Session, SQLModel, create_engine, select, distinct, func, desc, and_
+    from sqlalchemy import Column, JSON, Index, inspect, delete, text, column, tuple_, exists
+    from sqlalchemy.exc import OperationalError
+    from sqlmodel import Field, Session, SQLModel, create_engine, select, func, desc, or_, case
 
     from passlib.context import CryptContext
 
     from pydantic import BaseModel
 
+    import sticker_processing
+    import static_assets
+    import metrics
+    import loop_monitor
+    import history_archive
+    import data_export
+    import near_duplicates
+    import wall_protocol
+
 except Exception as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
@@ -88,6 +111,248 @@ BASE_PATH:str = os.getcwd() # Return a string representing the current working d
 connected_telegram_clients = []
 connected_wall_clients = []
 
+# Per wall client state (sticker budget, last reported stats...) - Key is the websocket
+wall_client_state: Dict[WebSocket, dict] = {}
+wall_sticker_handles: Dict[str, int] = {}  # sticker uuid -> handle in the compact wall frames (the database id)
+
+# Admin dashboards (live stream) - Key is the websocket, value the queue of frames to send
+connected_admin_clients: Dict[WebSocket, asyncio.Queue] = {}
+
+# ------------------------------------------------------------------------------
+# Wall sticker budget
+# Each wall reports the render FPS and the number of bodies in the physics world.
+# The server then adjusts how many stickers that wall gets (AIMD style):
+# weak walls are cut fast, strong walls grow slowly.
+WALL_STICKER_LIMIT_DEFAULT:int = int(os.getenv("WALL_STICKER_LIMIT", 200))
+WALL_STICKER_LIMIT_MIN:int = int(os.getenv("WALL_STICKER_LIMIT_MIN", 20))
+WALL_STICKER_LIMIT_MAX:int = int(os.getenv("WALL_STICKER_LIMIT_MAX", 300))
+WALL_FPS_LOW:float = float(os.getenv("WALL_FPS_LOW", 30))     # Below this the wall is struggling
+WALL_FPS_HIGH:float = float(os.getenv("WALL_FPS_HIGH", 50))   # Above this the wall can take more
+WALL_BUDGET_DECREASE_FACTOR:float = 0.75
+WALL_BUDGET_INCREASE_STEP:int = 20
+WALL_BUDGET_ADJUST_INTERVAL:int = 15  # seconds between adjustments, so the wall can settle
+
+# ------------------------------------------------------------------------------
+# Wall channels - named groups of walls (rooms, screens...) with their own sticker filters,
+# budget and ranking. A wall subscribes with ?channel=<name>, without it gets "default".
+WALL_CHANNEL_DEFAULT:str = "default"
+WALL_CHANNEL_RANKINGS:tuple = ("boost", "newest", "uses")
+WALL_CHANNEL_NAME_PATTERN:str = r"^[a-z0-9_-]{1,32}$"
+wall_channels: Dict[str, dict] = {}  # name -> settings (loaded at startup, updated by the API)
+
+# ------------------------------------------------------------------------------
+# Wall rotation - a channel with rotation_slots keeps that part of its budget for stickers
+# taken in turn from the whole visible catalog (by id, the cursor is saved in the channel),
+# so the stickers out of the top are shown again. A few are swapped at each step.
+WALL_ROTATION_INTERVAL:float = float(os.getenv("WALL_ROTATION_INTERVAL", 20))  # seconds between steps
+WALL_ROTATION_STEP:int = int(os.getenv("WALL_ROTATION_STEP", 5))                # stickers swapped per step
+wall_rotation_state: Dict[str, dict] = {}  # channel -> {"window": shown entries (oldest first), "prefetch": next ones}
+
+# ------------------------------------------------------------------------------
+# Wall snapshot - what the walls need (channels, top stickers, atlas, serialized sync frames)
+# saved on disk from time to time. After a restart the walls are synchronized from it right
+# away, while the database is checked and loaded in the background.
+WALL_SNAPSHOT_ENABLED:bool = os.getenv("WALL_SNAPSHOT_ENABLED", "1") == "1"
+WALL_SNAPSHOT_FILE:str = os.path.join("data", "wall_snapshot.json")
+WALL_SNAPSHOT_INTERVAL:float = float(os.getenv("WALL_SNAPSHOT_INTERVAL", 60))    # seconds between writes
+WALL_SNAPSHOT_MAX_AGE:float = float(os.getenv("WALL_SNAPSHOT_MAX_AGE", 86400))   # seconds - an older one is not used
+WALL_SNAPSHOT_VERSION:int = 1
+WALL_SNAPSHOT_MAX_FRAMES:int = 32          # Sync frames saved (most recently seen wall settings)
+wall_snapshot: dict | None = None          # Snapshot loaded at startup - until the database is ready
+wall_snapshot_sync_states: Dict[str, dict] = {}  # sync key -> wall settings seen (the walls are gone at shutdown)
+database_ready: asyncio.Event | None = None  # Set when create_db_and_tables is done (created in lifespan)
+
+# ------------------------------------------------------------------------------
+# Sticker atlas - the top stickers packed in a few sprite sheets, so a wall loads
+# a handful of images instead of one request per sticker
+ATLAS_ENABLED:bool = os.getenv("WALL_ATLAS_ENABLED", "1") == "1"
+ATLAS_CELL_SIZE:int = int(os.getenv("WALL_ATLAS_CELL_SIZE", 192))
+ATLAS_COLUMNS:int = 8
+ATLAS_PAGE_SLOTS:int = 64           # 8x8 stickers per page
+ATLAS_DIRECTORY:str = "atlas"       # Inside the static directory
+ATLAS_REBUILD_DELAY:float = 2.0     # seconds - groups bursts of changes in a single rebuild
+
+# pages: [{"slots": [sticker_uuid | None], "file": "atlas/<hash>.webp", "frames": {sticker_uuid: {x, y, w, h}},
+#          "dirty": True when its last build failed (built again by the next refresh),
+#          "purge": True when the file still shows a moderated sticker (removed once built again)}]
+wall_atlas = {
+    "pages": [],
+    "dirty": False,  # Top stickers changed since the last refresh
+    "retired": []    # Page files replaced by the last refresh - the walls synced before may still load them
+}
+wall_atlas_lock = asyncio.Lock()
+wall_atlas_refresh_task: asyncio.Task | None = None
+
+# ------------------------------------------------------------------------------
+# Sticker media processing (resized variants...) - runs in a process pool,
+# so the image work never blocks the event loop
+STICKER_VARIANT_SIZES:tuple = (96, 128, 256)
+STICKER_THUMBNAIL_SIZE:int = 96     # Used by the admin grid (size=thumb)
+MEDIA_WORKERS:int = int(os.getenv("MEDIA_WORKERS", min(2, os.cpu_count() or 1)))
+
+media_process_pool: ProcessPoolExecutor | None = None  # Created at startup
+
+# Animated (.tgs) and video (.webm) stickers are transcoded to animated webp.
+# The output is cached by content hash - each sticker is transcoded only once.
+ANIMATED_MAX_SIZE:int = int(os.getenv("ANIMATED_STICKER_MAX_SIZE", 256))
+ANIMATED_MAX_FRAMES:int = int(os.getenv("ANIMATED_STICKER_MAX_FRAMES", 60))
+ANIMATED_MAX_FPS:int = int(os.getenv("ANIMATED_STICKER_MAX_FPS", 20))
+TRANSCODE_CACHE_DIRECTORY:str = os.path.join("data", "transcode_cache")
+
+# content hash -> running transcode (the same sticker sent by many users at once)
+transcode_tasks: Dict[str, asyncio.Task] = {}
+
+# Sticker paths whose variants are not written yet - their URLs point to the original meanwhile
+# (also when the variants failed: the backfill of the next start tries again)
+sticker_variants_pending: set = set()
+sticker_variant_tasks: set = set()  # Keeps a reference to the running tasks
+
+# Near duplicate bans - a new sticker whose perceptual hash is within this many bits
+# (of 64) of a banned sticker is banned too. The banned hashes are kept in a multi-index hash table.
+NEAR_DUPLICATE_DISTANCE:int = int(os.getenv("NEAR_DUPLICATE_DISTANCE", 6))
+NEAR_DUPLICATE_BACKFILL_BATCH:int = 100
+banned_hash_index = near_duplicates.MultiIndexHashTable(NEAR_DUPLICATE_DISTANCE)
+
+# ------------------------------------------------------------------------------
+# Static files cache
+# The assets (js, css, images...) are hashed at startup. The HTML pages are served
+# with the asset URLs fingerprinted (?v=<hash>) so the browsers (and the reverse
+# proxy) can keep them forever. Text assets are also precompressed (.gz/.br).
+STATIC_CACHE_DIRECTORY:str = "static_cache"   # Precompressed copies, same tree as "static"
+STATIC_IMMUTABLE_MAX_AGE:int = 31536000       # 1 year - only for URLs that can't change content
+STATIC_STICKER_MAX_AGE:int = int(os.getenv("STATIC_STICKER_MAX_AGE", 86400))
+
+# relative path -> {"hash": str, "encodings": {"br": path, "gzip": path}} - empty until built
+static_asset_manifest: Dict[str, dict] = {}
+# html page -> (mtime, body, gzip body, etag) - cleared when the manifest is rebuilt
+static_html_cache: Dict[str, tuple] = {}
+
+# ------------------------------------------------------------------------------
+# Metrics - exposed on /metrics (Prometheus text format)
+metrics_registry = metrics.Registry()
+METRIC_INGEST_STAGE_SECONDS = metrics_registry.histogram(
+    "stickerwall_ingest_stage_seconds", "Time spent in each stage of the sticker ingest", ("stage",))
+METRIC_INGEST_STICKERS = metrics_registry.counter(
+    "stickerwall_ingest_stickers", "Stickers received from the bots by result", ("result",))
+METRIC_BROADCAST_SECONDS = metrics_registry.histogram(
+    "stickerwall_broadcast_seconds", "Time to send a message to all the wall clients")
+METRIC_BROADCAST_CLIENT_SECONDS = metrics_registry.histogram(
+    "stickerwall_broadcast_client_seconds", "Time to send a message to one wall client")
+METRIC_BROADCAST_MESSAGES = metrics_registry.counter(
+    "stickerwall_broadcast_messages", "Messages sent to the walls by type", ("type",))
+METRIC_WALL_FRAME_BYTES = metrics_registry.counter(
+    "stickerwall_wall_frame_bytes", "Bytes of the frames sent to the walls (before websocket compression)", ("encoding",))
+METRIC_API_KEY_VALIDATION_SECONDS = metrics_registry.histogram(
+    "stickerwall_api_key_validation_seconds", "API key validation time by result", ("result",))
+METRIC_MEDIA_TASK_SECONDS = metrics_registry.histogram(
+    "stickerwall_media_task_seconds", "Time of the media process pool tasks (queue included)", ("task",))
+METRIC_NEAR_DUPLICATE_LOOKUP_SECONDS = metrics_registry.histogram(
+    "stickerwall_near_duplicate_lookup_seconds", "Time to look for a banned sticker close to a new one")
+METRIC_MEDIA_POOL_PENDING = metrics_registry.gauge(
+    "stickerwall_media_pool_pending", "Tasks waiting or running in the media process pool")
+metrics_registry.gauge(
+    "stickerwall_wall_clients", "Connected wall clients", function=lambda: len(connected_wall_clients))
+metrics_registry.gauge(
+    "stickerwall_bot_clients", "Connected bot clients", function=lambda: len(connected_telegram_clients))
+metrics_registry.gauge(
+    "stickerwall_transcode_pending", "Animated stickers being transcoded", function=lambda: len(transcode_tasks))
+metrics_registry.gauge(
+    "stickerwall_atlas_pages", "Pages in the sticker atlas", function=lambda: len(wall_atlas["pages"]))
+METRIC_LOOP_LAG_SECONDS = metrics_registry.histogram(
+    "stickerwall_event_loop_lag_seconds", "Event loop lag (only with LOOP_MONITOR_ENABLED)")
+METRIC_LOOP_BLOCKED_SECONDS = metrics_registry.counter(
+    "stickerwall_event_loop_blocked_seconds", "Time the event loop was blocked, by handler", ("handler",))
+METRIC_HISTORY_ARCHIVED_ROWS = metrics_registry.counter(
+    "stickerwall_history_archived_rows", "Sticker history rows moved to the archive files")
+metrics_registry.gauge(
+    "stickerwall_database_bytes", "Size of the database file", function=lambda: get_database_file_size())
+METRIC_STICKER_GC_FILES = metrics_registry.counter(
+    "stickerwall_sticker_gc_files", "Orphan sticker files by action (quarantined, deleted, purged)", ("action",))
+METRIC_STICKER_GC_BYTES = metrics_registry.counter(
+    "stickerwall_sticker_gc_bytes", "Bytes of the orphan sticker files by action (quarantined, deleted, purged)", ("action",))
+
+# ------------------------------------------------------------------------------
+# Event loop monitor (opt-in) - finds what freezes the walls (sync DB calls, bcrypt...)
+LOOP_MONITOR_ENABLED:bool = os.getenv("LOOP_MONITOR_ENABLED", "0") == "1"
+LOOP_MONITOR_THRESHOLD:float = float(os.getenv("LOOP_MONITOR_THRESHOLD", 0.1))  # seconds blocked = slow callback
+LOOP_MONITOR_DUMP_DIRECTORY:str = os.path.join("data", "profiles")
+LOOP_MONITOR_DUMP_INTERVAL:int = int(os.getenv("LOOP_MONITOR_DUMP_INTERVAL", 300))  # seconds
+LOOP_MONITOR_DUMP_KEEP:int = 12
+
+event_loop_monitor: loop_monitor.LoopMonitor | None = None  # Created at startup when enabled
+
+# ------------------------------------------------------------------------------
+# Sticker latency tracing - the bot creates a trace for each sticker, the server adds
+# its timestamps and the walls report when the sticker is rendered
+TRACE_MAX_PENDING:int = 1000    # Traces waiting for the walls to report the render
+TRACE_MAX_SAMPLES:int = 2000    # Samples kept per stage for the percentiles
+TRACE_TTL:int = 60              # seconds a trace waits for the render reports
+TRACE_MAX_RENDER_MS:int = 10000  # Longer render times reported by a wall are rejected
+METRIC_TRACE_STAGE_SECONDS = metrics_registry.histogram(
+    "stickerwall_trace_stage_seconds", "Sticker latency per stage, from Telegram to the wall render", ("stage",))
+
+sticker_traces: OrderedDict = OrderedDict()  # trace id -> trace (oldest first)
+trace_stage_samples: Dict[str, deque] = {}    # stage -> last durations (seconds)
+
+# ------------------------------------------------------------------------------
+# Activity rollups - counters updated on each ingest, so the statistics never scan telegram_user_stickers
+STATS_RESOLUTIONS:dict = {  # resolution -> SQLite strftime format of the bucket start (same text as the datetime columns)
+    "minute": "%Y-%m-%d %H:%M:00.000000",
+    "hour": "%Y-%m-%d %H:00:00.000000"
+}
+STATS_MINUTE_RETENTION_HOURS:int = int(os.getenv("STATS_MINUTE_RETENTION_HOURS", 48))  # The hour buckets are kept
+STATS_MAX_LIMIT:int = 1000  # Max rows returned by the stats endpoints
+
+# ------------------------------------------------------------------------------
+# History retention - old telegram_user_stickers rows are moved to monthly archive files (data/archive)
+# The newest row of each user/sticker pair always stays: "who sent this sticker" keeps working
+HISTORY_RETENTION_DAYS:int = int(os.getenv("HISTORY_RETENTION_DAYS", 0))           # 0 = keep everything
+HISTORY_RETENTION_INTERVAL:int = int(os.getenv("HISTORY_RETENTION_INTERVAL", 3600))  # seconds between runs
+HISTORY_RETENTION_BATCH:int = 5000      # Rows per transaction - the ingest waits at most one batch
+HISTORY_RETENTION_PAUSE:float = 0.05    # seconds between batches
+HISTORY_ARCHIVE_DIRECTORY:str = os.path.join("data", "archive")
+HISTORY_VACUUM_PAGES:int = 2000         # Free pages returned to the file system per incremental vacuum step
+# Switching an existing database to incremental vacuum needs one full VACUUM (exclusive lock for the whole
+# rewrite - the ingest fails meanwhile), so it is only done when asked: here or POST /api/admin/retention/vacuum
+HISTORY_VACUUM_CONVERT:bool = os.getenv("HISTORY_VACUUM_CONVERT", "0") == "1"
+
+history_retention_status: dict = {"last_run": None, "running": False}
+
+# ------------------------------------------------------------------------------
+# Sticker file GC - files of static/stickers (and their size variants) no sticker row uses anymore are
+# moved to a quarantine directory (or deleted), a batch at a time. Banned stickers keep their files (unban)
+STICKER_GC_INTERVAL:int = int(os.getenv("STICKER_GC_INTERVAL", 21600))  # seconds between runs, 0 = disabled
+STICKER_GC_MODE:str = os.getenv("STICKER_GC_MODE", "quarantine")       # quarantine or delete
+STICKER_GC_GRACE:int = int(os.getenv("STICKER_GC_GRACE", 3600))        # Newer files are never touched (written before their row)
+STICKER_GC_QUARANTINE_DAYS:int = int(os.getenv("STICKER_GC_QUARANTINE_DAYS", 7))  # Then deleted for good
+STICKER_GC_QUARANTINE_DIRECTORY:str = os.path.join("data", "sticker_quarantine")
+STICKER_GC_BATCH:int = 500      # Directory entries per step (os.scandir), rows per query for the referenced files
+STICKER_GC_PAUSE:float = 0.05   # seconds between steps - the disk stays available for the ingest and the walls
+
+sticker_gc_status: dict = {"last_run": None, "running": False}
+
+# ------------------------------------------------------------------------------
+# User listing - keyset pagination, search with an FTS5 index (LIKE when SQLite has no FTS5)
+USERS_PAGE_SIZE_DEFAULT:int = 50
+USERS_PAGE_SIZE_MAX:int = 500
+users_fts_enabled: bool = False  # Set at startup
+
+# Sticker search for the moderators - streamed (NDJSON) in chunks, keyset pagination
+STICKERS_SEARCH_LIMIT_DEFAULT:int = 200
+STICKERS_SEARCH_LIMIT_MAX:int = 5000
+STICKERS_SEARCH_CHUNK:int = 200     # Rows per query while streaming
+stickers_fts_enabled: bool = False  # Set at startup
+
+# Bulk moderation - stickers changed by one request (one transaction, one wall frame)
+BULK_ACTION_MAX_STICKERS:int = 5000
+
+# Admin live stream - the changes are collected and sent as one delta frame per interval
+ADMIN_STREAM_INTERVAL:float = 0.5       # seconds
+ADMIN_STREAM_QUEUE_SIZE:int = 32        # frames waiting for a slow admin, then it must reload (resync)
+ADMIN_STREAM_AUTH_TIMEOUT:float = 5.0   # seconds to send the auth message after connecting
+ADMIN_STREAM_STICKER_SIZE:str = "thumb" # Same variant as the admin sticker list
+admin_stream_pending = {"stickers": {}, "users": {}, "counts": False}
+
 # ------------------------------------------------------------------------------
 # Password hashing context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -111,7 +376,8 @@ bot_information = {
 # ######################################################################
 # ------------------------------------------------------------------------------
 sqlite_file_name = "database.db"
-sqlite_url = f"sqlite:///{os.path.join(BASE_PATH, 'data' ,sqlite_file_name)}" # The file should be saved on the same directory as the application
+sqlite_file_path = os.path.join(BASE_PATH, 'data' ,sqlite_file_name)
+sqlite_url = f"sqlite:///{sqlite_file_path}" # The file should be saved on the same directory as the application
 connect_args = {"check_same_thread": False}
 engine = create_engine(sqlite_url, connect_args=connect_args, echo=False)
 # engine = create_engine(sqlite_url, echo=True)
@@ -167,11 +433,73 @@ async def lifespan(app: FastAPI):
     # SQLModel.metadata.create_all(engine, checkfirst=False)
     # with Session(engine) as session:
     #     create_initial_admin(session, os.getenv("INITIAL_ADMIN_PASSWORD"))
-    create_db_and_tables()
+
+    # With a snapshot of the last run the walls are served from it while the database starts
+    global database_ready
+    database_ready = asyncio.Event()
+    if load_wall_snapshot():
+        database_task = asyncio.create_task(start_database_in_background())
+    else:
+        database_task = None
+        create_db_and_tables()
+        database_ready.set()
+
+    # Process pool for the image work (spawn: the workers only import sticker_processing)
+    global media_process_pool
+    media_process_pool = ProcessPoolExecutor(
+        max_workers=MEDIA_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    backfill_task = asyncio.create_task(backfill_sticker_variants())
+    hash_backfill_task = asyncio.create_task(backfill_perceptual_hashes())
+
+    # Build the sticker atlas for the walls in the background (the pages of the snapshot are kept)
+    clear_wall_atlas_files()
+    if database_ready.is_set():
+        schedule_wall_atlas_refresh()
+
+    # Hash and precompress the static assets
+    static_task = asyncio.create_task(build_static_asset_manifest())
+
+    # Opt-in event loop monitor
+    monitor_task = start_loop_monitor() if LOOP_MONITOR_ENABLED else None
+
+    # Archive the old sticker history and keep the database file small
+    retention_task = asyncio.create_task(history_retention_loop())
+
+    # Sticker files no row uses anymore
+    sticker_gc_task = asyncio.create_task(sticker_gc_loop())
+
+    # Changes for the admin dashboards
+    admin_stream_task = asyncio.create_task(admin_stream_loop())
+
+    # Catalog rotation of the channels with rotation slots
+    rotation_task = asyncio.create_task(wall_rotation_loop())
+
+    # Warm start of the next run
+    snapshot_task = asyncio.create_task(wall_snapshot_loop())
 
     yield
     # Runs at shutdown
-    pass
+    snapshot_task.cancel()
+    if database_task:
+        database_task.cancel()
+    if database_ready.is_set():
+        try:
+            await write_wall_snapshot()
+        except Exception as e:
+            logging.error(f"Error writing the wall snapshot: {e}")
+    backfill_task.cancel()
+    hash_backfill_task.cancel()
+    static_task.cancel()
+    retention_task.cancel()
+    sticker_gc_task.cancel()
+    admin_stream_task.cancel()
+    rotation_task.cancel()
+    if monitor_task:
+        monitor_task.cancel()
+        event_loop_monitor.stop()
+    media_process_pool.shutdown(wait=False, cancel_futures=True)
 
 
 
@@ -208,6 +536,10 @@ class Sticker(SQLModel, table=True):
     __tablename__ = "stickers"
     __table_args__ = (
         Index('ix_stickers_sticker_id', 'sticker_id', unique=True),
+        Index('ix_stickers_created_at', 'created_at', 'id'),
+        Index('ix_stickers_boost_factor', 'boost_factor', 'id'),
+        # Covering index of the search facets - the facet counts never read the table
+        Index('ix_stickers_facets', 'banned', 'visible', 'boost_factor', 'created_at'),
         {'extend_existing': True}
     )
 
@@ -220,12 +552,16 @@ class Sticker(SQLModel, table=True):
     banned: bool = Field(default=False)
     reason: str | None = Field(default=None)
     boost_factor: int = Field(default=0)
+    emoji: str | None = Field(default=None)     # From telegram - for the search
+    set_name: str | None = Field(default=None)  # Sticker pack
+    perceptual_hash: str | None = Field(default=None)  # dHash (hex) - finds the re-uploads of banned stickers
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 class TelegramUser(SQLModel, table=True):
     __tablename__ = "telegram_users"
     __table_args__ = (
         Index('ix_telegram_users_userid', 'userid', unique=True),
+        Index('ix_telegram_users_last_message', 'last_message', 'id'),
         {'extend_existing': True}
     )
 
@@ -247,6 +583,7 @@ class TelegramUserSticker(SQLModel, table=True):
     __table_args__ = (
         Index('ix_telegram_user_stickers_user_id', 'user_id'),
         Index('ix_telegram_user_stickers_sticker_id', 'sticker_id'),
+        Index('ix_telegram_user_stickers_user_sticker', 'user_id', 'sticker_id'),
         {'extend_existing': True}
     )
 
@@ -257,6 +594,79 @@ class TelegramUserSticker(SQLModel, table=True):
     blocked_by_policy: bool = Field(default=False)
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
+class TelegramUserBanSticker(SQLModel, table=True):
+    """Stickers changed by the ban of a user, with their state before it - the unban puts it back"""
+    __tablename__ = "telegram_user_ban_stickers"
+    __table_args__ = ({'extend_existing': True},)
+
+    user_id: int = Field(foreign_key="telegram_users.id", primary_key=True)
+    sticker_id: int = Field(foreign_key="stickers.id", primary_key=True)
+    action: str                     # hide / ban - what the user ban did
+    visible: bool                   # State before the user ban
+    banned: bool
+    reason: str | None = Field(default=None)
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class StickerStats(SQLModel, table=True):
+    __tablename__ = "sticker_stats"
+    __table_args__ = (
+        Index('ix_sticker_stats_total_uses', 'total_uses'),
+        Index('ix_sticker_stats_unique_users', 'unique_users'),
+        {'extend_existing': True}
+    )
+
+    sticker_id: int = Field(foreign_key="stickers.id", primary_key=True)
+    total_uses: int = Field(default=0)
+    unique_users: int = Field(default=0)
+    first_used_at: datetime | None = Field(default=None)
+    last_used_at: datetime | None = Field(default=None)
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class TelegramUserStats(SQLModel, table=True):
+    __tablename__ = "telegram_user_stats"
+    __table_args__ = (
+        Index('ix_telegram_user_stats_total_stickers', 'total_stickers'),
+        Index('ix_telegram_user_stats_unique_stickers', 'unique_stickers'),
+        {'extend_existing': True}
+    )
+
+    user_id: int = Field(foreign_key="telegram_users.id", primary_key=True)
+    total_stickers: int = Field(default=0)
+    unique_stickers: int = Field(default=0)
+    first_sent_at: datetime | None = Field(default=None)
+    last_sent_at: datetime | None = Field(default=None)
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class WallChannel(SQLModel, table=True):
+    __tablename__ = "wall_channels"
+    __table_args__ = ({'extend_existing': True},)
+
+    name: str = Field(primary_key=True)
+    description: str | None = Field(default=None)
+    set_names: list | None = Field(default=None, sa_column=Column(JSON))  # Only these sticker packs (None = all)
+    emojis: list | None = Field(default=None, sa_column=Column(JSON))     # Only these emojis (None = all)
+    min_boost: int = Field(default=0)
+    budget: int | None = Field(default=None)  # Max stickers on the walls of the channel (None = WALL_STICKER_LIMIT_MAX)
+    ranking: str = Field(default="boost")     # boost / newest / uses
+    rotation_slots: int = Field(default=0)    # Part of the budget for the catalog rotation (0 = off)
+    rotation_cursor: int = Field(default=0)   # Last sticker id shown by the rotation
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+class ActivityBucket(SQLModel, table=True):
+    __tablename__ = "activity_buckets"
+    __table_args__ = (
+        {'extend_existing': True}
+    )
+
+    resolution: str = Field(primary_key=True)  # minute / hour
+    bucket_start: datetime = Field(primary_key=True)
+    uses: int = Field(default=0)                # Stickers sent
+    active_users: int = Field(default=0)        # Distinct users who sent a sticker
+    active_stickers: int = Field(default=0)     # Distinct stickers sent
+    new_users: int = Field(default=0)           # Users who sent their first sticker
+    new_stickers: int = Field(default=0)        # Stickers sent for the first time
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
 class User(SQLModel, table=True):
     __tablename__ = "users"
     __table_args__ = (
@@ -311,10 +721,95 @@ def create_db_and_tables():
     #     else:
     #         logger.info(f"Table already exists: {table_name}")
 
+    # A new (empty) database starts in incremental vacuum - free, unlike switching an existing one
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if not connection.exec_driver_sql("SELECT 1 FROM sqlite_master LIMIT 1").first():
+            connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+
     SQLModel.metadata.create_all(engine, checkfirst=True)
     # SQLModel.metadata.create_all(engine)
+
+    add_missing_columns(Sticker)
+    add_missing_columns(WallChannel)
+
+    # Indexes added after the first release - create_all only creates them with a new table
+    for table in (Sticker.__table__, TelegramUser.__table__, TelegramUserSticker.__table__):
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    # Search - only the name changes touch the index, not last_message / boost_factor
+    global users_fts_enabled, stickers_fts_enabled
+    users_fts_enabled = create_search_index("telegram_users", ("username", "fullusername"))
+    stickers_fts_enabled = create_search_index("stickers", ("sticker_id", "emoji", "set_name", "reason"))
+
     with Session(engine) as session:
         create_initial_admin(session, os.getenv("INITIAL_ADMIN_PASSWORD"))
+
+        # Database from before the rollups - compute them once from the history
+        if (session.exec(select(StickerStats.sticker_id).limit(1)).first() is None
+                and session.exec(select(TelegramUserSticker.id).limit(1)).first() is not None):
+            rebuild_activity_rollups(session)
+
+        load_banned_hash_index(session)
+
+        # The default channel always exists - the walls that don't ask for a channel
+        if session.get(WallChannel, WALL_CHANNEL_DEFAULT) is None:
+            session.add(WallChannel(name=WALL_CHANNEL_DEFAULT, description="Walls without a channel"))
+            session.commit()
+        load_wall_channels(session)
+# ------------------------------------------------------------------------------
+def add_missing_columns(model) -> None:
+    """Columns added to a model after the first release - create_all never changes an existing table"""
+    table = model.__table__
+    existing = {item["name"] for item in inspect(engine).get_columns(table.name)}
+    with engine.begin() as connection:
+        for model_column in table.columns:
+            if model_column.name not in existing:
+                column_type = model_column.type.compile(dialect=engine.dialect)
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {model_column.name} {column_type}")
+                logging.info(f"Added column {table.name}.{model_column.name}")
+# ------------------------------------------------------------------------------
+def create_search_index(content_table: str, columns: tuple) -> bool:
+    """
+    FTS5 index <content_table>_fts of some text columns (external content: the text stays in
+    the table), kept in sync by triggers that only fire when these columns change.
+
+    Returns:
+        bool: False when SQLite has no FTS5 (the search falls back to LIKE)
+    """
+    fts_table = f"{content_table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    insert_new = f"INSERT INTO {fts_table} (rowid, {names}) VALUES (new.id, {new_values});"
+    delete_old = f"INSERT INTO {fts_table} ({fts_table}, rowid, {names}) VALUES ('delete', old.id, {old_values});"
+
+    statements = [
+        f"CREATE VIRTUAL TABLE {fts_table} USING fts5("
+        f"{names}, content='{content_table}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {content_table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {content_table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {names} ON {content_table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+    try:
+        with engine.begin() as connection:
+            exists = connection.exec_driver_sql(
+                f"SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = '{fts_table}'"
+            ).first() is not None
+            if exists:
+                statements = statements[1:]
+            for statement in statements:
+                connection.exec_driver_sql(statement)
+            if not exists:
+                # Index the rows created before the search existed
+                connection.exec_driver_sql(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')")
+        return True
+    except OperationalError as e:
+        logging.warning(f"SQLite without FTS5 - the {content_table} search uses LIKE: {e}")
+        return False
+# ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 
 
@@ -335,7 +830,10 @@ class WallMessageType(str, Enum):
     IGNORE = "wall_ignore"
     STICKER_ADD = "sticker_add"
     STICKER_REMOVE = "sticker_remove"
+    STICKER_ADD_BATCH = "sticker_add_batch"        # {"stickers": [{"sticker_id", "path"}, ...]}
+    STICKER_REMOVE_BATCH = "sticker_remove_batch"  # {"sticker_ids": [...]}
     BOT_INFO = "bot_info"
+    BUDGET = "wall_budget"
 # ------------------------------------------------------------------------------
 class StickerActionType(str, Enum):
     BAN = "ban"
@@ -347,6 +845,21 @@ class StickerActionRequest(BaseModel):
     type: StickerActionType
     reason: Optional[str] = None
 # ------------------------------------------------------------------------------
+class WallChannelRequest(BaseModel):
+    description: Optional[str] = None
+    set_names: Optional[List[str]] = None
+    emojis: Optional[List[str]] = None
+    min_boost: int = 0
+    budget: Optional[int] = None
+    ranking: str = "boost"
+    rotation_slots: int = 0
+# ------------------------------------------------------------------------------
+class StickerBulkActionRequest(BaseModel):
+    type: StickerActionType
+    reason: Optional[str] = None
+    sticker_uuids: Optional[List[str]] = None  # These stickers...
+    user_id: Optional[int] = None              # ... and/or every sticker sent by this Telegram user
+# ------------------------------------------------------------------------------
 
 
 
@@ -408,18 +921,32 @@ def invalidate_api_key(session, key: str) -> bool:
         return True
     return False
 # ------------------------------------------------------------------------------
+def require_database() -> None:
+    """503 while the database starts in the background (warm start) - the walls are served from the snapshot"""
+    if database_ready is None or not database_ready.is_set():
+        raise HTTPException(
+            status_code=HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database starting, try again",
+            headers={"Retry-After": "5"}
+        )
+# ------------------------------------------------------------------------------
 async def verify_api_key(api_key: str = Security(api_key_header)) -> bool:
     """Verify API key and return boolean"""
+    require_database()
+    started = time.perf_counter()
     with Session(engine) as session:
-        if validate_api_key(session, api_key):
-            return True
-        raise HTTPException(
-            status_code=HTTP_403_FORBIDDEN,
-            detail="Invalid API key"
-        )
+        valid = validate_api_key(session, api_key)
+    METRIC_API_KEY_VALIDATION_SECONDS.observe(time.perf_counter() - started, result="valid" if valid else "invalid")
+    if valid:
+        return True
+    raise HTTPException(
+        status_code=HTTP_403_FORBIDDEN,
+        detail="Invalid API key"
+    )
 # ------------------------------------------------------------------------------
 async def cancel_api_key(api_key: str = Security(api_key_header)) -> bool:
     """Cancel the API key and return boolean"""
+    require_database()
     with Session(engine) as session:
         if invalidate_api_key(session, api_key):
             return True
@@ -476,31 +1003,135 @@ def update_bot_info(username: str, full_name: str):
 # ------------------------------------------------------------------------------
 
 
-def generate_wall_sync_payload() -> dict:
-    with (Session(engine) as session):
-        base_query = select(
-            Sticker.sticker_uuid,
-            Sticker.sticker_path,
-            Sticker.visible,
-            Sticker.boost_factor
-        ).where(
-            and_(
-                Sticker.visible == True,
-                Sticker.banned == False
-            )
-        ).order_by(desc(Sticker.boost_factor)).limit(limit=200)  # Show popular stickers first
+def load_wall_channels(session: Session) -> None:
+    global wall_channels
+    wall_channels = {channel.name: serialize_wall_channel(channel) for channel in session.exec(select(WallChannel)).all()}
+# ------------------------------------------------------------------------------
+def serialize_wall_channel(channel: WallChannel) -> dict:
+    return {
+        "name": channel.name,
+        "description": channel.description,
+        "set_names": channel.set_names or None,
+        "emojis": channel.emojis or None,
+        "min_boost": channel.min_boost,
+        "budget": channel.budget,
+        "ranking": channel.ranking,
+        "rotation_slots": channel.rotation_slots or 0
+    }
+# ------------------------------------------------------------------------------
+def get_wall_channel(name: str | None) -> dict:
+    """Settings of a channel - the default channel for an unknown (deleted) one"""
+    return wall_channels.get(name) or wall_channels.get(WALL_CHANNEL_DEFAULT) or {
+        "name": WALL_CHANNEL_DEFAULT, "set_names": None, "emojis": None, "min_boost": 0, "budget": None, "ranking": "boost",
+        "rotation_slots": 0
+    }
+# ------------------------------------------------------------------------------
+def get_wall_channel_budget_max(channel: dict) -> int:
+    return min(channel["budget"], WALL_STICKER_LIMIT_MAX) if channel["budget"] else WALL_STICKER_LIMIT_MAX
+# ------------------------------------------------------------------------------
+def wall_channel_accepts(channel: dict, sticker: dict) -> bool:
+    """Same filters as get_wall_stickers, on a wall message entry (see wall_sticker_entry)"""
+    if channel["set_names"] and sticker.get("set_name") not in channel["set_names"]:
+        return False
+    if channel["emojis"] and sticker.get("emoji") not in channel["emojis"]:
+        return False
+    return (sticker.get("boost_factor") or 0) >= channel["min_boost"]
+# ------------------------------------------------------------------------------
+def wall_sticker_entry(sticker) -> dict:
+    """Sticker in the wall messages - with what the channels filter on"""
+    return {
+        "sticker_id": sticker.sticker_uuid,
+        "path": sticker.sticker_path,
+        "boost_factor": sticker.boost_factor,
+        "set_name": sticker.set_name,
+        "emoji": sticker.emoji
+    }
+# ------------------------------------------------------------------------------
+def route_wall_message(message: dict, channel: dict) -> dict | None:
+    """The message as the walls of a channel get it, None if it has nothing for them"""
+    message_type = message.get("type")
+    data = message.get("data")
+    if message_type == WallMessageType.STICKER_ADD:
+        return message if wall_channel_accepts(channel, data) else None
+    if message_type == WallMessageType.STICKER_ADD_BATCH:
+        stickers = [sticker for sticker in data["stickers"] if wall_channel_accepts(channel, sticker)]
+        if not stickers:
+            return None
+        return {**message, "data": {**data, "stickers": stickers}}
+    return message
+# ------------------------------------------------------------------------------
+def wall_channel_conditions(channel: dict) -> list:
+    """WHERE conditions of the stickers a channel can show"""
+    conditions = [Sticker.visible == True, Sticker.banned == False]
+    if channel["set_names"]:
+        conditions.append(Sticker.set_name.in_(channel["set_names"]))
+    if channel["emojis"]:
+        conditions.append(Sticker.emoji.in_(channel["emojis"]))
+    if channel["min_boost"]:
+        conditions.append(Sticker.boost_factor >= channel["min_boost"])
+    return conditions
+# ------------------------------------------------------------------------------
+def get_wall_rotation_slots(channel: dict, limit: int) -> int:
+    """Stickers of a wall budget kept for the rotation - at most half, the top stays on the wall"""
+    return min(channel.get("rotation_slots") or 0, limit // 2)
+# ------------------------------------------------------------------------------
+def get_wall_stickers(session: Session, limit: int = WALL_STICKER_LIMIT_DEFAULT, channel: dict | None = None) -> list:
+    """Return the top ranked stickers that can be shown on the walls of a channel (default: most popular first)"""
+    channel = channel or get_wall_channel(WALL_CHANNEL_DEFAULT)
+    base_query = select(
+        Sticker.sticker_uuid,
+        Sticker.sticker_path,
+        Sticker.visible,
+        Sticker.boost_factor,
+        Sticker.set_name,
+        Sticker.emoji
+    ).where(*wall_channel_conditions(channel))
+
+    if channel["ranking"] == "newest":
+        base_query = base_query.order_by(desc(Sticker.created_at), desc(Sticker.id))
+    elif channel["ranking"] == "uses":
+        base_query = (
+            base_query.outerjoin(StickerStats, StickerStats.sticker_id == Sticker.id)
+            .order_by(desc(func.coalesce(StickerStats.total_uses, 0)), desc(Sticker.id))
+        )
+    else:
+        base_query = base_query.order_by(desc(Sticker.boost_factor), desc(Sticker.id))  # Show popular stickers first
 
-        stickers = session.exec(base_query).all()
+    return session.exec(base_query.limit(limit=limit)).all()
+# ------------------------------------------------------------------------------
+
+
+def generate_wall_sync_payload(limit: int = WALL_STICKER_LIMIT_DEFAULT, atlas: bool = False, size: int | None = None,
+                               channel: str = WALL_CHANNEL_DEFAULT) -> dict:
+    with (Session(engine) as session):
+        wall_channel = get_wall_channel(channel)
+        rotation_slots = get_wall_rotation_slots(wall_channel, limit)
+        stickers = [
+            (sticker.sticker_uuid, sticker.sticker_path, sticker.boost_factor)
+            for sticker in get_wall_stickers(session, limit - rotation_slots, wall_channel)
+        ]
+        if rotation_slots:
+            # The top, then the newest stickers of the rotation (the older ones are swapped out first)
+            top_uuids = {sticker[0] for sticker in stickers}
+            rotating = [entry for entry in get_wall_rotation_window(wall_channel["name"]) if entry["sticker_id"] not in top_uuids]
+            shown = get_shown_sticker_uuids(session, [entry["sticker_id"] for entry in rotating])
+            stickers += [
+                (entry["sticker_id"], entry["path"], entry["boost_factor"]) for entry in rotating if entry["sticker_id"] in shown
+            ][-rotation_slots:]
+        atlas_frames = get_wall_atlas_frames() if atlas else {}
 
         stickers_data:list = []
 
         # Let's create the sticker payload
-        for sticker in stickers:
+        for sticker_uuid, sticker_path, boost_factor in stickers:
             temp_data = {
-                    "sticker_id": sticker.sticker_uuid,
-                    "path": sticker.sticker_path,
-                    "boost_factor": sticker.boost_factor
+                    "sticker_id": sticker_uuid,
+                    "path": sticker_variant_path(sticker_path, size),
+                    "boost_factor": boost_factor
                 }
+            # Sticker packed in an atlas page - the wall can draw it from the page
+            if sticker_uuid in atlas_frames:
+                temp_data["atlas"] = atlas_frames[sticker_uuid]
             stickers_data.append(temp_data)
 
         sync_message = {
@@ -512,15 +1143,1269 @@ def generate_wall_sync_payload() -> dict:
         return sync_message
 # ------------------------------------------------------------------------------
 
+# ------------------------------------------------------------------------------
+def create_wall_client_state(atlas: bool = False, size: int | None = None, channel: str = WALL_CHANNEL_DEFAULT,
+                             encoding: str = wall_protocol.ENCODING_JSON) -> dict:
+    """Initial state for a new wall client"""
+    return {
+        "budget": min(WALL_STICKER_LIMIT_DEFAULT, get_wall_channel_budget_max(get_wall_channel(channel))),
+        "channel": channel,    # Wall channel subscribed to
+        "encoding": encoding,  # json or msgpack (compact binary frames, see wall_protocol)
+        "atlas": atlas and ATLAS_ENABLED,  # Wall understands atlas frames in wall_sync
+        "size": size,          # Sticker variant size requested by the wall (None = original)
+        "fps": None,           # Smoothed FPS reported by the wall
+        "bodies": 0,           # Bodies in the physics world reported by the wall
+        "last_report": None,
+        "last_adjust": time.monotonic()
+    }
+# ------------------------------------------------------------------------------
+def update_wall_client_budget(state: dict, fps: float, bodies: int) -> bool:
+    """
+    Update the wall client state with the reported stats and adjust the sticker budget.
+
+    The FPS is smoothed (EWMA) so a single slow frame burst does not shrink the wall.
+    If the wall is below WALL_FPS_LOW the budget is cut by WALL_BUDGET_DECREASE_FACTOR,
+    if the wall is above WALL_FPS_HIGH and is actually using its budget, the budget grows
+    by WALL_BUDGET_INCREASE_STEP. Adjustments are spaced by WALL_BUDGET_ADJUST_INTERVAL.
+
+    Returns True when the budget changed
+    """
+    now = time.monotonic()
+
+    state["fps"] = fps if state["fps"] is None else (state["fps"] * 0.7) + (fps * 0.3)
+    state["bodies"] = bodies
+    state["last_report"] = now
+
+    if now - state["last_adjust"] < WALL_BUDGET_ADJUST_INTERVAL:
+        return False
+
+    budget = state["budget"]
+
+    if state["fps"] < WALL_FPS_LOW:
+        budget = max(WALL_STICKER_LIMIT_MIN, int(budget * WALL_BUDGET_DECREASE_FACTOR))
+    elif state["fps"] > WALL_FPS_HIGH and bodies >= budget * 0.9:
+        budget = min(get_wall_channel_budget_max(get_wall_channel(state.get("channel"))), budget + WALL_BUDGET_INCREASE_STEP)
+
+    if budget == state["budget"]:
+        return False
+
+    logging.info(f"Wall budget changed: {state['budget']} -> {budget} (fps: {state['fps']:.1f} / bodies: {bodies})")
+    state["budget"] = budget
+    state["last_adjust"] = now
+    return True
+# ------------------------------------------------------------------------------
+
+
+
+# ######################################################################
+# Sticker media section
+# ######################################################################
+# ------------------------------------------------------------------------------
+def parse_sticker_size(size: str | None) -> int | None:
+    """Convert the size requested by a client ("thumb", "128"...) to a variant size or None for the original"""
+    if not size:
+        return None
+    if size == "thumb":
+        return STICKER_THUMBNAIL_SIZE
+    try:
+        size = int(size)
+    except ValueError:
+        return None
+    return size if size in STICKER_VARIANT_SIZES else None
+# ------------------------------------------------------------------------------
+def sticker_variant_path(sticker_path: str | None, size: int | None) -> str | None:
+    """
+    URL path of a sticker variant (relative to the static folder):
+    stickers/<name>.webp -> stickers/<size>/<name>.webp (the original while the variants are created)
+    """
+    if not sticker_path or size is None or sticker_path in sticker_variants_pending:
+        return sticker_path
+
+    directory, _, file_name = sticker_path.rpartition("/")
+    name = file_name.rsplit(".", 1)[0]
+    return f"{directory}/{size}/{name}.webp" if directory else f"{size}/{name}.webp"
+# ------------------------------------------------------------------------------
+async def run_in_media_pool(func, *args):
+    """Run a sticker_processing function in the media process pool (thread pool if there is no pool)"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    METRIC_MEDIA_POOL_PENDING.inc()
+    try:
+        return await loop.run_in_executor(media_process_pool, func, *args)
+    finally:
+        METRIC_MEDIA_POOL_PENDING.dec()
+        METRIC_MEDIA_TASK_SECONDS.observe(time.perf_counter() - started, task=func.__name__)
+# ------------------------------------------------------------------------------
+async def create_sticker_variants(file_path: str) -> bool:
+    """Create the size variants of a sticker file. Returns False if it failed (the original is still usable)"""
+    try:
+        await run_in_media_pool(sticker_processing.generate_variants, file_path, STICKER_VARIANT_SIZES)
+        return True
+    except Exception as e:
+        logging.error(f"Error creating the variants of {file_path}: {e}")
+        return False
+# ------------------------------------------------------------------------------
+def schedule_sticker_variants(sticker_path: str) -> None:
+    """Create the variants of a new sticker in the background - the ingest broadcasts without waiting for the pool"""
+    sticker_variants_pending.add(sticker_path)
+
+    async def create():
+        started = time.perf_counter()
+        if await create_sticker_variants(os.path.join("static", sticker_path)):
+            sticker_variants_pending.discard(sticker_path)
+        METRIC_INGEST_STAGE_SECONDS.observe(time.perf_counter() - started, stage="variants")
+
+    task = asyncio.create_task(create())
+    sticker_variant_tasks.add(task)
+    task.add_done_callback(sticker_variant_tasks.discard)
+# ------------------------------------------------------------------------------
+async def transcode_animated_sticker(sticker_data: bytes, sticker_format: str) -> str:
+    """Transcode an animated/video sticker (process pool). Returns the cached webp file"""
+    digest = hashlib.sha256(sticker_data).hexdigest()
+    # The caps are part of the name - changing them creates new files
+    cache_path = os.path.join(
+        TRANSCODE_CACHE_DIRECTORY,
+        f"{digest}-{ANIMATED_MAX_SIZE}-{ANIMATED_MAX_FRAMES}-{ANIMATED_MAX_FPS}.webp"
+    )
+    if os.path.exists(cache_path):
+        return cache_path
+
+    async def transcode():
+        os.makedirs(TRANSCODE_CACHE_DIRECTORY, exist_ok=True)
+        source_path = os.path.join(TRANSCODE_CACHE_DIRECTORY, f"{digest}.{sticker_format}")
+        with open(source_path, "wb") as f:
+            f.write(sticker_data)
+        try:
+            result = await run_in_media_pool(
+                sticker_processing.transcode_animated,
+                source_path, sticker_format, cache_path,
+                ANIMATED_MAX_SIZE, ANIMATED_MAX_FRAMES, ANIMATED_MAX_FPS
+            )
+        finally:
+            os.remove(source_path)
+        logging.info(f"Transcoded {sticker_format} sticker: {result['frames']} frames {result['width']}x{result['height']}")
+        return cache_path
+
+    if digest not in transcode_tasks:
+        transcode_tasks[digest] = asyncio.create_task(transcode())
+        transcode_tasks[digest].add_done_callback(lambda _: transcode_tasks.pop(digest, None))
+    return await asyncio.shield(transcode_tasks[digest])
+# ------------------------------------------------------------------------------
+async def save_sticker_file(sticker_id: str, sticker_data: bytes) -> tuple | None:
+    """
+    Save a sticker received from the bot in the static directory, always as webp.
+
+    The format is detected from the content (the bot may not know it). Animated
+    and video stickers are transcoded. The file is written and hashed by one
+    media pool task. Returns (path relative to "static", perceptual hash or None),
+    or None if the sticker can't be used.
+    """
+    sticker_format = sticker_processing.detect_sticker_format(sticker_data)
+    file_name = f"{sticker_id}.webp"
+    file_path = os.path.join("static/stickers", file_name)
+
+    try:
+        if sticker_format == "webp":
+            value = await run_in_media_pool(sticker_processing.store_sticker_file, file_path, sticker_data)
+        elif sticker_format in ("tgs", "webm"):
+            cache_path = await transcode_animated_sticker(sticker_data, sticker_format)
+            value = await run_in_media_pool(sticker_processing.store_sticker_file, file_path, None, cache_path)
+        else:
+            logging.warning(f"Unknown sticker format for {sticker_id} - ignored")
+            return None
+    except Exception as e:
+        logging.error(f"Error saving the {sticker_format} sticker {sticker_id}: {e}")
+        return None
+
+    if value is None:
+        logging.error(f"Error hashing {file_path}")
+    return f"stickers/{file_name}", near_duplicates.hash_to_text(value) if value is not None else None
+# ------------------------------------------------------------------------------
+async def backfill_sticker_variants() -> None:
+    """Create the variants of the stickers stored before the variants existed"""
+    await database_ready.wait()
+    with Session(engine) as session:
+        sticker_paths = session.exec(select(Sticker.sticker_path).where(Sticker.sticker_path != None)).all()
+
+    created = 0
+    for sticker_path in sticker_paths:
+        file_path = os.path.join("static", sticker_path)
+        largest_variant = os.path.join("static", sticker_variant_path(sticker_path, max(STICKER_VARIANT_SIZES)))
+        if os.path.exists(largest_variant) or not os.path.exists(file_path):
+            continue
+        if await create_sticker_variants(file_path):
+            created += 1
+
+    if created:
+        logging.info(f"Created variants for {created} sticker(s)")
+# ------------------------------------------------------------------------------
+async def compute_perceptual_hash(file_path: str) -> str | None:
+    """Perceptual hash of a sticker file (process pool), None if the image can't be read"""
+    try:
+        return near_duplicates.hash_to_text(await run_in_media_pool(sticker_processing.perceptual_hash, file_path))
+    except Exception as e:
+        logging.error(f"Error hashing {file_path}: {e}")
+        return None
+# ------------------------------------------------------------------------------
+def load_banned_hash_index(session: Session) -> None:
+    global banned_hash_index
+    banned_hash_index = near_duplicates.MultiIndexHashTable(NEAR_DUPLICATE_DISTANCE)
+    rows = session.exec(
+        select(Sticker.id, Sticker.perceptual_hash)
+        .where(Sticker.banned == True)
+        .where(Sticker.perceptual_hash.is_not(None))
+    ).all()
+    for sticker_id, perceptual_hash in rows:
+        banned_hash_index.add(near_duplicates.hash_from_text(perceptual_hash), sticker_id)
+    logging.info(f"Near duplicate index: {banned_hash_index.size} banned sticker hash(es)")
+# ------------------------------------------------------------------------------
+def update_banned_hash_index(sticker: Sticker) -> None:
+    """Follow a ban / unban of a sticker"""
+    if not sticker.perceptual_hash:
+        return
+    value = near_duplicates.hash_from_text(sticker.perceptual_hash)
+    if sticker.banned:
+        banned_hash_index.add(value, sticker.id)
+    else:
+        banned_hash_index.remove(value, sticker.id)
+# ------------------------------------------------------------------------------
+def find_banned_near_duplicate(perceptual_hash: str) -> tuple | None:
+    """(distance, database id) of the closest banned sticker, None if there is none close enough"""
+    started = time.perf_counter()
+    nearest = banned_hash_index.find_nearest(near_duplicates.hash_from_text(perceptual_hash), NEAR_DUPLICATE_DISTANCE)
+    METRIC_NEAR_DUPLICATE_LOOKUP_SECONDS.observe(time.perf_counter() - started)
+    if nearest is None:
+        return None
+    distance, _, sticker_id = nearest
+    return distance, sticker_id
+# ------------------------------------------------------------------------------
+async def backfill_perceptual_hashes() -> None:
+    """Hash the stickers stored before the perceptual hashes existed (banned ones first)"""
+    await database_ready.wait()
+    with Session(engine) as session:
+        rows = session.exec(
+            select(Sticker.id, Sticker.sticker_path)
+            .where(Sticker.perceptual_hash.is_(None))
+            .where(Sticker.sticker_path.is_not(None))
+            .order_by(desc(Sticker.banned), Sticker.id)
+        ).all()
+
+    hashed = 0
+    for start in range(0, len(rows), NEAR_DUPLICATE_BACKFILL_BATCH):
+        hashes = {}
+        for sticker_id, sticker_path in rows[start:start + NEAR_DUPLICATE_BACKFILL_BATCH]:
+            file_path = os.path.join("static", sticker_path)
+            if os.path.exists(file_path):
+                perceptual_hash = await compute_perceptual_hash(file_path)
+                if perceptual_hash:
+                    hashes[sticker_id] = perceptual_hash
+
+        # Written per batch - short transactions, the ingest is not blocked
+        with Session(engine) as session:
+            for sticker in session.exec(select(Sticker).where(Sticker.id.in_(list(hashes)))).all():
+                sticker.perceptual_hash = hashes[sticker.id]
+                if sticker.banned:
+                    update_banned_hash_index(sticker)
+            session.commit()
+        hashed += len(hashes)
+
+    if hashed:
+        logging.info(f"Computed the perceptual hash of {hashed} sticker(s)")
+# ------------------------------------------------------------------------------
+def localize_wall_message(message: dict, size: int | None) -> dict:
+    """Return the wall message with the sticker paths pointing to the size variant requested by the wall"""
+    data = message.get("data")
+    if size is None or not isinstance(data, dict):
+        return message
+    if data.get("stickers"):
+        return {**message, "data": {**data, "stickers": [
+            {**sticker, "path": sticker_variant_path(sticker["path"], size)} for sticker in data["stickers"]
+        ]}}
+    if not data.get("path"):
+        return message
+    return {**message, "data": {**data, "path": sticker_variant_path(data["path"], size)}}
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Sticker media section
+# ######################################################################
+
+
+
+# ######################################################################
+# Wall atlas section
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_wall_atlas_frames() -> dict:
+    """Return sticker_uuid -> {"page", "x", "y", "w", "h"} for every sticker in the atlas"""
+    frames = {}
+    for page in wall_atlas["pages"]:
+        if not page["file"]:
+            continue
+        for key, frame in page["frames"].items():
+            frames[key] = {"page": page["file"], **frame}
+    return frames
+# ------------------------------------------------------------------------------
+def get_atlas_source_file(sticker_path: str) -> str:
+    """Smallest sticker file that still fills an atlas cell (less to decode than the original)"""
+    for size in sorted(STICKER_VARIANT_SIZES):
+        if size >= ATLAS_CELL_SIZE:
+            variant_file = os.path.join("static", sticker_variant_path(sticker_path, size))
+            if os.path.exists(variant_file):
+                return variant_file
+    return os.path.join("static", sticker_path)
+# ------------------------------------------------------------------------------
+async def refresh_wall_atlas() -> None:
+    """
+    Bring the atlas in line with the current top stickers.
+
+    The rebuild is incremental: stickers that dropped out only free their slot
+    (the page stays valid), new stickers take free slots and only the pages
+    that got new stickers are rendered again (in a worker thread). A page with
+    a banned, hidden or deleted sticker is rendered again without it, under a
+    new name (the pages are cached as immutable), and its old file is removed.
+    """
+    async with wall_atlas_lock:
+        with Session(engine) as session:
+            stickers = get_wall_stickers(session, WALL_STICKER_LIMIT_MAX)
+        wanted = {sticker.sticker_uuid: sticker.sticker_path for sticker in stickers}
+
+        pages = wall_atlas["pages"]
+        dirty_pages = {index for index, page in enumerate(pages) if page.get("dirty") or page.get("purge")}
+
+        # The files replaced one refresh ago are not used by any recent sync anymore
+        for old_file in wall_atlas["retired"]:
+            try:
+                os.remove(os.path.join("static", old_file))
+            except OSError:
+                pass
+        wall_atlas["retired"] = []
+
+        # Free the slots of the stickers that are not in the top anymore
+        freed = {}
+        for index, page in enumerate(pages):
+            for slot, key in enumerate(page["slots"]):
+                if key is not None and key not in wanted:
+                    page["slots"][slot] = None
+                    page["frames"].pop(key, None)
+                    freed[key] = index
+
+        # Moderated stickers must leave the page images too, not only the frames
+        if freed:
+            with Session(engine) as session:
+                shown = set()
+                keys = list(freed)
+                for chunk_start in range(0, len(keys), STICKERS_SEARCH_CHUNK):
+                    shown.update(session.exec(
+                        select(Sticker.sticker_uuid)
+                        .where(Sticker.sticker_uuid.in_(keys[chunk_start:chunk_start + STICKERS_SEARCH_CHUNK]))
+                        .where(Sticker.visible == True, Sticker.banned == False)
+                    ).all())
+            for key, index in freed.items():
+                if key not in shown and pages[index]["file"]:
+                    pages[index]["purge"] = True  # Kept until the page is built again without it
+                    dirty_pages.add(index)
+
+        # Place the new stickers (best ranked first) in the free slots
+        placed = {key for page in pages for key in page["slots"] if key is not None}
+        for key in wanted:
+            if key in placed:
+                continue
+
+            target = None
+            for index, page in enumerate(pages):
+                if None in page["slots"]:
+                    target = index
+                    break
+
+            if target is None:
+                pages.append({"slots": [None] * ATLAS_PAGE_SLOTS, "file": None, "frames": {}})
+                target = len(pages) - 1
+
+            pages[target]["slots"][pages[target]["slots"].index(None)] = key
+            dirty_pages.add(target)
+
+        loop = asyncio.get_running_loop()
+        for index in sorted(dirty_pages):
+            page = pages[index]
+            cells = [
+                (key, get_atlas_source_file(wanted[key])) if key is not None else None
+                for key in page["slots"]
+            ]
+            version = hashlib.sha1(json.dumps(cells).encode()).hexdigest()[:16]
+            page_file = f"{ATLAS_DIRECTORY}/{version}.webp"
+
+            try:
+                frames = await loop.run_in_executor(
+                    None,
+                    sticker_processing.build_atlas_page,
+                    cells, ATLAS_CELL_SIZE, ATLAS_COLUMNS, os.path.join("static", page_file)
+                )
+            except Exception as e:
+                logging.error(f"Error building atlas page {index}: {e}")
+                page["dirty"] = True  # Its new slots are retried by the next refresh
+                continue
+
+            old_file = page["file"]
+            page["file"] = page_file
+            page["frames"] = frames
+            page["dirty"] = False
+            purge = page.pop("purge", False)
+
+            if old_file and old_file != page_file:
+                if purge:
+                    try:
+                        os.remove(os.path.join("static", old_file))
+                    except OSError:
+                        pass
+                else:
+                    wall_atlas["retired"].append(old_file)
+
+        if dirty_pages:
+            logging.info(f"Atlas updated: {len(dirty_pages)} page(s) rebuilt, {len(pages)} page(s) total")
+# ------------------------------------------------------------------------------
+def clear_wall_atlas_files() -> None:
+    """Remove the atlas pages left by a previous run (the atlas lives in memory) - except the ones loaded from the snapshot"""
+    atlas_path = os.path.join("static", ATLAS_DIRECTORY)
+    if not os.path.isdir(atlas_path):
+        return
+
+    kept = {os.path.basename(page["file"]) for page in wall_atlas["pages"] if page["file"]}
+    for entry in os.scandir(atlas_path):
+        if entry.is_file() and entry.name.endswith((".webp", ".tmp")) and entry.name not in kept:
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logging.warning(f"Could not remove old atlas page {entry.name}: {e}")
+# ------------------------------------------------------------------------------
+def schedule_wall_atlas_refresh() -> None:
+    """Refresh the atlas a little later - many changes in a burst end in a single rebuild"""
+    global wall_atlas_refresh_task
+
+    if not ATLAS_ENABLED:
+        return
+
+    wall_atlas["dirty"] = True
+
+    # A refresh is already on the way - it will loop again for the changes done meanwhile
+    if wall_atlas_refresh_task and not wall_atlas_refresh_task.done():
+        return
+
+    async def delayed_refresh():
+        while wall_atlas["dirty"]:
+            wall_atlas["dirty"] = False
+            await asyncio.sleep(ATLAS_REBUILD_DELAY)
+            try:
+                await refresh_wall_atlas()
+            except Exception as e:
+                logging.error(f"Error refreshing the atlas: {e}")
+
+    wall_atlas_refresh_task = asyncio.create_task(delayed_refresh())
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Wall atlas section
+# ######################################################################
+
+
+
+# ######################################################################
+# Static files section
+# ######################################################################
+# ------------------------------------------------------------------------------
+async def build_static_asset_manifest() -> None:
+    """
+    Hash and precompress the static assets (in a thread - zlib and brotli release the GIL)
+    and publish the manifest. Not in the media pool: the new stickers would wait behind it
+    """
+    try:
+        manifest = await asyncio.to_thread(
+            static_assets.build_asset_manifest,
+            "static", STATIC_CACHE_DIRECTORY, ("stickers", ATLAS_DIRECTORY)
+        )
+    except Exception as e:
+        logging.error(f"Error building the static asset manifest: {e}")
+        return
+
+    static_asset_manifest.clear()
+    static_asset_manifest.update(manifest)
+    static_html_cache.clear()
+    compressed = sum(1 for entry in manifest.values() if entry["encodings"])
+    logging.info(f"Static assets: {len(manifest)} hashed, {compressed} precompressed")
+# ------------------------------------------------------------------------------
+def fingerprint_html(html: str, page_path: str) -> str:
+    """Point the local src/href of a HTML page to the fingerprinted URL (?v=<hash>)"""
+    page_directory = os.path.dirname(page_path)
+
+    def replace(match):
+        url = match.group(2)
+        if url.startswith("/"):
+            asset_path = os.path.normpath(url.lstrip("/"))
+        else:
+            asset_path = os.path.normpath(os.path.join(page_directory, url))
+        entry = static_asset_manifest.get(asset_path.replace(os.sep, "/"))
+        if entry is None:
+            return match.group(0)
+        return f'{match.group(1)}="{url}?v={entry["hash"]}"'
+
+    # Local URLs only (no scheme, no anchor) - the old ?version query is replaced
+    return re.sub(r'\b(src|href)="([^"#:?]+)(?:\?[^"]*)?"', replace, html)
+# ------------------------------------------------------------------------------
+def accepted_encodings(request_headers: Headers) -> set:
+    """Encodings accepted by the client (ignores the ones with q=0)"""
+    accepted = set()
+    for item in request_headers.get("accept-encoding", "").split(","):
+        encoding, _, params = item.strip().partition(";")
+        if encoding and params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(encoding.strip().lower())
+    return accepted
+# ------------------------------------------------------------------------------
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles with cache headers and precompressed assets.
+
+    - Fingerprinted URLs (?v=<hash> matching the content) and atlas pages: immutable
+    - Stickers: cached for STATIC_STICKER_MAX_AGE
+    - Everything else: no-cache (the browser revalidates, we answer 304)
+    - HTML pages are served with the asset URLs fingerprinted
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        request_headers = Headers(scope=scope)
+        relative_path = os.path.relpath(full_path, os.path.realpath(self.directory)).replace(os.sep, "/")
+
+        if relative_path.endswith(".html") and status_code == 200:
+            return self.html_response(full_path, stat_result, relative_path, request_headers)
+
+        entry = static_asset_manifest.get(relative_path)
+        headers = {}
+
+        version = QueryParams(scope.get("query_string", b"")).get("v")
+        if (entry and version == entry["hash"]) or relative_path.startswith(f"{ATLAS_DIRECTORY}/"):
+            headers["cache-control"] = f"public, max-age={STATIC_IMMUTABLE_MAX_AGE}, immutable"
+        elif relative_path.startswith("stickers/"):
+            headers["cache-control"] = f"public, max-age={STATIC_STICKER_MAX_AGE}"
+        else:
+            headers["cache-control"] = "no-cache"
+
+        if entry is None:
+            # Not hashed (stickers, new files...) - the mtime/size ETag of Starlette is enough
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+        else:
+            encodings = entry["encodings"]
+            if encodings:
+                headers["vary"] = "Accept-Encoding"
+
+            accepted = accepted_encodings(request_headers)
+            encoding = next((e for e in ("br", "gzip") if e in encodings and e in accepted), None)
+            compressed_stat = None
+            if encoding:
+                try:
+                    compressed_stat = os.stat(encodings[encoding])
+                except OSError:
+                    encoding = None  # Removed from the cache directory - serve the original
+
+            if encoding:
+                headers["content-encoding"] = encoding
+                headers["etag"] = f'"{entry["hash"]}-{encoding}"'
+                response = FileResponse(
+                    encodings[encoding],
+                    status_code=status_code,
+                    stat_result=compressed_stat,
+                    headers=headers,
+                    media_type=mimetypes.guess_type(str(full_path))[0] or "text/plain"
+                )
+            else:
+                headers["etag"] = f'"{entry["hash"]}"'
+                response = FileResponse(full_path, status_code=status_code, stat_result=stat_result, headers=headers)
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def html_response(self, full_path, stat_result, relative_path: str, request_headers: Headers) -> Response:
+        cached = static_html_cache.get(relative_path)
+        if not cached or cached[0] != stat_result.st_mtime_ns:
+            with open(full_path, "r", encoding="utf-8") as f:
+                body = fingerprint_html(f.read(), relative_path).encode("utf-8")
+            etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+            cached = (stat_result.st_mtime_ns, body, gzip.compress(body, mtime=0), etag)
+            static_html_cache[relative_path] = cached
+
+        _, body, compressed_body, etag = cached
+        headers = {"cache-control": "no-cache", "etag": etag, "vary": "Accept-Encoding"}
+
+        if self.is_not_modified(Headers(headers), request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        if "gzip" in accepted_encodings(request_headers) and len(compressed_body) < len(body):
+            headers["content-encoding"] = "gzip"
+            body = compressed_body
+        return Response(content=body, media_type="text/html", headers=headers)
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Static files section
+# ######################################################################
+
+
+
+# ######################################################################
+# Loop monitor section
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_route_handler_codes() -> dict:
+    """code object -> handler name ("GET /api/stickers", "WS /ws/wall"...) of every route"""
+    handler_codes = {}
+    for route in app.routes:
+        endpoint = getattr(route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            continue
+        methods = getattr(route, "methods", None)
+        prefix = ",".join(sorted(methods)) if methods else "WS"
+        handler_codes[code] = f"{prefix} {route.path}"
+    return handler_codes
+# ------------------------------------------------------------------------------
+def on_loop_lag(lag: float) -> None:
+    METRIC_LOOP_LAG_SECONDS.observe(lag)
+# ------------------------------------------------------------------------------
+def on_slow_callback(event: dict) -> None:
+    METRIC_LOOP_BLOCKED_SECONDS.inc(event["duration"], handler=event["handler"])
+    logging.warning(f"Event loop blocked {event['duration']:.3f}s by {event['handler']} - {event['stack'][-1]}")
+# ------------------------------------------------------------------------------
+def start_loop_monitor() -> asyncio.Task:
+    """Start the event loop monitor. Returns the task writing the profile dumps"""
+    global event_loop_monitor
+    event_loop_monitor = loop_monitor.LoopMonitor(
+        get_route_handler_codes(),
+        threshold=LOOP_MONITOR_THRESHOLD,
+        on_lag=on_loop_lag,
+        on_slow_callback=on_slow_callback
+    )
+    event_loop_monitor.start()
+    logging.info(f"Event loop monitor started (threshold {LOOP_MONITOR_THRESHOLD}s)")
+
+    async def dump_periodically():
+        while True:
+            await asyncio.sleep(LOOP_MONITOR_DUMP_INTERVAL)
+            try:
+                await asyncio.to_thread(event_loop_monitor.dump, LOOP_MONITOR_DUMP_DIRECTORY, LOOP_MONITOR_DUMP_KEEP)
+            except Exception as e:
+                logging.error(f"Error writing the loop monitor dump: {e}")
+
+    return asyncio.create_task(dump_periodically())
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Loop monitor section
+# ######################################################################
+
+
+
+# ######################################################################
+# Latency tracing section
+# ######################################################################
+# ------------------------------------------------------------------------------
+def record_trace_stage(stage: str, seconds: float) -> None:
+    # Stages measured with two clocks (bot and server) can be a bit negative
+    seconds = max(0.0, seconds)
+    trace_stage_samples.setdefault(stage, deque(maxlen=TRACE_MAX_SAMPLES)).append(seconds)
+    METRIC_TRACE_STAGE_SECONDS.observe(seconds, stage=stage)
+# ------------------------------------------------------------------------------
+def start_sticker_trace(message: dict) -> dict | None:
+    """Read the trace sent by the bot with a sticker and record the bot stages"""
+    trace = message.get("trace")
+    if not isinstance(trace, dict) or not isinstance(trace.get("id"), str):
+        return None  # Old bot - no trace
+
+    try:
+        trace = {
+            "id": trace["id"][:64],
+            "telegram_at": float(trace.get("telegram_at") or 0),
+            "bot_received_at": float(trace["bot_received_at"]),
+            "bot_sent_at": float(trace["bot_sent_at"]),
+            "server_received_at": time.time()
+        }
+    except (KeyError, TypeError, ValueError):
+        logging.warning(f"Invalid sticker trace received: {message.get('trace')}")
+        return None
+
+    if trace["telegram_at"]:
+        record_trace_stage("telegram_to_bot", trace["bot_received_at"] - trace["telegram_at"])
+    record_trace_stage("bot_download", trace["bot_sent_at"] - trace["bot_received_at"])
+    record_trace_stage("bot_to_server", trace["server_received_at"] - trace["bot_sent_at"])
+    return trace
+# ------------------------------------------------------------------------------
+def broadcast_sticker_trace(trace: dict, walls: set) -> None:
+    """The sticker was sent to the walls - wait for their render reports (the walls are not authenticated)"""
+    trace["broadcast_at"] = time.time()
+    record_trace_stage("server_ingest", trace["broadcast_at"] - trace["server_received_at"])
+
+    # Expired traces first (oldest first), walls gone or not reporting
+    while sticker_traces and next(iter(sticker_traces.values()))["broadcast_at"] < trace["broadcast_at"] - TRACE_TTL:
+        sticker_traces.popitem(last=False)
+    if not walls:
+        return
+
+    trace["walls"] = set(walls)  # Walls that can still report, once each
+    sticker_traces[trace["id"]] = trace
+    while len(sticker_traces) > TRACE_MAX_PENDING:
+        sticker_traces.popitem(last=False)
+# ------------------------------------------------------------------------------
+def complete_sticker_trace(trace_id, render_ms, wall: WebSocket) -> None:
+    """A wall rendered the sticker - one report per wall the sticker was sent to, then the trace is dropped"""
+    trace = sticker_traces.get(trace_id) if isinstance(trace_id, str) else None
+    if trace is None or wall not in trace["walls"]:
+        return  # Unknown, too old or already reported by this wall
+
+    now = time.time()
+    if now - trace["broadcast_at"] > TRACE_TTL:
+        sticker_traces.pop(trace_id, None)
+        return
+
+    try:
+        render_seconds = float(render_ms) / 1000
+    except (TypeError, ValueError):
+        return
+    # NaN fails the comparisons - a render can't take longer than the time since the broadcast
+    if not (0.0 <= render_seconds <= min(TRACE_MAX_RENDER_MS / 1000, now - trace["broadcast_at"])):
+        logging.warning(f"Invalid wall render time received: {render_ms}")
+        return
+
+    trace["walls"].discard(wall)
+    if not trace["walls"]:
+        sticker_traces.pop(trace_id, None)
+
+    # Network to the wall and back - the render time is measured by the wall itself
+    record_trace_stage("wall_delivery", now - trace["broadcast_at"] - render_seconds)
+    record_trace_stage("wall_render", render_seconds)
+    record_trace_stage("end_to_end", now - trace["bot_received_at"])
+# ------------------------------------------------------------------------------
+def get_trace_latency_summary() -> dict:
+    """stage -> count and p50/p95/p99/max in milliseconds"""
+    summary = {}
+    for stage, samples in trace_stage_samples.items():
+        values = list(samples)
+        summary[stage] = {
+            "count": len(values),
+            "p50": round(metrics.percentile(values, 0.50) * 1000, 1),
+            "p95": round(metrics.percentile(values, 0.95) * 1000, 1),
+            "p99": round(metrics.percentile(values, 0.99) * 1000, 1),
+            "max": round(max(values) * 1000, 1) if values else 0.0
+        }
+    return summary
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Latency tracing section
+# ######################################################################
+
+
+
+# ######################################################################
+# Activity rollups section
+# ######################################################################
+# ------------------------------------------------------------------------------
+def sqlite_datetime(moment: datetime) -> str:
+    # Parameter for the raw SQL queries - same text as SQLAlchemy stores in the datetime columns
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f")
+# ------------------------------------------------------------------------------
+def get_bucket_start(moment: datetime, resolution: str) -> datetime:
+    if resolution == "minute":
+        return moment.replace(second=0, microsecond=0)
+    return moment.replace(minute=0, second=0, microsecond=0)
+# ------------------------------------------------------------------------------
+def record_sticker_activity(session: Session, user_id: int, sticker_id: int, sent_at: datetime) -> None:
+    """
+    Update the counters and the activity buckets for one sticker sent.
+
+    Must be called in the ingest transaction, before the telegram_user_stickers row is
+    added. Everything is a primary key / index lookup, whatever the size of the history.
+    The rows blocked by policy (near duplicates) are not counted, here or in the rebuild.
+    """
+    first_time_pair = session.exec(
+        select(TelegramUserSticker.id)
+        .where(TelegramUserSticker.user_id == user_id)
+        .where(TelegramUserSticker.sticker_id == sticker_id)
+        .where(TelegramUserSticker.blocked_by_policy == False)
+        .limit(1)
+    ).first() is None
+
+    sticker_stats = session.get(StickerStats, sticker_id)
+    new_sticker = sticker_stats is None
+    if new_sticker:
+        sticker_stats = StickerStats(sticker_id=sticker_id, first_used_at=sent_at)
+        session.add(sticker_stats)
+
+    user_stats = session.get(TelegramUserStats, user_id)
+    new_user = user_stats is None
+    if new_user:
+        user_stats = TelegramUserStats(user_id=user_id, first_sent_at=sent_at)
+        session.add(user_stats)
+
+    for resolution in STATS_RESOLUTIONS:
+        bucket_start = get_bucket_start(sent_at, resolution)
+        bucket = session.get(ActivityBucket, (resolution, bucket_start))
+        if bucket is None:
+            bucket = ActivityBucket(resolution=resolution, bucket_start=bucket_start)
+            session.add(bucket)
+            if resolution == "hour":
+                # Once per hour - drop the minute buckets nobody looks at anymore
+                session.exec(
+                    delete(ActivityBucket)
+                    .where(ActivityBucket.resolution == "minute")
+                    .where(ActivityBucket.bucket_start < sent_at - timedelta(hours=STATS_MINUTE_RETENTION_HOURS))
+                )
+
+        bucket.uses += 1
+        # Not seen since the bucket started = first time in this bucket
+        if user_stats.last_sent_at is None or user_stats.last_sent_at < bucket_start:
+            bucket.active_users += 1
+        if sticker_stats.last_used_at is None or sticker_stats.last_used_at < bucket_start:
+            bucket.active_stickers += 1
+        bucket.new_users += int(new_user)
+        bucket.new_stickers += int(new_sticker)
+
+    sticker_stats.total_uses += 1
+    sticker_stats.unique_users += int(first_time_pair)
+    sticker_stats.last_used_at = sent_at
+
+    user_stats.total_stickers += 1
+    user_stats.unique_stickers += int(first_time_pair)
+    user_stats.last_sent_at = sent_at
+# ------------------------------------------------------------------------------
+def rebuild_activity_rollups(session: Session) -> None:
+    """
+    Compute all the rollups again from the sticker history - telegram_user_stickers and
+    the archive files (first start after an upgrade, or on request)
+    """
+    started = time.perf_counter()
+    for table in ("sticker_stats", "telegram_user_stats", "activity_buckets"):
+        session.exec(text(f"DELETE FROM {table}"))
+
+    # Archived rows in a temporary table (a row archived twice after a crash is counted once)
+    session.exec(text(
+        "CREATE TEMP TABLE IF NOT EXISTS archived_user_stickers "
+        "(id INTEGER PRIMARY KEY, user_id INTEGER, sticker_id INTEGER, sent_at DATETIME)"
+    ))
+    session.exec(text("DELETE FROM temp.archived_user_stickers"))
+    batch = []
+    for row in history_archive.read_rows(HISTORY_ARCHIVE_DIRECTORY):
+        if row.get("blocked_by_policy"):
+            continue
+        batch.append({
+            "id": row["id"], "user_id": row["user_id"], "sticker_id": row["sticker_id"],
+            "sent_at": sqlite_datetime(datetime.fromisoformat(row["sent_at"]))
+        })
+        if len(batch) >= 10000:
+            session.exec(text("INSERT OR IGNORE INTO temp.archived_user_stickers VALUES (:id, :user_id, :sticker_id, :sent_at)"), params=batch)
+            batch = []
+    if batch:
+        session.exec(text("INSERT OR IGNORE INTO temp.archived_user_stickers VALUES (:id, :user_id, :sticker_id, :sent_at)"), params=batch)
+
+    history = (
+        "(SELECT user_id, sticker_id, sent_at FROM telegram_user_stickers WHERE blocked_by_policy = 0 "
+        " UNION ALL SELECT user_id, sticker_id, sent_at FROM temp.archived_user_stickers "
+        " WHERE id NOT IN (SELECT id FROM telegram_user_stickers)) AS history"
+    )
+
+    session.exec(text(
+        "INSERT INTO sticker_stats (sticker_id, total_uses, unique_users, first_used_at, last_used_at) "
+        "SELECT sticker_id, COUNT(*), COUNT(DISTINCT user_id), MIN(sent_at), MAX(sent_at) "
+        f"FROM {history} GROUP BY sticker_id"
+    ))
+    session.exec(text(
+        "INSERT INTO telegram_user_stats (user_id, total_stickers, unique_stickers, first_sent_at, last_sent_at) "
+        "SELECT user_id, COUNT(*), COUNT(DISTINCT sticker_id), MIN(sent_at), MAX(sent_at) "
+        f"FROM {history} GROUP BY user_id"
+    ))
+
+    minute_since = get_bucket_start(datetime.now() - timedelta(hours=STATS_MINUTE_RETENTION_HOURS), "hour")
+    for resolution, bucket_format in STATS_RESOLUTIONS.items():
+        since = minute_since if resolution == "minute" else datetime.min
+        parameters = {"resolution": resolution, "format": bucket_format, "since": sqlite_datetime(since)}
+        session.exec(text(
+            "INSERT INTO activity_buckets "
+            "(resolution, bucket_start, uses, active_users, active_stickers, new_users, new_stickers) "
+            "SELECT :resolution, strftime(:format, sent_at) AS bucket, COUNT(*), COUNT(DISTINCT user_id), "
+            "COUNT(DISTINCT sticker_id), 0, 0 "
+            f"FROM {history} WHERE sent_at >= :since GROUP BY bucket"
+        ), params=parameters)
+        # First sticker of each user / first use of each sticker - from the counters computed above
+        for column, table, first_column in (("new_users", "telegram_user_stats", "first_sent_at"),
+                                            ("new_stickers", "sticker_stats", "first_used_at")):
+            session.exec(text(
+                f"UPDATE activity_buckets SET {column} = firsts.count "
+                f"FROM (SELECT strftime(:format, {first_column}) AS bucket, COUNT(*) AS count "
+                f"      FROM {table} WHERE {first_column} >= :since GROUP BY bucket) AS firsts "
+                f"WHERE activity_buckets.resolution = :resolution AND activity_buckets.bucket_start = firsts.bucket"
+            ), params=parameters)
+
+    session.exec(text("DROP TABLE temp.archived_user_stickers"))
+    session.commit()
+    logging.info(f"Activity rollups rebuilt in {time.perf_counter() - started:.2f}s")
+# ------------------------------------------------------------------------------
+def serialize_activity_bucket(bucket: ActivityBucket) -> dict:
+    return {
+        "bucket_start": bucket.bucket_start.isoformat(),
+        "uses": bucket.uses,
+        "active_users": bucket.active_users,
+        "active_stickers": bucket.active_stickers,
+        "new_users": bucket.new_users,
+        "new_stickers": bucket.new_stickers
+    }
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Activity rollups section
+# ######################################################################
+
+
+
+# ######################################################################
+# History retention section
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_database_file_size() -> int:
+    try:
+        return os.path.getsize(sqlite_file_path)
+    except OSError:
+        return 0
+# ------------------------------------------------------------------------------
+def archive_history_batch(cutoff: datetime, after_id: int) -> tuple:
+    """
+    Move one batch of old telegram_user_stickers rows to the archive files (runs in a thread).
+    The rollups already count these rows - they were updated when the stickers were received.
+
+    Returns:
+        tuple: (rows archived, last id seen) - fewer rows than the batch size means done
+    """
+    with Session(engine) as session:
+        rows = session.exec(text(
+            "SELECT history.id, history.user_id, history.sticker_id, history.sent_at, history.blocked_by_policy, "
+            "       telegram_users.userid, stickers.sticker_id "
+            "FROM telegram_user_stickers AS history "
+            "LEFT JOIN telegram_users ON telegram_users.id = history.user_id "
+            "LEFT JOIN stickers ON stickers.id = history.sticker_id "
+            "WHERE history.id > :after_id AND history.sent_at < :cutoff "
+            "  AND EXISTS (SELECT 1 FROM telegram_user_stickers AS newer "
+            "              WHERE newer.user_id = history.user_id AND newer.sticker_id = history.sticker_id "
+            "                AND newer.id > history.id) "
+            "ORDER BY history.id LIMIT :limit"
+        ), params={"after_id": after_id, "cutoff": sqlite_datetime(cutoff), "limit": HISTORY_RETENTION_BATCH}).all()
+        if not rows:
+            return 0, after_id
+
+        # Written (and synced) before the delete - a crash in between only leaves duplicates (same id) in the archive
+        history_archive.append_rows(HISTORY_ARCHIVE_DIRECTORY, [
+            {
+                "id": row[0], "user_id": row[1], "sticker_id": row[2],
+                "sent_at": datetime.fromisoformat(row[3]), "blocked_by_policy": bool(row[4]),
+                "telegram_user_id": row[5], "telegram_sticker_id": row[6]
+            }
+            for row in rows
+        ])
+        session.exec(delete(TelegramUserSticker).where(TelegramUserSticker.id.in_([row[0] for row in rows])))
+        session.commit()
+        return len(rows), rows[-1][0]
+# ------------------------------------------------------------------------------
+def vacuum_database_step(convert: bool = False) -> int:
+    """
+    Return up to HISTORY_VACUUM_PAGES free pages to the file system (runs in a thread).
+    A database not in auto_vacuum=INCREMENTAL is switched to it (one full VACUUM) only with convert,
+    otherwise its free pages stay in the file (reused by the next inserts).
+
+    Returns:
+        int: free pages left (0 when nothing more can be done)
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if connection.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            if not convert:
+                return 0
+            logging.warning("Switching the database to incremental vacuum - one full VACUUM, the writes wait")
+            connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+            connection.exec_driver_sql("VACUUM")
+            return 0
+        # executescript steps the pragma to the end - execute() would free a single page
+        connection.connection.driver_connection.executescript(f"PRAGMA incremental_vacuum({HISTORY_VACUUM_PAGES})")
+        return connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+# ------------------------------------------------------------------------------
+async def run_database_vacuum(convert: bool = False) -> None:
+    """Incremental vacuum steps until no free page is left (see vacuum_database_step for convert)"""
+    while await asyncio.to_thread(vacuum_database_step, convert) > 0:
+        await asyncio.sleep(HISTORY_RETENTION_PAUSE)
+# ------------------------------------------------------------------------------
+async def run_history_retention() -> dict:
+    """Archive the rows older than HISTORY_RETENTION_DAYS (if enabled), then shrink the database file"""
+    if history_retention_status["running"]:
+        return history_retention_status["last_run"] or {}
+
+    history_retention_status["running"] = True
+    started = time.perf_counter()
+    size_before = get_database_file_size()
+    archived = 0
+    try:
+        if HISTORY_RETENTION_DAYS > 0:
+            cutoff = datetime.now() - timedelta(days=HISTORY_RETENTION_DAYS)
+            after_id = 0
+            while True:
+                count, after_id = await asyncio.to_thread(archive_history_batch, cutoff, after_id)
+                archived += count
+                METRIC_HISTORY_ARCHIVED_ROWS.inc(count)
+                if count < HISTORY_RETENTION_BATCH:
+                    break
+                await asyncio.sleep(HISTORY_RETENTION_PAUSE)
+
+        # Small steps - the file shrinks without locking the database for long
+        if archived:
+            await run_database_vacuum(HISTORY_VACUUM_CONVERT)
+
+        result = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "archived_rows": archived,
+            "duration": round(time.perf_counter() - started, 3),
+            "database_size_before": size_before,
+            "database_size_after": get_database_file_size()
+        }
+        history_retention_status["last_run"] = result
+        if archived:
+            logging.info(f"History retention: {archived} rows archived, database {size_before} -> {result['database_size_after']} bytes")
+        return result
+    finally:
+        history_retention_status["running"] = False
+# ------------------------------------------------------------------------------
+async def history_retention_loop() -> None:
+    await database_ready.wait()
+    await asyncio.sleep(60)  # Not while the server starts
+    while True:
+        try:
+            await run_history_retention()
+        except Exception as e:
+            logging.error(f"Error in the history retention: {e}")
+        await asyncio.sleep(HISTORY_RETENTION_INTERVAL)
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END History retention section
+# ######################################################################
+
+
+
+# ######################################################################
+# Sticker file GC section
+# The directory is read with os.scandir a batch of entries at a time (in a thread, with a
+# pause between batches) and every file is checked against the set of the paths used by
+# the sticker rows. A size variant (stickers/<size>/<name>.webp) belongs to stickers/<name>.webp.
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_referenced_sticker_files() -> set:
+    """Sticker paths (relative to "static") of every row, read by id batches (runs in a thread)"""
+    referenced = set()
+    after_id = 0
+    while True:
+        with Session(engine) as session:
+            rows = session.exec(
+                select(Sticker.id, Sticker.sticker_path)
+                .where(Sticker.id > after_id)
+                .order_by(Sticker.id)
+                .limit(STICKER_GC_BATCH * 10)
+            ).all()
+        referenced.update(sticker_path for _, sticker_path in rows if sticker_path)
+        if len(rows) < STICKER_GC_BATCH * 10:
+            return referenced
+        after_id = rows[-1][0]
+# ------------------------------------------------------------------------------
+def scan_sticker_files_step(entries, referenced: set, cutoff: float) -> tuple:
+    """
+    Read the next STICKER_GC_BATCH entries of a stickers directory (runs in a thread).
+
+    Returns:
+        tuple: (end of the directory, [(path, size)] of the orphan files, [path] of the variant directories)
+    """
+    orphans = []
+    directories = []
+    for _ in range(STICKER_GC_BATCH):
+        entry = next(entries, None)
+        if entry is None:
+            return True, orphans, directories
+        if entry.is_dir(follow_symlinks=False):
+            if entry.name.isdigit():
+                directories.append(entry.path)
+            continue
+        # Dot files (.gitignore...) are not stickers
+        if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False) or f"stickers/{entry.name}" in referenced:
+            continue
+        stat = entry.stat(follow_symlinks=False)
+        if stat.st_mtime < cutoff:
+            orphans.append((entry.path, stat.st_size))
+    return False, orphans, directories
+# ------------------------------------------------------------------------------
+def remove_sticker_files(orphans: list) -> None:
+    """Quarantine (same tree as "static") or delete orphan files (runs in a thread)"""
+    for file_path, size in orphans:
+        try:
+            if STICKER_GC_MODE == "delete":
+                os.remove(file_path)
+                action = "deleted"
+            else:
+                target = os.path.join(STICKER_GC_QUARANTINE_DIRECTORY, os.path.relpath(file_path, "static"))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.move(file_path, target)  # A rename - unless data is on another volume
+                os.utime(target)  # Quarantine time, for the purge
+                action = "quarantined"
+        except OSError as e:
+            logging.warning(f"Sticker GC: could not remove {file_path}: {e}")
+            continue
+        METRIC_STICKER_GC_FILES.inc(action=action)
+        METRIC_STICKER_GC_BYTES.inc(size, action=action)
+# ------------------------------------------------------------------------------
+def purge_sticker_quarantine() -> tuple:
+    """Delete the files quarantined more than STICKER_GC_QUARANTINE_DAYS ago (runs in a thread) - (files, bytes)"""
+    cutoff = time.time() - STICKER_GC_QUARANTINE_DAYS * 86400
+    files = size = 0
+    for directory, _, file_names in os.walk(STICKER_GC_QUARANTINE_DIRECTORY):
+        for file_name in file_names:
+            file_path = os.path.join(directory, file_name)
+            try:
+                stat = os.stat(file_path)
+                if stat.st_mtime < cutoff:
+                    os.remove(file_path)
+                    files += 1
+                    size += stat.st_size
+            except OSError as e:
+                logging.warning(f"Sticker GC: could not purge {file_path}: {e}")
+    METRIC_STICKER_GC_FILES.inc(files, action="purged")
+    METRIC_STICKER_GC_BYTES.inc(size, action="purged")
+    return files, size
+# ------------------------------------------------------------------------------
+async def run_sticker_gc(dry_run: bool = False) -> dict:
+    """Find the orphan sticker files and quarantine / delete them (dry_run: only count them)"""
+    if sticker_gc_status["running"]:
+        return sticker_gc_status["last_run"] or {}
+
+    sticker_gc_status["running"] = True
+    started = time.perf_counter()
+    try:
+        # Files younger than the grace time are skipped: the ingest writes the file before the row
+        cutoff = time.time() - STICKER_GC_GRACE
+        referenced = await asyncio.to_thread(get_referenced_sticker_files)
+
+        orphan_files = orphan_bytes = 0
+        directories = [os.path.join("static", "stickers")]
+        while directories:
+            directory = directories.pop()
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                done = False
+                while not done:
+                    done, orphans, subdirectories = await asyncio.to_thread(scan_sticker_files_step, entries, referenced, cutoff)
+                    directories += subdirectories
+                    orphan_files += len(orphans)
+                    orphan_bytes += sum(size for _, size in orphans)
+                    if orphans and not dry_run:
+                        await asyncio.to_thread(remove_sticker_files, orphans)
+                    await asyncio.sleep(STICKER_GC_PAUSE)
+
+        purged = (0, 0) if dry_run else await asyncio.to_thread(purge_sticker_quarantine)
+        result = {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "dry_run": dry_run,
+            "mode": STICKER_GC_MODE,
+            "referenced_files": len(referenced),
+            "orphan_files": orphan_files,
+            "orphan_bytes": orphan_bytes,
+            "purged_files": purged[0],
+            "purged_bytes": purged[1],
+            "duration": round(time.perf_counter() - started, 3)
+        }
+        if not dry_run:
+            sticker_gc_status["last_run"] = result
+        if orphan_files or purged[0]:
+            logging.info(f"Sticker GC: {orphan_files} orphan file(s) ({orphan_bytes} bytes) "
+                         f"{'found' if dry_run else STICKER_GC_MODE + 'd'}, {purged[0]} purged from the quarantine")
+        return result
+    finally:
+        sticker_gc_status["running"] = False
+# ------------------------------------------------------------------------------
+async def sticker_gc_loop() -> None:
+    if STICKER_GC_INTERVAL <= 0:
+        return
+    await database_ready.wait()
+    await asyncio.sleep(300)  # Not while the server starts (variant backfill, atlas...)
+    while True:
+        try:
+            await run_sticker_gc()
+        except Exception as e:
+            logging.error(f"Error in the sticker GC: {e}")
+        await asyncio.sleep(STICKER_GC_INTERVAL)
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Sticker file GC section
+# ######################################################################
+
 
 
 # ######################################################################
 # Websocket broadcast section
 # ######################################################################
 # ------------------------------------------------------------------------------
-async def ws_broadcast_to_wall_clients(message: dict):
+def get_wall_sticker_handles(sticker_uuids: list) -> dict:
+    """
+    Handles (database ids) of the stickers of a compact frame - read once, then cached. A sticker
+    without row (deleted meanwhile) keeps its uuid: a shared handle would remove the wrong sticker
+    """
+    missing = [sticker_uuid for sticker_uuid in set(sticker_uuids) if sticker_uuid not in wall_sticker_handles]
+    if missing:
+        with Session(engine) as session:
+            for chunk_start in range(0, len(missing), 500):
+                wall_sticker_handles.update(session.exec(
+                    select(Sticker.sticker_uuid, Sticker.id).where(Sticker.sticker_uuid.in_(missing[chunk_start:chunk_start + 500]))
+                ).all())
+    return {sticker_uuid: wall_sticker_handles.get(sticker_uuid, sticker_uuid) for sticker_uuid in sticker_uuids}
+# ------------------------------------------------------------------------------
+def encode_wall_message(message: dict, encoding: str) -> str | bytes:
+    """Frame of a wall message - JSON text, or MessagePack bytes for the walls that asked for it"""
+    if encoding == wall_protocol.ENCODING_MSGPACK:
+        return wall_protocol.encode_compact(message, get_wall_sticker_handles(wall_protocol.message_sticker_uuids(message)))
+    return json.dumps(message)
+# ------------------------------------------------------------------------------
+async def send_wall_frame(websocket: WebSocket, frame: str | bytes) -> None:
+    if isinstance(frame, bytes):
+        METRIC_WALL_FRAME_BYTES.inc(len(frame), encoding=wall_protocol.ENCODING_MSGPACK)
+        await websocket.send_bytes(frame)
+    else:
+        METRIC_WALL_FRAME_BYTES.inc(len(frame), encoding=wall_protocol.ENCODING_JSON)
+        await websocket.send_text(frame)
+# ------------------------------------------------------------------------------
+async def send_wall_message(websocket: WebSocket, message: dict) -> None:
+    """Send a message to one wall, in the encoding of that wall"""
+    state = wall_client_state.get(websocket, {})
+    await send_wall_frame(websocket, encode_wall_message(message, state.get("encoding", wall_protocol.ENCODING_JSON)))
+# ------------------------------------------------------------------------------
+async def ws_broadcast_to_wall_clients(message: dict, only_channel: str | None = None) -> set:
+    # Routed by wall channel (filters) and walls may ask for different sticker sizes and
+    # encodings - serialized once per channel, size and encoding, not once per client.
+    # Returns the walls the message was sent to
+    started = time.perf_counter()
+    channel_messages = {}
+    frames = {}
+    recipients = set()
     for client in connected_wall_clients:
-        await client.send_text(json.dumps(message))
+        state = wall_client_state.get(client, {})
+        channel = state.get("channel", WALL_CHANNEL_DEFAULT)
+        size = state.get("size")
+        encoding = state.get("encoding", wall_protocol.ENCODING_JSON)
+        if only_channel is not None and channel != only_channel:
+            continue
+        if channel not in channel_messages:
+            channel_messages[channel] = route_wall_message(message, get_wall_channel(channel))
+        if channel_messages[channel] is None:
+            continue
+        if (channel, size, encoding) not in frames:
+            frames[channel, size, encoding] = encode_wall_message(localize_wall_message(channel_messages[channel], size), encoding)
+        client_started = time.perf_counter()
+        await send_wall_frame(client, frames[channel, size, encoding])
+        recipients.add(client)
+        METRIC_BROADCAST_CLIENT_SECONDS.observe(time.perf_counter() - client_started)
+    METRIC_BROADCAST_SECONDS.observe(time.perf_counter() - started)
+    message_type = message.get("type", "")
+    METRIC_BROADCAST_MESSAGES.inc(type=getattr(message_type, "value", message_type))
+    return recipients
 # ------------------------------------------------------------------------------
 # ------------------------------------------------------------------------------
 async def ws_broadcast_to_telegram_clients(message: dict):
@@ -532,6 +2417,401 @@ async def ws_broadcast_to_telegram_clients(message: dict):
 # ######################################################################
 
 
+
+# ######################################################################
+# Admin live stream section
+# The admin pages get what changed (stickers, users, connected clients) instead of
+# fetching the full listings again. Changes are merged by sticker / user until the
+# next flush, so a burst of 100 boosts of one sticker is one entry in one frame.
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_connected_client_counts() -> dict:
+    return {
+        "walls": len(connected_wall_clients),
+        "bots": len(connected_telegram_clients),
+        "admins": len(connected_admin_clients)
+    }
+# ------------------------------------------------------------------------------
+def queue_admin_update(session: Session, sticker_ids: list = (), user_ids: list = ()) -> None:
+    """
+    Read the current state of stickers / users (database ids) for the next admin delta.
+    Nothing is done when no admin page is connected.
+    """
+    if not connected_admin_clients:
+        return
+
+    if sticker_ids:
+        variant_size = parse_sticker_size(ADMIN_STREAM_STICKER_SIZE)
+        rows = session.exec(
+            select(Sticker, StickerStats)
+            .outerjoin(StickerStats, StickerStats.sticker_id == Sticker.id)
+            .where(Sticker.id.in_(sticker_ids))
+        ).all()
+        for sticker, sticker_stats in rows:
+            admin_stream_pending["stickers"][sticker.sticker_uuid] = serialize_sticker_entry(sticker, sticker_stats, variant_size)
+
+    if user_ids:
+        rows = session.exec(
+            select(TelegramUser, TelegramUserStats)
+            .outerjoin(TelegramUserStats, TelegramUserStats.user_id == TelegramUser.id)
+            .where(TelegramUser.id.in_(user_ids))
+        ).all()
+        for user, user_stats in rows:
+            admin_stream_pending["users"][user.userid] = serialize_user_entry(user, user_stats)
+# ------------------------------------------------------------------------------
+def queue_admin_counts_update() -> None:
+    admin_stream_pending["counts"] = True
+# ------------------------------------------------------------------------------
+def flush_admin_stream() -> None:
+    """Send the pending changes (one frame, serialized once) to every admin page"""
+    global admin_stream_pending
+
+    pending = admin_stream_pending
+    if not (pending["stickers"] or pending["users"] or pending["counts"]):
+        return
+    admin_stream_pending = {"stickers": {}, "users": {}, "counts": False}
+
+    if not connected_admin_clients:
+        return
+
+    frame = json.dumps({
+        "type": "admin_delta",
+        "data": {
+            "stickers": list(pending["stickers"].values()),
+            "users": list(pending["users"].values()),
+            "counts": get_connected_client_counts() if pending["counts"] else None
+        }
+    })
+    for websocket, queue in list(connected_admin_clients.items()):
+        try:
+            queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # The page is too far behind - drop the backlog, it reloads the listings
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(json.dumps({"type": "admin_resync", "data": {}}))
+            logging.warning("Admin stream client too slow - resync requested")
+# ------------------------------------------------------------------------------
+async def admin_stream_loop():
+    while True:
+        await asyncio.sleep(ADMIN_STREAM_INTERVAL)
+        try:
+            flush_admin_stream()
+        except Exception as e:
+            logging.error(f"Error flushing the admin stream: {e}")
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Admin live stream section
+# ######################################################################
+
+
+
+# ######################################################################
+# Wall rotation section
+# The channels with rotation slots show, next to their top, a window of stickers that
+# moves through the whole visible catalog. The catalog is walked by sticker id from a
+# cursor (keyset, never OFFSET), the next window is read one step ahead, and each step
+# swaps a few stickers with one remove and one add frame.
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_wall_rotation_window(name: str) -> list:
+    """Rotation stickers on the walls of a channel (wall entries, oldest first)"""
+    return wall_rotation_state.get(name, {}).get("window", [])
+# ------------------------------------------------------------------------------
+def get_shown_sticker_uuids(session: Session, sticker_uuids: list) -> set:
+    """The stickers of the list that are still visible and not banned"""
+    if not sticker_uuids:
+        return set()
+    return set(session.exec(
+        select(Sticker.sticker_uuid).where(
+            Sticker.sticker_uuid.in_(sticker_uuids), Sticker.visible == True, Sticker.banned == False
+        )
+    ).all())
+# ------------------------------------------------------------------------------
+def fetch_wall_rotation_window(session: Session, channel: dict, cursor: int, count: int, exclude: set) -> tuple:
+    """
+    Next stickers of the channel catalog after the cursor (sticker id), skipping the excluded ones.
+    At the end of the catalog it starts again from the first sticker.
+
+    Returns:
+        tuple: (wall entries, new cursor)
+    """
+    entries = []
+    exclude = set(exclude)
+    wrapped = cursor == 0
+    while len(entries) < count:
+        rows = session.exec(
+            select(Sticker.id, Sticker.sticker_uuid, Sticker.sticker_path, Sticker.boost_factor, Sticker.set_name, Sticker.emoji)
+            .where(Sticker.id > cursor, *wall_channel_conditions(channel))
+            .order_by(Sticker.id)
+            .limit(max(count * 4, 50))
+        ).all()
+        if not rows:
+            if wrapped:
+                break  # Whole catalog read - it is smaller than the walls
+            cursor, wrapped = 0, True
+            continue
+        for row in rows:
+            cursor = row.id
+            if row.sticker_uuid in exclude:
+                continue
+            exclude.add(row.sticker_uuid)
+            entries.append(wall_sticker_entry(row))
+            if len(entries) >= count:
+                break
+    return entries, cursor
+# ------------------------------------------------------------------------------
+async def step_wall_rotation(name: str) -> dict | None:
+    """
+    Swap the oldest rotation stickers of a channel for the prefetched ones.
+
+    Returns:
+        dict: added and removed sticker uuids, None when the channel has no rotation now
+    """
+    channel = get_wall_channel(name)
+    budgets = [state["budget"] for state in wall_client_state.values() if state["channel"] == name]
+    if name not in wall_channels or not budgets:
+        return None  # Nobody is watching - the cursor stays where it is
+    budget = max(budgets)
+    slots = get_wall_rotation_slots(channel, budget)
+    if not slots:
+        return None
+    step = min(WALL_ROTATION_STEP, slots)
+    state = wall_rotation_state.setdefault(name, {"window": [], "prefetch": [], "cursor": None})
+
+    with Session(engine) as session:
+        wall_channel = session.get(WallChannel, name)
+        if state["cursor"] is None:
+            state["cursor"] = wall_channel.rotation_cursor or 0
+
+        # What the top shows now is not rotated (stickers move in and out of the top)
+        top_uuids = {sticker.sticker_uuid for sticker in get_wall_stickers(session, budget - slots, channel)}
+        state["window"] = [entry for entry in state["window"] if entry["sticker_id"] not in top_uuids]
+        window_uuids = {entry["sticker_id"] for entry in state["window"]}
+
+        incoming = [
+            entry for entry in state["prefetch"]
+            if entry["sticker_id"] not in top_uuids and entry["sticker_id"] not in window_uuids
+        ]
+        shown = get_shown_sticker_uuids(session, [entry["sticker_id"] for entry in incoming])
+        incoming = [entry for entry in incoming if entry["sticker_id"] in shown][:step]
+        if len(incoming) < step:
+            # First step, or prefetched stickers hidden / in the top since
+            more, state["cursor"] = fetch_wall_rotation_window(
+                session, channel, state["cursor"], step - len(incoming),
+                top_uuids | window_uuids | {entry["sticker_id"] for entry in incoming}
+            )
+            incoming += more
+
+        overflow = max(0, len(state["window"]) + len(incoming) - slots)
+        outgoing = state["window"][:overflow]
+        state["window"] = state["window"][overflow:] + incoming
+
+        # Saved before the prefetch - after a restart the prefetched stickers are read again
+        wall_channel.rotation_cursor = state["cursor"]
+        session.add(wall_channel)
+        session.commit()
+
+        state["prefetch"], state["cursor"] = fetch_wall_rotation_window(
+            session, channel, state["cursor"], step,
+            top_uuids | {entry["sticker_id"] for entry in state["window"]}
+        )
+
+    if outgoing:
+        await ws_broadcast_to_wall_clients({
+            "type": WallMessageType.STICKER_REMOVE_BATCH,
+            "data": {"sticker_ids": [entry["sticker_id"] for entry in outgoing]}
+        }, only_channel=name)
+    if incoming:
+        await ws_broadcast_to_wall_clients({
+            "type": WallMessageType.STICKER_ADD_BATCH,
+            "data": {"stickers": incoming}
+        }, only_channel=name)
+    logging.debug(f"Wall rotation {name}: +{len(incoming)} -{len(outgoing)} (cursor {state['cursor']})")
+    return {
+        "added": [entry["sticker_id"] for entry in incoming],
+        "removed": [entry["sticker_id"] for entry in outgoing]
+    }
+# ------------------------------------------------------------------------------
+async def wall_rotation_loop() -> None:
+    await database_ready.wait()
+    while True:
+        await asyncio.sleep(WALL_ROTATION_INTERVAL)
+        for name, channel in list(wall_channels.items()):
+            if not channel["rotation_slots"]:
+                continue
+            try:
+                await step_wall_rotation(name)
+            except Exception as e:
+                logging.error(f"Error in the wall rotation of {name}: {e}")
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Wall rotation section
+# ######################################################################
+
+
+
+# ######################################################################
+# Wall snapshot section
+# The wall state (channels, the top stickers of each channel with their handles, the
+# rotation windows, the atlas pages and the sync frames of the connected walls) is
+# written to WALL_SNAPSHOT_FILE. At startup it is loaded before anything else: the
+# walls that reconnect get their sync from it (the same frame as before the restart
+# when nothing changed on their side), and get a real sync when the database is ready.
+# ######################################################################
+# ------------------------------------------------------------------------------
+def get_wall_sync_key(state: dict) -> str:
+    """Walls with the same key get the same sync frame"""
+    return f"{state['channel']}|{state['budget']}|{int(state['atlas'])}|{state['size']}|{state['encoding']}"
+# ------------------------------------------------------------------------------
+def update_wall_snapshot_sync_states() -> dict:
+    """Add the settings of the walls connected now to the ones of before (most recent last) - returns a copy"""
+    for state in list(wall_client_state.values()):
+        key = get_wall_sync_key(state)
+        wall_snapshot_sync_states.pop(key, None)
+        wall_snapshot_sync_states[key] = {item: state[item] for item in ("channel", "budget", "atlas", "size", "encoding")}
+    while len(wall_snapshot_sync_states) > WALL_SNAPSHOT_MAX_FRAMES:
+        wall_snapshot_sync_states.pop(next(iter(wall_snapshot_sync_states)))
+    return dict(wall_snapshot_sync_states)
+# ------------------------------------------------------------------------------
+def build_wall_snapshot(sync_states: dict) -> dict:
+    """
+    Snapshot with a sync frame for each of sync_states (runs in a thread: one query per channel
+    and the frames take too long for the event loop - the caller holds wall_atlas_lock)
+    """
+    channels = {}
+    sticker_uuids = []
+    for name, channel in list(wall_channels.items()):
+        stickers = generate_wall_sync_payload(get_wall_channel_budget_max(channel), channel=name)["data"]
+        channels[name] = {"settings": channel, "stickers": stickers}
+        sticker_uuids += [sticker["sticker_id"] for sticker in stickers]
+
+    frames = {}
+    for key, state in sync_states.items():
+        if state["channel"] not in wall_channels:
+            continue
+        frame = encode_wall_message(generate_wall_sync_payload(state["budget"], state["atlas"], state["size"], state["channel"]), state["encoding"])
+        frames[key] = {"state": state, **({"bytes": base64.b64encode(frame).decode()} if isinstance(frame, bytes) else {"text": frame})}
+
+    return {
+        "version": WALL_SNAPSHOT_VERSION,
+        "written_at": time.time(),
+        "channels": channels,
+        "handles": get_wall_sticker_handles(sticker_uuids),
+        "rotation": {name: list(state["window"]) for name, state in list(wall_rotation_state.items())},
+        "atlas": [page for page in wall_atlas["pages"] if page["file"]],
+        "frames": frames
+    }
+# ------------------------------------------------------------------------------
+async def write_wall_snapshot() -> None:
+    sync_states = update_wall_snapshot_sync_states()
+    async with wall_atlas_lock:  # The atlas pages don't change while the frames are built
+        snapshot = await asyncio.to_thread(build_wall_snapshot, sync_states)
+
+    def write():
+        os.makedirs(os.path.dirname(WALL_SNAPSHOT_FILE), exist_ok=True)
+        temp_file = WALL_SNAPSHOT_FILE + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+        os.replace(temp_file, WALL_SNAPSHOT_FILE)  # A crash never leaves half a snapshot
+
+    await asyncio.to_thread(write)
+# ------------------------------------------------------------------------------
+def load_wall_snapshot() -> bool:
+    """Load the snapshot of the last run - False when there is none (or too old / other version)"""
+    global wall_snapshot
+    if not WALL_SNAPSHOT_ENABLED or not os.path.exists(WALL_SNAPSHOT_FILE):
+        return False
+    try:
+        with open(WALL_SNAPSHOT_FILE, "r", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Wall snapshot not loaded: {e}")
+        return False
+    if snapshot.get("version") != WALL_SNAPSHOT_VERSION or time.time() - snapshot.get("written_at", 0) > WALL_SNAPSHOT_MAX_AGE:
+        logging.info("Wall snapshot too old or from another version - not used")
+        return False
+
+    wall_snapshot = snapshot
+    wall_channels.update({name: channel["settings"] for name, channel in snapshot["channels"].items()})
+    wall_sticker_handles.update(snapshot["handles"])
+    wall_snapshot_sync_states.update({key: frame["state"] for key, frame in snapshot["frames"].items()})
+    for name, window in snapshot["rotation"].items():
+        wall_rotation_state[name] = {"window": window, "prefetch": [], "cursor": None}
+    # Only the pages still on disk - the others are rebuilt with the atlas
+    wall_atlas["pages"] = [page for page in snapshot["atlas"] if os.path.exists(os.path.join("static", page["file"]))]
+    logging.info(f"Wall snapshot loaded ({len(snapshot['channels'])} channel(s), {len(snapshot['frames'])} sync frame(s), "
+                 f"{time.time() - snapshot['written_at']:.0f} seconds old)")
+    return True
+# ------------------------------------------------------------------------------
+def generate_wall_snapshot_sync(state: dict) -> str | bytes:
+    """Sync frame of a wall from the snapshot - the saved frame, or built from the saved stickers"""
+    frame = wall_snapshot["frames"].get(get_wall_sync_key(state))
+    if frame:
+        return base64.b64decode(frame["bytes"]) if "bytes" in frame else frame["text"]
+
+    channel = wall_snapshot["channels"].get(state["channel"]) or {"stickers": []}
+    atlas_frames = get_wall_atlas_frames() if state["atlas"] else {}
+    stickers = []
+    for sticker in channel["stickers"][:state["budget"]]:
+        sticker = {**sticker, "path": sticker_variant_path(sticker["path"], state["size"])}
+        if sticker["sticker_id"] in atlas_frames:
+            sticker["atlas"] = atlas_frames[sticker["sticker_id"]]
+        stickers.append(sticker)
+    return encode_wall_message({
+        "type": (len(stickers) > 0) and WallMessageType.SYNC or WallMessageType.IGNORE,
+        "data": stickers
+    }, state["encoding"])
+# ------------------------------------------------------------------------------
+async def send_wall_sync(websocket: WebSocket) -> None:
+    """Sync a wall with its budget, channel... - from the snapshot while the database is not ready"""
+    state = wall_client_state[websocket]
+    if not database_ready.is_set() and wall_snapshot:
+        state["snapshot"] = True  # Synchronized again when the database is ready
+        await send_wall_frame(websocket, generate_wall_snapshot_sync(state))
+        return
+    await send_wall_message(websocket, generate_wall_sync_payload(state["budget"], state["atlas"], state["size"], state["channel"]))
+# ------------------------------------------------------------------------------
+async def start_database_in_background() -> None:
+    """Warm start - create_db_and_tables in a thread, then the walls synchronized from the snapshot get a real sync"""
+    global wall_snapshot
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(create_db_and_tables)
+    except Exception as e:
+        # Nothing works without the database: stop like a failed create_db_and_tables at startup
+        logging.critical(f"Error starting the database: {e}", exc_info=True)
+        os.kill(os.getpid(), signal.SIGTERM)
+        return
+    database_ready.set()
+    wall_snapshot = None
+    logging.info(f"Database ready after {time.perf_counter() - started:.1f} seconds (walls served from the snapshot meanwhile)")
+
+    schedule_wall_atlas_refresh()
+    for client in list(connected_wall_clients):
+        state = wall_client_state.get(client)
+        if state and state.pop("snapshot", False):
+            try:
+                await send_wall_sync(client)
+            except Exception as e:
+                logging.warning(f"Could not resync a wall after the warm start: {e}")
+# ------------------------------------------------------------------------------
+async def wall_snapshot_loop() -> None:
+    if not WALL_SNAPSHOT_ENABLED:
+        return
+    await database_ready.wait()
+    while True:
+        await asyncio.sleep(WALL_SNAPSHOT_INTERVAL)
+        try:
+            await write_wall_snapshot()
+        except Exception as e:
+            logging.error(f"Error writing the wall snapshot: {e}")
+# ------------------------------------------------------------------------------
+# ######################################################################
+# END Wall snapshot section
+# ######################################################################
+
+
 # Yes... the code may be a mess... but you can't start perfect when you start from scratch something :)
 
 
@@ -554,6 +2834,20 @@ async def ws_broadcast_to_telegram_clients(message: dict):
 # WEBSOCKET Endpoints
 # ##############################################################################
 # ------------------------------------------------------------------------------
+def get_ingest_rows(session: Session, message: dict) -> tuple:
+    """(TelegramUser, Sticker) of a sticker message, None when not in the database - always read from the database"""
+    user = session.exec(
+        select(TelegramUser)
+        .where(TelegramUser.userid == int(message["telegram_user_id"]))
+        .execution_options(populate_existing=True)
+    ).first()
+    sticker = session.exec(
+        select(Sticker)
+        .where(Sticker.sticker_id == message["sticker_id"])
+        .execution_options(populate_existing=True)
+    ).first()
+    return user, sticker
+# ------------------------------------------------------------------------------
 @app.websocket("/ws/telegram")
 async def websocket_telegram_endpoint(websocket: WebSocket):
     """
@@ -590,8 +2884,12 @@ async def websocket_telegram_endpoint(websocket: WebSocket):
         await websocket.close(code=4001, reason="Unauthorized")
         return
 
+    # Warm start - the stickers are stored once the database is ready
+    await database_ready.wait()
+
     await websocket.accept()
     connected_telegram_clients.append(websocket)
+    queue_admin_counts_update()
 
     # logging.debug(f"Connected telegram bots: {len(connected_telegram_clients)}")
 
@@ -626,44 +2924,26 @@ async def websocket_telegram_endpoint(websocket: WebSocket):
                     continue
 
 
-                if message.get("type") == "sticker":
-                    with Session(engine) as session:
-                        # Check if user exists or create new
-                        user = session.exec(
-                            select(TelegramUser)
-                            .where(TelegramUser.userid == int(message["telegram_user_id"]))
-                        ).first()
-
-                        logging.info(f"Check: User Ban")
-
-                        if user and user.banned:
-                            logging.warning(f"Banned user {message['telegram_username']} attempted to send sticker")
-                            continue
-
-                        if not user:
-                            user = TelegramUser(
-                                userid=int(message["telegram_user_id"]),
-                                username=message["telegram_username"],
-                                fullusername=message["telegram_full_username"],
-                                last_chatid=message.get("chat_id"),
-                                last_message=datetime.now()
-                            )
-                            session.add(user)
-                            session.flush()  # Get the user ID
-                        else:
-                            user.last_message = datetime.now()
-                            user.last_chatid = message.get("chat_id")
-
-                        logging.info(f"Check: Sticker Ban")
+                if message.get("type") == "sticker":
+                    trace = start_sticker_trace(message)
 
-                        # Check if sticker exists or create new
-                        sticker = session.exec(
-                            select(Sticker)
-                            .where(Sticker.sticker_id == message["sticker_id"])
-                        ).first()
+                    with Session(engine) as session:
+                        # Check if user exists or create new
+                        user, sticker = get_ingest_rows(session, message)
+
+                        logging.debug(f"Check: User Ban")
+
+                        if user and user.banned:
+                            logging.warning(f"Banned user {message['telegram_username']} attempted to send sticker")
+                            METRIC_INGEST_STICKERS.inc(result="banned_user")
+                            continue
+
+                        logging.debug(f"Check: Sticker Ban")
 
+                        # Check if sticker exists or create new
                         if sticker and sticker.banned:
                             logging.warning(f"Banned sticker {message['sticker_id']} attempted by user {message['telegram_username']}")
+                            METRIC_INGEST_STICKERS.inc(result="banned_sticker")
                             continue
 
                         # logging.info(f"Check: User Policy")
@@ -700,51 +2980,141 @@ async def websocket_telegram_endpoint(websocket: WebSocket):
                         #
                         #     # continue
 
-                        logging.info(f"Processing sticker")
+                        logging.debug(f"Processing sticker")
+
+                        # Process sticker file - a known sticker is saved (and transcoded) only once
+                        # Done before any write, so the database is not locked while we wait
+                        new_file = not (sticker and sticker.sticker_path and os.path.exists(os.path.join("static", sticker.sticker_path)))
+                        perceptual_hash = None
+                        if new_file:
+                            stage_started = time.perf_counter()
+                            sticker_data = base64.b64decode(message["sticker_data"])
+                            METRIC_INGEST_STAGE_SECONDS.observe(time.perf_counter() - stage_started, stage="decode")
+
+                            # File and perceptual hash - one media pool task
+                            stage_started = time.perf_counter()
+                            saved = await save_sticker_file(message["sticker_id"], sticker_data)
+                            METRIC_INGEST_STAGE_SECONDS.observe(time.perf_counter() - stage_started, stage="file_write")
+                            if saved is None:
+                                METRIC_INGEST_STICKERS.inc(result="rejected")
+                                continue
+                            sticker_path, perceptual_hash = saved
+                        else:
+                            sticker_path = sticker.sticker_path
 
-                        # Process sticker file
-                        sticker_data = base64.b64decode(message["sticker_data"])
-                        file_name = f"{message['sticker_id']}.{message['file_extension']}"
-                        file_path = os.path.join("static/stickers", file_name)
+                        # Other messages were handled during the awaits - the same new user or sticker may
+                        # exist now, and the boost may have changed. From here to the commit nothing awaits
+                        user, sticker = get_ingest_rows(session, message)
+                        if (user and user.banned) or (sticker and sticker.banned):
+                            METRIC_INGEST_STICKERS.inc(result="banned_user" if user and user.banned else "banned_sticker")
+                            continue
 
-                        # Ensure directory exists
-                        os.makedirs("static/stickers", exist_ok=True)
+                        stage_started = time.perf_counter()
+                        if not user:
+                            user = TelegramUser(
+                                userid=int(message["telegram_user_id"]),
+                                username=message["telegram_username"],
+                                fullusername=message["telegram_full_username"],
+                                last_chatid=message.get("chat_id"),
+                                last_message=datetime.now()
+                            )
+                            session.add(user)
+                            session.flush()  # Get the user ID
+                        else:
+                            user.last_message = datetime.now()
+                            user.last_chatid = message.get("chat_id")
 
-                        # Save the file
-                        with open(file_path, "wb") as f:
-                            f.write(sticker_data)
+                        # A new sticker close to a banned one (re-encoded, resized, recolored copy...)
+                        # is stored as banned - the moderators see it and can unban it
+                        near_duplicate = find_banned_near_duplicate(perceptual_hash) if perceptual_hash and not sticker else None
+                        if near_duplicate:
+                            distance, banned_id = near_duplicate
+                            banned_sticker = session.get(Sticker, banned_id)
+                            sticker = Sticker(
+                                sticker_id=message["sticker_id"],
+                                sticker_path=sticker_path,
+                                emoji=message.get("emoji"),
+                                set_name=message.get("set_name"),
+                                perceptual_hash=perceptual_hash,
+                                visible=False,
+                                banned=True,
+                                reason=f"Near duplicate of banned sticker {banned_sticker.sticker_uuid if banned_sticker else banned_id} ({distance} bits)"
+                            )
+                            session.add(sticker)
+                            session.flush()
+                            # Who sent it - the moderators see it and a ban of the user reaches it
+                            session.add(TelegramUserSticker(
+                                user_id=user.id,
+                                sticker_id=sticker.id,
+                                sent_at=datetime.now(),
+                                blocked_by_policy=True
+                            ))
+                            session.commit()
+                            update_banned_hash_index(sticker)
+                            queue_admin_update(session, sticker_ids=[sticker.id], user_ids=[user.id])
+                            schedule_sticker_variants(sticker_path)
+                            logging.warning(f"Sticker {message['sticker_id']} from {message['telegram_username']} is a near duplicate of banned sticker {banned_id} ({distance} bits)")
+                            METRIC_INGEST_STICKERS.inc(result="near_duplicate")
+                            continue
 
                         if not sticker:
                             sticker = Sticker(
                                 sticker_id=message["sticker_id"],
-                                sticker_path=f"stickers/{file_name}"
+                                sticker_path=sticker_path,
+                                emoji=message.get("emoji"),
+                                set_name=message.get("set_name"),
+                                perceptual_hash=perceptual_hash
                             )
                             session.add(sticker)
                             session.flush()
                         else:
                             sticker.boost_factor += 1
-
-                        # Record user-sticker relationship
+                            if perceptual_hash:
+                                sticker.perceptual_hash = perceptual_hash
+                            # Stickers received before the bot sent these
+                            if sticker.emoji is None and message.get("emoji"):
+                                sticker.emoji = message.get("emoji")
+                            if sticker.set_name is None and message.get("set_name"):
+                                sticker.set_name = message.get("set_name")
+
+                        # Counters for the statistics, then the user-sticker relationship
+                        sent_at = datetime.now()
+                        record_sticker_activity(session, user.id, sticker.id, sent_at)
                         user_sticker = TelegramUserSticker(
                             user_id=user.id,
-                            sticker_id=sticker.id
+                            sticker_id=sticker.id,
+                            sent_at=sent_at
                         )
                         session.add(user_sticker)
                         session.flush()
                         session.commit()
+                        METRIC_INGEST_STAGE_SECONDS.observe(time.perf_counter() - stage_started, stage="db_commit")
+
+                        # Resized copies for the walls and the admin (process pool), in the background:
+                        # the walls get the original until they exist
+                        if new_file:
+                            schedule_sticker_variants(sticker_path)
 
                         # Create the wall message
                         client_message = {
                             "type": WallMessageType.STICKER_ADD,
-                            "data": {
-                                "sticker_id": sticker.sticker_uuid,  # Use UUID instead of telegram sticker_id
-                                "path": sticker.sticker_path
-                            }
+                            "data": wall_sticker_entry(sticker)  # UUID instead of telegram sticker_id
                         }
+                        if trace:
+                            client_message["data"]["trace_id"] = trace["id"]
 
                         # Broadcast to wall clients
-                        await ws_broadcast_to_wall_clients(client_message)
-                        logging.info(f"Sticker saved and broadcast: {file_name}")
+                        stage_started = time.perf_counter()
+                        recipients = await ws_broadcast_to_wall_clients(client_message)
+                        if trace:
+                            broadcast_sticker_trace(trace, recipients)
+                        METRIC_INGEST_STAGE_SECONDS.observe(time.perf_counter() - stage_started, stage="broadcast")
+                        METRIC_INGEST_STICKERS.inc(result="accepted")
+                        logging.info(f"Sticker saved and broadcast: {sticker_path}")
+
+                        # New sticker or new boost - the top stickers may have changed
+                        schedule_wall_atlas_refresh()
+                        queue_admin_update(session, sticker_ids=[sticker.id], user_ids=[user.id])
 
             except json.JSONDecodeError:
                 logging.error(f"Invalid JSON received: {data}")
@@ -759,6 +3129,7 @@ async def websocket_telegram_endpoint(websocket: WebSocket):
         print(f"WebSocket error: {e}")
     finally:
         connected_telegram_clients.remove(websocket)
+        queue_admin_counts_update()
 
 # ------------------------------------------------------------------------------
 
@@ -781,12 +3152,23 @@ async def websocket_wall_endpoint(websocket: WebSocket):
 
     await websocket.accept()
     connected_wall_clients.append(websocket)
+    queue_admin_counts_update()
+    channel = websocket.query_params.get("channel") or WALL_CHANNEL_DEFAULT
+    if channel not in wall_channels:
+        logging.warning(f"Wall asked for the unknown channel {channel} - using {WALL_CHANNEL_DEFAULT}")
+        channel = WALL_CHANNEL_DEFAULT
+    wall_client_state[websocket] = create_wall_client_state(
+        atlas=websocket.query_params.get("atlas") == "1",
+        size=parse_sticker_size(websocket.query_params.get("size")),
+        channel=channel,
+        encoding=wall_protocol.get_encoding(websocket.query_params.get("encoding"))
+    )
     logging.info(f"Connected clients: {len(connected_wall_clients)}")
 
     try:
 
         # Send initial bot info when client connects
-        await websocket.send_json({
+        await send_wall_message(websocket, {
             "type": "bot_info",
             "data": bot_information
         })
@@ -795,8 +3177,14 @@ async def websocket_wall_endpoint(websocket: WebSocket):
         # logging.debug(await generate_wall_sync_payload())
         # logging.debug("-" * 120)
 
+        # Tell the wall how many stickers it should hold
+        await send_wall_message(websocket, {
+            "type": WallMessageType.BUDGET,
+            "data": {"max_stickers": wall_client_state[websocket]["budget"]}
+        })
+
         # Sync wall
-        await websocket.send_json(generate_wall_sync_payload())
+        await send_wall_sync(websocket)
         logging.info(f"Sending initial sync")
 
 
@@ -813,11 +3201,35 @@ async def websocket_wall_endpoint(websocket: WebSocket):
 
                 # Handle get_bot_info request
                 if data.get("type") == "get_bot_info":
-                    await websocket.send_json({
+                    await send_wall_message(websocket, {
                         "type": "bot_info",
                         "data": bot_information
                     })
 
+                # Render stats reported by the wall - adjust the sticker budget if needed
+                elif data.get("type") == "wall_stats":
+                    stats = data.get("data") or {}
+                    state = wall_client_state[websocket]
+
+                    try:
+                        fps = float(stats.get("fps"))
+                        bodies = int(stats.get("bodies", 0))
+                    except (TypeError, ValueError):
+                        logger.warning(f"Invalid wall stats received: {stats}")
+                        continue
+
+                    if update_wall_client_budget(state, fps, bodies):
+                        await send_wall_message(websocket, {
+                            "type": WallMessageType.BUDGET,
+                            "data": {"max_stickers": state["budget"]}
+                        })
+                        await send_wall_sync(websocket)
+
+                # A traced sticker is on the screen of the wall
+                elif data.get("type") == "wall_render":
+                    render = data.get("data") or {}
+                    complete_sticker_trace(render.get("trace_id"), render.get("render_ms"), websocket)
+
             except WebSocketDisconnect:
                 break
             except JSONDecodeError:
@@ -836,6 +3248,72 @@ async def websocket_wall_endpoint(websocket: WebSocket):
 
     finally:
         connected_wall_clients.remove(websocket)
+        wall_client_state.pop(websocket, None)
+        queue_admin_counts_update()
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+@app.websocket("/ws/admin")
+async def websocket_admin_endpoint(websocket: WebSocket):
+    """
+    Live changes for the admin pages.
+
+    The first message must be {"type": "auth", "api_key": "..."} (the key of the login - browsers
+    cannot set headers on a websocket). Then the server sends "admin_hello" with the connected
+    client counts and an "admin_delta" frame for every interval with changes:
+    {"stickers": [...], "users": [...], "counts": {...} | null} - same entries as the listings.
+    "admin_resync" means changes were dropped and the listings must be loaded again.
+    """
+    await websocket.accept()
+    if not database_ready.is_set():
+        await websocket.close(code=1013, reason="Database starting")  # Try again later
+        return
+
+    try:
+        auth = await asyncio.wait_for(websocket.receive_json(), timeout=ADMIN_STREAM_AUTH_TIMEOUT)
+    except (asyncio.TimeoutError, WebSocketDisconnect, JSONDecodeError):
+        auth = None
+
+    with Session(engine) as session:
+        authorized = (
+            isinstance(auth, dict)
+            and auth.get("type") == "auth"
+            and validate_api_key(session, str(auth.get("api_key") or ""))
+        )
+    if not authorized:
+        logging.warning("Unauthorized admin WebSocket connection attempt")
+        await websocket.close(code=4001, reason="Unauthorized")
+        return
+
+    queue = asyncio.Queue(maxsize=ADMIN_STREAM_QUEUE_SIZE)
+    connected_admin_clients[websocket] = queue
+    queue_admin_counts_update()
+
+    async def send_frames():
+        while True:
+            await websocket.send_text(await queue.get())
+
+    sender_task = None
+    try:
+        await websocket.send_json({
+            "type": "admin_hello",
+            "data": {"counts": get_connected_client_counts(), "interval": ADMIN_STREAM_INTERVAL}
+        })
+        sender_task = asyncio.create_task(send_frames())
+
+        # Nothing expected from the page - only wait for the disconnect
+        while True:
+            await websocket.receive_text()
+
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logging.error(f"Error in admin websocket: {e}")
+    finally:
+        if sender_task:
+            sender_task.cancel()
+        connected_admin_clients.pop(websocket, None)
+        queue_admin_counts_update()
 # ------------------------------------------------------------------------------
 # ##############################################################################
 # END WEBSOCKET Endpoints
@@ -952,19 +3430,14 @@ async def reload_wall(authenticated: bool = Depends(verify_api_key)):
         #     StickerByUser.enabled == True
         # ).distinct(StickerByUser.sticker_id)
 
-        base_query = select(
-            Sticker.sticker_uuid,
-            Sticker.sticker_path,
-            Sticker.visible,
-            Sticker.boost_factor
-        ).where(
-            and_(
-                Sticker.visible == True,
-                Sticker.banned == False
-            )
-        ).order_by(desc(Sticker.boost_factor)).limit(limit=200)  # Show popular stickers first
-
-        stickers = session.exec(base_query).all()
+        # Each channel has its own stickers - enough for the wall with the biggest budget in it
+        channel_budgets = {}
+        for state in wall_client_state.values():
+            channel_budgets[state["channel"]] = max(channel_budgets.get(state["channel"], 0), state["budget"])
+        channel_stickers = {
+            channel: get_wall_stickers(session, budget, get_wall_channel(channel))
+            for channel, budget in channel_budgets.items()
+        }
 
         # First clear the wall
         clear_message = {
@@ -973,21 +3446,124 @@ async def reload_wall(authenticated: bool = Depends(verify_api_key)):
         }
         await ws_broadcast_to_wall_clients(clear_message)
 
-        # Then add each sticker
-        for sticker in stickers:
-            add_message = {
-                "type": WallMessageType.STICKER_ADD,
-                "data": {
-                    "sticker_id": sticker.sticker_uuid,
-                    "path": sticker.sticker_path,
-                    "boost_factor": sticker.boost_factor
-                }
-            }
-            await ws_broadcast_to_wall_clients(add_message)
-            time.sleep(0.1)
+        # Then add each sticker - every wall gets only the top stickers that fit in its budget
+        longest = max((len(stickers) for stickers in channel_stickers.values()), default=0)
+        for index in range(longest):
+            frames = {}  # Serialized once per channel, sticker size and encoding
+            for client in list(connected_wall_clients):
+                state = wall_client_state.get(client)
+                # A wall connected during the reload, to a channel that had no wall, already got its sync
+                stickers = channel_stickers.get(state["channel"], []) if state else []
+                if index >= len(stickers) or index >= state["budget"]:
+                    continue
+                key = (state["channel"], state["size"], state["encoding"])
+                if key not in frames:
+                    add_message = {
+                        "type": WallMessageType.STICKER_ADD,
+                        "data": wall_sticker_entry(stickers[index])
+                    }
+                    frames[key] = encode_wall_message(localize_wall_message(add_message, state["size"]), state["encoding"])
+                await send_wall_frame(client, frames[key])
+            await asyncio.sleep(0.1)
+
+        return {"status": "success", "message": f"Reloaded {longest} stickers"}
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+@app.post("/api/wall/warm")
+async def warm_wall(authenticated: bool = Depends(verify_api_key)):
+    """
+    Catch up with stickers added outside of the server (tools/import_stickers.py):
+    banned hash index, atlas and snapshot rebuilt now, then every wall gets a new sync
+    """
+    started = time.perf_counter()
+    with Session(engine) as session:
+        load_banned_hash_index(session)
+    if ATLAS_ENABLED:
+        await refresh_wall_atlas()
+    if WALL_SNAPSHOT_ENABLED:
+        await write_wall_snapshot()
+
+    walls = 0
+    for client in list(connected_wall_clients):
+        if client in wall_client_state:
+            await send_wall_sync(client)
+            walls += 1
+    queue_admin_counts_update()
+
+    return {
+        "status": "success",
+        "message": f"Wall cache warmed in {time.perf_counter() - started:.1f} seconds, {walls} wall(s) synchronized"
+    }
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+async def resync_wall_channel(name: str) -> None:
+    """Walls of a channel after a change of its settings: new budget cap and stickers"""
+    channel = get_wall_channel(name)
+    for client in list(connected_wall_clients):
+        state = wall_client_state.get(client)
+        if not state or state["channel"] != name:
+            continue
+        if name not in wall_channels:
+            state["channel"] = WALL_CHANNEL_DEFAULT  # Channel deleted
+        state["budget"] = min(state["budget"], get_wall_channel_budget_max(channel))
+        await send_wall_message(client, {"type": WallMessageType.BUDGET, "data": {"max_stickers": state["budget"]}})
+        await send_wall_sync(client)
+# ------------------------------------------------------------------------------
+@app.get("/api/wall/channels")
+async def list_wall_channels(authenticated: bool = Depends(verify_api_key)):
+    """Wall channels with the number of walls connected to each"""
+    walls = {}
+    for state in wall_client_state.values():
+        walls[state["channel"]] = walls.get(state["channel"], 0) + 1
+    return [{**channel, "walls": walls.get(name, 0)} for name, channel in sorted(wall_channels.items())]
+# ------------------------------------------------------------------------------
+@app.put("/api/wall/channels/{name}")
+async def save_wall_channel(name: str, request: WallChannelRequest, authenticated: bool = Depends(verify_api_key)):
+    """Create or replace a wall channel - its walls are synchronized with the new settings"""
+    if not re.match(WALL_CHANNEL_NAME_PATTERN, name):
+        raise HTTPException(status_code=400, detail="Invalid channel name (a-z, 0-9, _ and -, up to 32 characters)")
+    if request.ranking not in WALL_CHANNEL_RANKINGS:
+        raise HTTPException(status_code=400, detail=f"Invalid ranking (use {', '.join(WALL_CHANNEL_RANKINGS)})")
+    if request.budget is not None and not WALL_STICKER_LIMIT_MIN <= request.budget <= WALL_STICKER_LIMIT_MAX:
+        raise HTTPException(status_code=400, detail=f"Budget must be between {WALL_STICKER_LIMIT_MIN} and {WALL_STICKER_LIMIT_MAX}")
+    if not 0 <= request.rotation_slots <= WALL_STICKER_LIMIT_MAX // 2:
+        raise HTTPException(status_code=400, detail=f"Rotation slots must be between 0 and {WALL_STICKER_LIMIT_MAX // 2}")
+
+    with Session(engine) as session:
+        channel = session.get(WallChannel, name) or WallChannel(name=name)
+        channel.description = request.description
+        channel.set_names = request.set_names or None
+        channel.emojis = request.emojis or None
+        channel.min_boost = request.min_boost
+        channel.budget = request.budget
+        channel.ranking = request.ranking
+        channel.rotation_slots = request.rotation_slots
+        session.add(channel)
+        session.commit()
+        load_wall_channels(session)
 
-        return {"status": "success", "message": f"Reloaded {len(stickers)} stickers"}
+    wall_rotation_state.pop(name, None)  # New filters - the next step starts a new window
+    await resync_wall_channel(name)
+    return {"status": "success", "channel": wall_channels[name]}
 # ------------------------------------------------------------------------------
+@app.delete("/api/wall/channels/{name}")
+async def delete_wall_channel(name: str, authenticated: bool = Depends(verify_api_key)):
+    """Delete a wall channel - its walls move to the default channel"""
+    if name == WALL_CHANNEL_DEFAULT:
+        raise HTTPException(status_code=400, detail="The default channel can't be deleted")
+
+    with Session(engine) as session:
+        channel = session.get(WallChannel, name)
+        if not channel:
+            raise HTTPException(status_code=404, detail="Channel not found")
+        session.delete(channel)
+        session.commit()
+        load_wall_channels(session)
+
+    wall_rotation_state.pop(name, None)
+
+    await resync_wall_channel(name)
+    return {"status": "success", "message": f"Channel {name} deleted"}
 # ------------------------------------------------------------------------------
 @app.get("/api/wall/config")
 async def get_wall_config(authenticated: bool = Depends(verify_api_key)) -> Response:
@@ -995,6 +3571,274 @@ async def get_wall_config(authenticated: bool = Depends(verify_api_key)) -> Resp
     # return Response(content=json.dumps(wallSettingsActual), media_type="application/json")
     return Response(content={"status":"Not implemented"}, media_type="application/json")
 # ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+@app.get("/api/wall/atlas")
+async def get_wall_atlas():
+    """Atlas pages (sprite sheets) and the frame map of the stickers packed in them"""
+    pages = [page["file"] for page in wall_atlas["pages"] if page["file"]]
+    return {
+        "enabled": ATLAS_ENABLED,
+        "cell_size": ATLAS_CELL_SIZE,
+        "pages": pages,
+        "frames": get_wall_atlas_frames()
+    }
+# ------------------------------------------------------------------------------
+
+
+
+# ------------------------------------------------------------------------------
+# Endpoint: /METRICS
+# ------------------------------------------------------------------------------
+@app.get("/metrics")
+async def get_metrics():
+    """Metrics in the Prometheus text format (ingest, broadcast, API key validation, clients, queues)"""
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+# ------------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+@app.get("/api/admin/latency")
+async def get_sticker_latency(authenticated: bool = Depends(verify_api_key)):
+    """Sticker latency per stage (ms), from the Telegram message to the render on the walls"""
+    return {
+        "pending_traces": len(sticker_traces),
+        "stages": get_trace_latency_summary()
+    }
+# ------------------------------------------------------------------------------
+@app.get("/api/admin/loop-monitor")
+async def get_loop_monitor(dump: bool = False, authenticated: bool = Depends(verify_api_key)):
+    """Event loop lag, blocking time per handler and the last slow callbacks (dump=true also writes a profile)"""
+    if event_loop_monitor is None:
+        return {"enabled": False}
+
+    result = {"enabled": True, **event_loop_monitor.snapshot()}
+    if dump:
+        result["dump_file"] = await asyncio.to_thread(
+            event_loop_monitor.dump, LOOP_MONITOR_DUMP_DIRECTORY, LOOP_MONITOR_DUMP_KEEP
+        )
+    return result
+# ------------------------------------------------------------------------------
+
+
+
+
+# ------------------------------------------------------------------------------
+# Endpoint: /API/STATS - read from the rollup tables (never from telegram_user_stickers)
+# ------------------------------------------------------------------------------
+
+# ------------------------------------------------------------------------------
+@app.get("/api/stats")
+async def get_stats_summary(authenticated: bool = Depends(verify_api_key)):
+    """Totals since the beginning plus the current hour and minute"""
+    now = datetime.now()
+    with Session(engine) as session:
+        uses, users, stickers = session.exec(
+            select(
+                func.coalesce(func.sum(ActivityBucket.uses), 0),
+                func.coalesce(func.sum(ActivityBucket.new_users), 0),
+                func.coalesce(func.sum(ActivityBucket.new_stickers), 0)
+            )
+            .where(ActivityBucket.resolution == "hour")
+        ).one()
+
+        current = {}
+        for resolution in STATS_RESOLUTIONS:
+            bucket = session.get(ActivityBucket, (resolution, get_bucket_start(now, resolution)))
+            current[resolution] = serialize_activity_bucket(
+                bucket or ActivityBucket(resolution=resolution, bucket_start=get_bucket_start(now, resolution))
+            )
+
+    return {
+        "totals": {"uses": uses, "users": users, "stickers": stickers},
+        "current_hour": current["hour"],
+        "current_minute": current["minute"]
+    }
+# ------------------------------------------------------------------------------
+@app.get("/api/stats/activity")
+async def get_stats_activity(
+        resolution: str = "hour",
+        limit: int = 24,
+        authenticated: bool = Depends(verify_api_key)
+):
+    """Last activity buckets (oldest first) - empty buckets are not stored"""
+    if resolution not in STATS_RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Invalid resolution (use {', '.join(STATS_RESOLUTIONS)})")
+    limit = max(1, min(limit, STATS_MAX_LIMIT))
+
+    with Session(engine) as session:
+        buckets = session.exec(
+            select(ActivityBucket)
+            .where(ActivityBucket.resolution == resolution)
+            .order_by(desc(ActivityBucket.bucket_start))
+            .limit(limit)
+        ).all()
+
+    return {
+        "resolution": resolution,
+        "buckets": [serialize_activity_bucket(bucket) for bucket in reversed(buckets)]
+    }
+# ------------------------------------------------------------------------------
+@app.get("/api/stats/leaderboard")
+async def get_stats_leaderboard(
+        kind: str = "stickers",
+        order: str = "total",
+        size: str | None = None,
+        limit: int = 10,
+        authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Top stickers or users, by total (stickers sent) or unique (distinct users / stickers).
+    The counters are indexed - the cost does not depend on the history.
+    """
+    if kind not in ("stickers", "users") or order not in ("total", "unique"):
+        raise HTTPException(status_code=400, detail="Invalid leaderboard (kind: stickers/users, order: total/unique)")
+    limit = max(1, min(limit, STATS_MAX_LIMIT))
+    variant_size = parse_sticker_size(size)
+
+    with Session(engine) as session:
+        if kind == "stickers":
+            column = StickerStats.total_uses if order == "total" else StickerStats.unique_users
+            rows = session.exec(
+                select(Sticker, StickerStats)
+                .join(StickerStats, StickerStats.sticker_id == Sticker.id)
+                .order_by(desc(column))
+                .limit(limit)
+            ).all()
+            entries = [
+                {
+                    "sticker_uuid": sticker.sticker_uuid,
+                    "file_path": sticker_variant_path(sticker.sticker_path, variant_size),
+                    "visible": sticker.visible,
+                    "banned": sticker.banned,
+                    "total_uses": stats.total_uses,
+                    "unique_users": stats.unique_users,
+                    "last_used_at": stats.last_used_at.isoformat() if stats.last_used_at else None
+                }
+                for sticker, stats in rows
+            ]
+        else:
+            column = TelegramUserStats.total_stickers if order == "total" else TelegramUserStats.unique_stickers
+            rows = session.exec(
+                select(TelegramUser, TelegramUserStats)
+                .join(TelegramUserStats, TelegramUserStats.user_id == TelegramUser.id)
+                .order_by(desc(column))
+                .limit(limit)
+            ).all()
+            entries = [
+                {
+                    "user": user.fullusername,
+                    "id": f"@{user.username}",
+                    "banned": user.banned,
+                    "total_stickers": stats.total_stickers,
+                    "unique_stickers": stats.unique_stickers,
+                    "last_sent_at": stats.last_sent_at.isoformat() if stats.last_sent_at else None
+                }
+                for user, stats in rows
+            ]
+
+    return {"kind": kind, "order": order, "entries": entries}
+# ------------------------------------------------------------------------------
+@app.post("/api/stats/rebuild")
+async def rebuild_stats(authenticated: bool = Depends(verify_api_key)):
+    """Compute the rollups again from the full history (slow on a big database)"""
+    def rebuild():
+        with Session(engine) as session:
+            rebuild_activity_rollups(session)
+
+    await asyncio.to_thread(rebuild)
+    return {"status": "success"}
+# ------------------------------------------------------------------------------
+@app.get("/api/admin/retention")
+async def get_history_retention(authenticated: bool = Depends(verify_api_key)):
+    """Retention settings, last run, archive files and database file usage"""
+    with engine.connect() as connection:
+        page_size = connection.exec_driver_sql("PRAGMA page_size").scalar()
+        free_pages = connection.exec_driver_sql("PRAGMA freelist_count").scalar()
+        auto_vacuum = connection.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+
+    return {
+        "enabled": HISTORY_RETENTION_DAYS > 0,
+        "retention_days": HISTORY_RETENTION_DAYS,
+        "interval": HISTORY_RETENTION_INTERVAL,
+        "running": history_retention_status["running"],
+        "last_run": history_retention_status["last_run"],
+        "archives": history_archive.list_archives(HISTORY_ARCHIVE_DIRECTORY),
+        "database": {
+            "size": get_database_file_size(),
+            "free_bytes": free_pages * page_size,
+            "incremental_vacuum": auto_vacuum == 2
+        }
+    }
+# ------------------------------------------------------------------------------
+@app.post("/api/admin/retention/run")
+async def run_history_retention_now(authenticated: bool = Depends(verify_api_key)):
+    """Run the retention (archive + vacuum) now instead of waiting for the next scheduled run"""
+    return await run_history_retention()
+# ------------------------------------------------------------------------------
+@app.post("/api/admin/retention/vacuum")
+async def run_database_vacuum_now(convert: bool = False, authenticated: bool = Depends(verify_api_key)):
+    """
+    Return the free pages of the database file to the file system. convert switches a database
+    not in incremental vacuum yet (one full VACUUM - the ingest waits or fails until it is done)
+    """
+    size_before = get_database_file_size()
+    await run_database_vacuum(convert)
+    return {"database_size_before": size_before, "database_size_after": get_database_file_size()}
+# ------------------------------------------------------------------------------
+@app.get("/api/admin/sticker-gc")
+async def get_sticker_gc(authenticated: bool = Depends(verify_api_key)):
+    """Sticker file GC settings, last run and quarantine content"""
+    def quarantine_usage():
+        files = size = 0
+        for directory, _, file_names in os.walk(STICKER_GC_QUARANTINE_DIRECTORY):
+            for file_name in file_names:
+                files += 1
+                size += os.path.getsize(os.path.join(directory, file_name))
+        return {"files": files, "bytes": size}
+
+    return {
+        "enabled": STICKER_GC_INTERVAL > 0,
+        "interval": STICKER_GC_INTERVAL,
+        "mode": STICKER_GC_MODE,
+        "grace": STICKER_GC_GRACE,
+        "quarantine_days": STICKER_GC_QUARANTINE_DAYS,
+        "running": sticker_gc_status["running"],
+        "last_run": sticker_gc_status["last_run"],
+        "quarantine": await asyncio.to_thread(quarantine_usage)
+    }
+# ------------------------------------------------------------------------------
+@app.post("/api/admin/sticker-gc/run")
+async def run_sticker_gc_now(dry_run: bool = False, authenticated: bool = Depends(verify_api_key)):
+    """Run the sticker file GC now - with dry_run the orphans are only counted"""
+    return await run_sticker_gc(dry_run)
+# ------------------------------------------------------------------------------
+@app.get("/api/admin/export/{table}")
+async def export_table(table: str, output_format: str = Query("csv", alias="format"),
+                       since: datetime | None = None, until: datetime | None = None,
+                       compress: bool = Query(False, alias="gzip"), archived: bool = False,
+                       authenticated: bool = Depends(verify_api_key)):
+    """
+    Download a table (stickers, telegram_users, telegram_user_stickers) as CSV or JSON Lines.
+
+    since / until: range on the creation time (sent_at for the history), until excluded
+    gzip: compressed file
+    archived: the history also includes the rows moved to the archive files
+    """
+    if table not in data_export.EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Unknown table (use {', '.join(data_export.EXPORT_TABLES)})")
+    if output_format not in data_export.EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format (use {', '.join(data_export.EXPORT_FORMATS)})")
+
+    # Sync generator - runs in the thread pool, the event loop is not blocked by the queries
+    chunks = data_export.export(
+        engine, table, output_format, since, until, compress,
+        archive_directory=HISTORY_ARCHIVE_DIRECTORY if archived else None
+    )
+    file_name = data_export.get_export_file_name(table, output_format, compress)
+    return StreamingResponse(
+        chunks,
+        media_type="application/gzip" if compress else data_export.EXPORT_FORMATS[output_format],
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'}
+    )
+# ------------------------------------------------------------------------------
 
 
 
@@ -1003,47 +3847,53 @@ async def get_wall_config(authenticated: bool = Depends(verify_api_key)) -> Resp
 # Endpoint: /API/STICKERS
 # ------------------------------------------------------------------------------
 
+# ------------------------------------------------------------------------------
+def get_sticker_users(session: Session, sticker_ids: list) -> dict:
+    """Sticker database id -> users who sent it, one query per STICKERS_SEARCH_CHUNK stickers (not one per sticker)"""
+    sticker_users = {}
+    for start in range(0, len(sticker_ids), STICKERS_SEARCH_CHUNK):
+        rows = session.exec(
+            select(TelegramUserSticker.sticker_id, TelegramUser)
+            .join(TelegramUser, TelegramUser.id == TelegramUserSticker.user_id)
+            .where(TelegramUserSticker.sticker_id.in_(sticker_ids[start:start + STICKERS_SEARCH_CHUNK]))
+            .distinct()
+        ).all()
+        for sticker_id, user in rows:
+            sticker_users.setdefault(sticker_id, []).append(user)
+    return sticker_users
 # ------------------------------------------------------------------------------
 @app.get("/api/stickers", response_model=List[str])
-async def list_stickers(authenticated: bool = Depends(verify_api_key)):
+async def list_stickers(size: str | None = None, authenticated: bool = Depends(verify_api_key)):
     # Gets a list of stickers from the system
+    # size: sticker variant for file_path (thumb, 96, 128, 256) - original_path is always the full sticker
+    variant_size = parse_sticker_size(size)
     try:
         with Session(engine) as session:
-            # Get stickers with their usage count and users
+            # Get stickers with their usage counters (rollup) and users
             stickers_query = (
-                select(
-                    Sticker,
-                    func.count(distinct(TelegramUserSticker.user_id)).label("unique_users"),
-                    func.count(TelegramUserSticker.id).label("total_uses")
-                )
-                .outerjoin(TelegramUserSticker)
-                .group_by(Sticker.id)
-                .order_by(desc("total_uses"))
+                select(Sticker, StickerStats)
+                .outerjoin(StickerStats, StickerStats.sticker_id == Sticker.id)
+                .order_by(desc(func.coalesce(StickerStats.total_uses, 0)))
             )
 
             stickers_result = session.exec(stickers_query).all()
+            sticker_users = get_sticker_users(session, [sticker.id for sticker, _ in stickers_result])
             result = []
 
-            for sticker, unique_users, total_uses in stickers_result:
-                # Get users who used this sticker
-                users_query = (
-                    select(TelegramUser)
-                    .join(TelegramUserSticker)
-                    .where(TelegramUserSticker.sticker_id == sticker.id)
-                    .distinct()
-                )
-                users = session.exec(users_query).all()
+            for sticker, sticker_stats in stickers_result:
+                users = sticker_users.get(sticker.id, [])
 
                 sticker_entry = {
                     "sticker_id": sticker.sticker_id,
                     "sticker_uuid": sticker.sticker_uuid,
-                    "file_path": sticker.sticker_path,
+                    "file_path": sticker_variant_path(sticker.sticker_path, variant_size),
+                    "original_path": sticker.sticker_path,
                     "visible": sticker.visible,
                     "banned": sticker.banned,
                     "boost_factor": sticker.boost_factor,
                     "stats": {
-                        "unique_users": unique_users,
-                        "total_uses": total_uses
+                        "unique_users": sticker_stats.unique_users if sticker_stats else 0,
+                        "total_uses": sticker_stats.total_uses if sticker_stats else 0
                     },
                     "telegram": [
                         {
@@ -1061,6 +3911,189 @@ async def list_stickers(authenticated: bool = Depends(verify_api_key)):
         logging.error(f"Error listing stickers: {e}")
         raise HTTPException(status_code=500, detail="Error listing stickers")
 # ------------------------------------------------------------------------------
+def serialize_sticker_entry(sticker: Sticker, sticker_stats: StickerStats | None, variant_size: int | None) -> dict:
+    return {
+        "sticker_id": sticker.sticker_id,
+        "sticker_uuid": sticker.sticker_uuid,
+        "file_path": sticker_variant_path(sticker.sticker_path, variant_size),
+        "original_path": sticker.sticker_path,
+        "visible": sticker.visible,
+        "banned": sticker.banned,
+        "reason": sticker.reason,
+        "boost_factor": sticker.boost_factor,
+        "emoji": sticker.emoji,
+        "set_name": sticker.set_name,
+        "created_at": sticker.created_at.isoformat(),
+        "stats": {
+            "unique_users": sticker_stats.unique_users if sticker_stats else 0,
+            "total_uses": sticker_stats.total_uses if sticker_stats else 0
+        }
+    }
+# ------------------------------------------------------------------------------
+def get_sticker_facets(session: Session, filters: list) -> dict:
+    """Counts of the search results by banned, visible and boost range (one grouped query on the covering index)"""
+    boost_range = case(
+        (Sticker.boost_factor <= 0, "0"),
+        (Sticker.boost_factor < 5, "1-4"),
+        (Sticker.boost_factor < 10, "5-9"),
+        else_="10+"
+    )
+    rows = session.exec(
+        select(Sticker.banned, Sticker.visible, boost_range, func.count())
+        .where(*filters)
+        .group_by(Sticker.banned, Sticker.visible, boost_range)
+    ).all()
+
+    facets = {"banned": {}, "visible": {}, "boost": {}}
+    for banned, visible, boost, count in rows:
+        for facet, key in (("banned", str(bool(banned)).lower()), ("visible", str(bool(visible)).lower()), ("boost", boost)):
+            facets[facet][key] = facets[facet].get(key, 0) + count
+    return facets
+# ------------------------------------------------------------------------------
+@app.get("/api/stickers/search")
+async def search_stickers(
+        q: str | None = None,
+        banned: bool | None = None,
+        visible: bool | None = None,
+        boost_min: int | None = None,
+        boost_max: int | None = None,
+        user: int | None = None,
+        first_seen_from: datetime | None = None,
+        first_seen_to: datetime | None = None,
+        sort: str = "newest",
+        cursor: str | None = None,
+        limit: int = STICKERS_SEARCH_LIMIT_DEFAULT,
+        facets: bool = False,
+        size: str | None = None,
+        authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Search the stickers for moderation. The result is streamed as NDJSON so the admin grid
+    renders while the rest arrives:
+        {"type": "sticker", "data": {...}}   one line per sticker
+        {"type": "end", "data": {"count", "next_cursor", "facets"}}
+
+    Filters:
+        q: words of the emoji / pack name / telegram id / ban reason (FTS5, prefix match)
+        banned, visible, boost_min, boost_max: facets
+        user: telegram user id - only the stickers sent by this user
+        first_seen_from, first_seen_to: when the sticker was received the first time
+    Sort: newest, boost or uses (next page: the next_cursor of the end line)
+    """
+    if sort not in ("newest", "boost", "uses"):
+        raise HTTPException(status_code=400, detail="Invalid sort (use newest, boost or uses)")
+    limit = max(1, min(limit, STICKERS_SEARCH_LIMIT_MAX))
+    variant_size = parse_sticker_size(size)
+
+    filters = []
+    if banned is not None:
+        filters.append(Sticker.banned == banned)
+    if visible is not None:
+        filters.append(Sticker.visible == visible)
+    if boost_min is not None:
+        filters.append(Sticker.boost_factor >= boost_min)
+    if boost_max is not None:
+        filters.append(Sticker.boost_factor <= boost_max)
+    if first_seen_from is not None:
+        filters.append(Sticker.created_at >= first_seen_from)
+    if first_seen_to is not None:
+        filters.append(Sticker.created_at < first_seen_to)
+    if user is not None:
+        # Served by the (user_id, sticker_id) index alone
+        filters.append(Sticker.id.in_(
+            select(TelegramUserSticker.sticker_id)
+            .join(TelegramUser, TelegramUser.id == TelegramUserSticker.user_id)
+            .where(TelegramUser.userid == user)
+        ))
+    if q:
+        if stickers_fts_enabled:
+            match_query = build_search_query(q)
+            if match_query is not None:
+                filters.append(Sticker.id.in_(
+                    text("SELECT rowid FROM stickers_fts WHERE stickers_fts MATCH :match_query")
+                    .bindparams(match_query=match_query).columns(column("rowid"))
+                ))
+        else:
+            pattern = build_like_pattern(q)
+            filters.append(or_(*(
+                field.like(pattern, escape="\\")
+                for field in (Sticker.sticker_id, Sticker.emoji, Sticker.set_name, Sticker.reason)
+            )))
+
+    if sort == "newest":
+        sort_column, id_column = Sticker.created_at, Sticker.id
+    elif sort == "boost":
+        sort_column, id_column = Sticker.boost_factor, Sticker.id
+    else:
+        sort_column, id_column = StickerStats.total_uses, StickerStats.sticker_id
+
+    query = select(Sticker, StickerStats).where(*filters)
+    if sort == "uses":
+        query = query.join(StickerStats, StickerStats.sticker_id == Sticker.id)
+    else:
+        query = query.outerjoin(StickerStats, StickerStats.sticker_id == Sticker.id)
+    position = decode_keyset_cursor(cursor, sort == "newest") if cursor else None
+
+    def stream():
+        # Runs in the thread pool (sync generator) - the event loop is not blocked by the queries
+        nonlocal position
+        count = 0
+        more = False
+        with Session(engine) as session:
+            while count < limit:
+                chunk_size = min(STICKERS_SEARCH_CHUNK, limit - count)
+                chunk_query = query
+                if position is not None:
+                    chunk_query = chunk_query.where(tuple_(sort_column, id_column) < tuple_(*position))
+                rows = session.exec(
+                    chunk_query.order_by(desc(sort_column), desc(id_column)).limit(chunk_size)
+                ).all()
+
+                lines = []
+                for sticker, sticker_stats in rows:
+                    lines.append(json.dumps({"type": "sticker", "data": serialize_sticker_entry(sticker, sticker_stats, variant_size)}))
+                if lines:
+                    yield "\n".join(lines) + "\n"
+
+                count += len(rows)
+                more = len(rows) == chunk_size
+                if not more:
+                    break
+                sticker, sticker_stats = rows[-1]
+                value = {"newest": sticker.created_at, "boost": sticker.boost_factor}.get(sort)
+                position = (value if sort != "uses" else sticker_stats.total_uses, sticker.id)
+
+            end = {
+                "count": count,
+                # A full last page may be followed by an empty one
+                "next_cursor": encode_keyset_cursor(*position) if more and position else None
+            }
+            if facets:
+                end["facets"] = get_sticker_facets(session, filters)
+        yield json.dumps({"type": "end", "data": end}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+# ------------------------------------------------------------------------------
+@app.get("/api/stickers/{sticker_uuid}/users")
+async def list_sticker_users(sticker_uuid: str, limit: int = 100, authenticated: bool = Depends(verify_api_key)):
+    """Users who sent a sticker (most recent first)"""
+    limit = max(1, min(limit, USERS_PAGE_SIZE_MAX))
+    with Session(engine) as session:
+        sticker = session.exec(select(Sticker).where(Sticker.sticker_uuid == sticker_uuid)).first()
+        if not sticker:
+            raise HTTPException(status_code=404, detail="Sticker not found")
+
+        users = session.exec(
+            select(TelegramUser)
+            .join(TelegramUserSticker)
+            .where(TelegramUserSticker.sticker_id == sticker.id)
+            .group_by(TelegramUser.id)
+            .order_by(desc(func.max(TelegramUserSticker.id)))
+            .limit(limit)
+        ).all()
+
+    return [{"user": user.fullusername, "id": f"@{user.username}", "userid": user.userid} for user in users]
+# ------------------------------------------------------------------------------
 
 
 
@@ -1069,10 +4102,19 @@ async def list_stickers(authenticated: bool = Depends(verify_api_key)):
 async def ban_user(
         user_uuid: int,
         reason: str | None = None,
+        stickers: str = "hide",
         authenticated: bool = Depends(verify_api_key)
 ):
+    """
+    Ban a Telegram user. The stickers sent only by this user are hidden (stickers=hide),
+    banned (stickers=ban) or left as they are (stickers=keep) - the walls get one frame
+    removing them. What was changed is recorded, the unban puts it back.
+    """
+    if stickers not in ("hide", "ban", "keep"):
+        raise HTTPException(status_code=400, detail="Invalid stickers (use hide, ban or keep)")
 
-    with Session(engine) as session:
+    # The stickers are read after the commit (wall frame, index) - no reload one by one
+    with Session(engine, expire_on_commit=False) as session:
         user = session.exec(
             select(TelegramUser)
             .where(TelegramUser.userid == user_uuid)
@@ -1083,9 +4125,66 @@ async def ban_user(
 
         user.banned = True
         user.reason = reason
+
+        changed = []
+        wall_stickers = []
+        if stickers != "keep":
+            action_type = StickerActionType.BAN if stickers == "ban" else StickerActionType.HIDE
+            sticker_reason = f"User {user_uuid} banned" + (f": {reason}" if reason else "")
+
+            # Sent by the user and by nobody else (user_id / sticker_id indexes of the history)
+            user_stickers = session.exec(
+                select(Sticker)
+                .where(Sticker.id.in_(
+                    select(TelegramUserSticker.sticker_id).where(TelegramUserSticker.user_id == user.id)
+                ))
+                .where(~exists().where(
+                    TelegramUserSticker.sticker_id == Sticker.id,
+                    TelegramUserSticker.user_id != user.id
+                ))
+            ).all()
+            # Banned again - keep the state from before the first ban, the unban looks for the last action
+            recorded = {
+                record.sticker_id: record
+                for record in session.exec(
+                    select(TelegramUserBanSticker).where(TelegramUserBanSticker.user_id == user.id)
+                ).all()
+            }
+
+            for sticker in user_stickers:
+                if (sticker.banned if action_type == StickerActionType.BAN else not sticker.visible):
+                    continue  # Nothing to remove
+                was_shown = sticker.visible and not sticker.banned
+                if sticker.id in recorded:
+                    recorded[sticker.id].action = action_type.value
+                else:
+                    session.add(TelegramUserBanSticker(
+                        user_id=user.id,
+                        sticker_id=sticker.id,
+                        action=action_type.value,
+                        visible=sticker.visible,
+                        banned=sticker.banned,
+                        reason=sticker.reason
+                    ))
+                apply_sticker_action(sticker, action_type, sticker_reason)
+                changed.append(sticker)
+                if was_shown:
+                    wall_stickers.append(wall_sticker_entry(sticker))
+
         session.commit()
 
-        return {"status": "success", "message": f"User {user_uuid} banned"}
+        for sticker in changed:
+            update_banned_hash_index(sticker)
+        queue_admin_update(session, sticker_ids=[sticker.id for sticker in changed], user_ids=[user.id])
+
+    await broadcast_wall_sticker_batch(wall_stickers, add=False)
+
+    return {
+        "status": "success",
+        "message": f"User {user_uuid} banned",
+        "stickers_changed": len(changed),
+        "stickers_removed_from_walls": len(wall_stickers)
+    }
 # ------------------------------------------------------------------------------
 
 
@@ -1285,6 +4384,115 @@ async def ban_user(
 #
 #         return {"status": "success", "message": f"Sticker {sticker_uuid} banned"}
 
+def apply_sticker_action(sticker: Sticker, action_type: StickerActionType, reason: str | None) -> WallMessageType | None:
+    """
+    Change a sticker for a moderation action (not committed).
+    Returns the wall message type to send, None if the sticker can't take the action (show a banned sticker).
+    """
+    if action_type == StickerActionType.BAN:
+        sticker.banned = True
+        sticker.visible = False
+        sticker.reason = reason
+        return WallMessageType.STICKER_REMOVE
+
+    if action_type == StickerActionType.UNBAN:
+        sticker.visible = False
+        sticker.banned = False
+        sticker.reason = None
+        return WallMessageType.STICKER_REMOVE
+
+    if action_type == StickerActionType.HIDE:
+        sticker.visible = False
+        return WallMessageType.STICKER_REMOVE
+
+    if action_type == StickerActionType.SHOW:
+        if sticker.banned:
+            return None
+        sticker.visible = True
+        return WallMessageType.STICKER_ADD
+
+    return None
+# ------------------------------------------------------------------------------
+async def broadcast_wall_sticker_batch(wall_stickers: list, add: bool) -> None:
+    """One frame for the walls with the stickers ({"sticker_id", "path"}) to add or remove"""
+    if not wall_stickers:
+        return
+    schedule_wall_atlas_refresh()
+    if add:
+        wall_message = {"type": WallMessageType.STICKER_ADD_BATCH, "data": {"stickers": wall_stickers}}
+    else:
+        wall_message = {
+            "type": WallMessageType.STICKER_REMOVE_BATCH,
+            "data": {"sticker_ids": [sticker["sticker_id"] for sticker in wall_stickers]}
+        }
+    await ws_broadcast_to_wall_clients(wall_message)
+# ------------------------------------------------------------------------------
+@app.post("/api/stickers/bulk")
+async def handle_sticker_bulk_action(
+        action: StickerBulkActionRequest,
+        authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Apply one action (ban, unban, hide, show) to many stickers - a list of UUIDs and/or
+    every sticker sent by a Telegram user (both given: the stickers in the list sent by the user).
+
+    One transaction, and the walls get one frame with all the stickers to remove (or add).
+    Banned stickers are skipped by "show".
+    """
+    if not action.sticker_uuids and action.user_id is None:
+        raise HTTPException(status_code=400, detail="Give sticker_uuids and/or user_id")
+    if action.sticker_uuids and len(action.sticker_uuids) > BULK_ACTION_MAX_STICKERS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_ACTION_MAX_STICKERS} stickers per request")
+
+    # The stickers are read after the commit (wall frame, index, response) - no reload one by one
+    with Session(engine, expire_on_commit=False) as session:
+        query = select(Sticker)
+        if action.sticker_uuids:
+            query = query.where(Sticker.sticker_uuid.in_(action.sticker_uuids))
+        if action.user_id is not None:
+            user = session.exec(select(TelegramUser).where(TelegramUser.userid == action.user_id)).first()
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            query = query.where(Sticker.id.in_(
+                select(TelegramUserSticker.sticker_id).where(TelegramUserSticker.user_id == user.id)
+            ))
+
+        stickers = session.exec(query.limit(BULK_ACTION_MAX_STICKERS + 1)).all()
+        if len(stickers) > BULK_ACTION_MAX_STICKERS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"More than {BULK_ACTION_MAX_STICKERS} stickers match - split the request"
+            )
+
+        changed = []
+        wall_stickers = []  # Only what the walls can have (or get): visible before a removal, hidden before a show
+        for sticker in stickers:
+            was_shown = sticker.visible and not sticker.banned
+            wall_message_type = apply_sticker_action(sticker, action.type, action.reason)
+            if wall_message_type is None:
+                continue
+            changed.append(sticker)
+            if (wall_message_type == WallMessageType.STICKER_REMOVE) == was_shown:
+                wall_stickers.append(wall_sticker_entry(sticker))
+
+        session.commit()
+
+        for sticker in changed:
+            update_banned_hash_index(sticker)
+        queue_admin_update(session, sticker_ids=[sticker.id for sticker in changed])
+
+    await broadcast_wall_sticker_batch(wall_stickers, add=action.type == StickerActionType.SHOW)
+
+    logging.info(f"Bulk {action.type.value}: {len(changed)} of {len(stickers)} sticker(s) changed, {len(wall_stickers)} on the walls")
+
+    return {
+        "status": "success",
+        "matched": len(stickers),
+        "changed": len(changed),
+        "skipped": len(stickers) - len(changed),
+        "wall": len(wall_stickers)
+    }
+# ------------------------------------------------------------------------------
 @app.post("/api/stickers/{sticker_uuid}")
 async def handle_sticker_action(
         sticker_uuid: str,
@@ -1301,45 +4509,28 @@ async def handle_sticker_action(
         if not sticker:
             raise HTTPException(status_code=404, detail="Sticker not found")
 
-        # Handle different action types
-        if action.type == StickerActionType.BAN:
-            sticker.banned = True
-            sticker.visible = False
-            sticker.reason = action.reason
-            wall_message_type = WallMessageType.STICKER_REMOVE
-            message = "Sticker banned successfully"
-
-        elif action.type == StickerActionType.UNBAN:
-            sticker.visible = False
-            sticker.banned = False
-            sticker.reason = None
-            wall_message_type = WallMessageType.STICKER_REMOVE
-            message = "Sticker unbanned successfully"
-
-        elif action.type == StickerActionType.HIDE:
-            sticker.visible = False
-            wall_message_type = WallMessageType.STICKER_REMOVE
-            message = "Sticker hidden successfully"
-
-        elif action.type == StickerActionType.SHOW:
-            if sticker.banned:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Cannot show banned sticker"
-                )
-            sticker.visible = True
-            wall_message_type = WallMessageType.STICKER_ADD
-            message = "Sticker shown successfully"
+        wall_message_type = apply_sticker_action(sticker, action.type, action.reason)
+        if wall_message_type is None:
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot show banned sticker"
+            )
+        message = {
+            StickerActionType.BAN: "Sticker banned successfully",
+            StickerActionType.UNBAN: "Sticker unbanned successfully",
+            StickerActionType.HIDE: "Sticker hidden successfully",
+            StickerActionType.SHOW: "Sticker shown successfully"
+        }[action.type]
 
         session.commit()
+        update_banned_hash_index(sticker)
+        queue_admin_update(session, sticker_ids=[sticker.id])
 
         # Notify wall clients about the change
+        schedule_wall_atlas_refresh()
         wall_message = {
             "type": wall_message_type,
-            "data": {
-                "sticker_id": sticker.sticker_uuid,
-                "path": sticker.sticker_path
-            }
+            "data": wall_sticker_entry(sticker)
         }
         await ws_broadcast_to_wall_clients(wall_message)
 
@@ -1386,8 +4577,11 @@ async def unban_user(
         reason: str | None = None,
         authenticated: bool = Depends(verify_api_key)
 ):
-
-    with Session(engine) as session:
+    """
+    Unban a Telegram user and put back the stickers changed by the ban. A sticker changed
+    by a moderator since then (shown, banned, unbanned...) is left as it is.
+    """
+    with Session(engine, expire_on_commit=False) as session:
         user = session.exec(
             select(TelegramUser)
             .where(TelegramUser.userid == user_uuid)
@@ -1396,18 +4590,162 @@ async def unban_user(
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user.banned = True
-        user.reason = reason
+        user.banned = False
+        user.reason = None
+
+        changed = []
+        wall_stickers = []
+        rows = session.exec(
+            select(TelegramUserBanSticker, Sticker)
+            .join(Sticker, Sticker.id == TelegramUserBanSticker.sticker_id)
+            .where(TelegramUserBanSticker.user_id == user.id)
+        ).all()
+        for record, sticker in rows:
+            if record.action == StickerActionType.BAN.value:
+                still_as_left = sticker.banned and not sticker.visible
+            else:
+                still_as_left = not sticker.visible and sticker.banned == record.banned
+            if still_as_left:
+                sticker.visible = record.visible
+                sticker.banned = record.banned
+                sticker.reason = record.reason
+                changed.append(sticker)
+                if sticker.visible and not sticker.banned:
+                    wall_stickers.append(wall_sticker_entry(sticker))
+            session.delete(record)
+
         session.commit()
 
-        return {"status": "success", "message": f"User {user_uuid} banned"}
+        for sticker in changed:
+            update_banned_hash_index(sticker)
+        queue_admin_update(session, sticker_ids=[sticker.id for sticker in changed], user_ids=[user.id])
+
+    await broadcast_wall_sticker_batch(wall_stickers, add=True)
+
+    return {
+        "status": "success",
+        "message": f"User {user_uuid} unbanned",
+        "stickers_restored": len(changed),
+        "stickers_added_to_walls": len(wall_stickers)
+    }
 # ------------------------------------------------------------------------------
 
+# ------------------------------------------------------------------------------
+def encode_keyset_cursor(value, row_id: int) -> str:
+    # Opaque for the client: position of the last row of the page (sort value + id)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, row_id]).encode()).decode()
+# ------------------------------------------------------------------------------
+def decode_keyset_cursor(cursor: str, is_datetime: bool) -> tuple:
+    try:
+        value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if is_datetime:
+            value = datetime.fromisoformat(value)
+        return value, int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+# ------------------------------------------------------------------------------
+def build_like_pattern(search: str) -> str:
+    # Fallback without FTS5 - the text as typed, anywhere in the column
+    return "%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+# ------------------------------------------------------------------------------
+def build_search_query(search: str) -> str | None:
+    """FTS5 query - every word as a prefix (all words must match), nothing of the FTS syntax from the user"""
+    words = re.findall(r"\w+", search)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
 # ------------------------------------------------------------------------------
 @app.get("/api/users")
-async def unban_user(authenticated: bool = Depends(verify_api_key)):
+async def list_users(
+        sort: str = "last_message",
+        search: str | None = None,
+        banned: bool | None = None,
+        cursor: str | None = None,
+        limit: int = USERS_PAGE_SIZE_DEFAULT,
+        authenticated: bool = Depends(verify_api_key)
+):
+    """
+    Telegram users, one page at a time (newest activity or most stickers first).
+
+    The next page starts after the cursor (keyset) - every page costs the same, and the
+    send counts come with the same query from the rollup table (no COUNT over the history).
+    """
+    if sort not in ("last_message", "stickers"):
+        raise HTTPException(status_code=400, detail="Invalid sort (use last_message or stickers)")
+    limit = max(1, min(limit, USERS_PAGE_SIZE_MAX))
+
+    if sort == "last_message":
+        sort_column, id_column = TelegramUser.last_message, TelegramUser.id
+        query = (
+            select(TelegramUser, TelegramUserStats)
+            .outerjoin(TelegramUserStats, TelegramUserStats.user_id == TelegramUser.id)
+            .where(TelegramUser.last_message.is_not(None))
+        )
+    else:
+        # A user without rollup row (only blocked stickers) is listed with 0 stickers
+        sort_column, id_column = func.coalesce(TelegramUserStats.total_stickers, 0), TelegramUser.id
+        query = (
+            select(TelegramUser, TelegramUserStats)
+            .outerjoin(TelegramUserStats, TelegramUserStats.user_id == TelegramUser.id)
+        )
+
+    if banned is not None:
+        query = query.where(TelegramUser.banned == banned)
+
+    if search:
+        if users_fts_enabled:
+            match_query = build_search_query(search)
+            if match_query is None:
+                return {"users": [], "next_cursor": None}
+            matches = text(
+                "SELECT rowid FROM telegram_users_fts WHERE telegram_users_fts MATCH :match_query"
+            ).bindparams(match_query=match_query).columns(column("rowid"))
+            query = query.where(TelegramUser.id.in_(matches))
+        else:
+            pattern = build_like_pattern(search)
+            query = query.where(
+                TelegramUser.username.like(pattern, escape="\\") | TelegramUser.fullusername.like(pattern, escape="\\")
+            )
+
+    if cursor:
+        query = query.where(tuple_(sort_column, id_column) < tuple_(*decode_keyset_cursor(cursor, sort == "last_message")))
 
-    return {"status": "success", "message": f"User potato"}
+    # One more than the page - tells if there is a next page
+    query = query.order_by(desc(sort_column), desc(id_column)).limit(limit + 1)
+
+    with Session(engine) as session:
+        rows = session.exec(query).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_user, last_stats = rows[-1]
+        next_cursor = encode_keyset_cursor(
+            last_user.last_message if sort == "last_message" else (last_stats.total_stickers if last_stats else 0),
+            last_user.id
+        )
+
+    return {
+        "users": [serialize_user_entry(user, stats) for user, stats in rows],
+        "next_cursor": next_cursor
+    }
+# ------------------------------------------------------------------------------
+def serialize_user_entry(user: TelegramUser, user_stats: TelegramUserStats | None) -> dict:
+    return {
+        "userid": user.userid,
+        "username": user.username,
+        "fullusername": user.fullusername,
+        "created_at": user.created_at.isoformat(),
+        "last_message": user.last_message.isoformat() if user.last_message else None,
+        "banned": user.banned,
+        "reason": user.reason,
+        "stats": {
+            "total_stickers": user_stats.total_stickers if user_stats else 0,
+            "unique_stickers": user_stats.unique_stickers if user_stats else 0
+        }
+    }
 # ------------------------------------------------------------------------------
 
 
@@ -1420,7 +4758,7 @@ async def unban_user(authenticated: bool = Depends(verify_api_key)):
 # LOGIN / LOGOUT Endpoints
 # ##############################################################################
 # ------------------------------------------------------------------------------
-@app.post("/api/auth/login")
+@app.post("/api/auth/login", dependencies=[Depends(require_database)])
 async def login(request: LoginRequest):
     with Session(engine) as session:
         user = session.exec(
@@ -1472,7 +4810,7 @@ async def logout(authenticated: bool = Depends(verify_api_key)):
 # ------------------------------------------------------------------------------
 # Static mounts to serve stuff - They need to be the last declared to avoid issues or errors due the '/'
 # app.mount("/static", StaticFiles(directory="public"), name="static")
-app.mount("/", StaticFiles(directory="static", html=True), name="static")
+app.mount("/", CachedStaticFiles(directory="static", html=True), name="static")
 # ------------------------------------------------------------------------------
 
 
@@ -1 +1,59 @@
-const ADMIN_TOKEN=localStorage.getItem("auth_token");if(!ADMIN_TOKEN){window.location.href="login.html"}const hostURL=window.location.origin;async function fetchWithAuth(url,options={}){const headers={"Content-Type":"application/json","x-api-key":ADMIN_TOKEN,...options.headers||{}};try{const response=await fetch(url,{...options,headers:headers});if(response.status===403){localStorage.removeItem("auth_token");window.location.href="login.html";return null}return response}catch(error){console.error("Network error:",error);throw error}}async function fetchStickers(){const hostEndpoint=hostURL+"/api/stickers";const response=await fetchWithAuth(hostEndpoint);return await response.json()}async function deleteSticker(uuid){const hostEndpoint=hostURL+`/api/stickers/${uuid}`;await fetchWithAuth(hostEndpoint,{method:"DELETE"});location.reload()}function showStickerModal(sticker){console.log(sticker);console.log("running showStickerModal");const modal=document.getElementById("stickerModal");const modalImage=document.getElementById("modalStickerImage");const modalUsers=document.getElementById("modalUserList");const modalStickerId=document.getElementById("modalStickerId");const modalBtnShowSticker=document.getElementById("modalBtnShowSticker");const modalBtnBanSticker=document.getElementById("modalBtnBanSticker");modalImage.src=sticker.file_path;modalStickerId.value=sticker.sticker_id;modalUsers.innerHTML="";sticker.users.forEach((user=>{const userItem=document.createElement("div");userItem.className="list-group-item";userItem.innerHTML=`\n            <div class="row align-items-center">\n                <div class="col">\n                    <div class="text-body">${user.telegram_user}</div>\n                    <div class="text-muted">${user.telegram_id}</div>\n                </div>\n            </div>\n        `;modalUsers.appendChild(userItem)}));if(sticker.banned){modalBtnShowSticker.classList.add("disabled");modalBtnShowSticker.textContent="Show";modalBtnBanSticker.textContent="Unban";modalBtnBanSticker.onclick=async()=>{await unbanSticker(sticker.sticker_id);await loadStickers();await hideStickerModal()}}else{modalBtnShowSticker.classList.remove("disabled");modalBtnShowSticker.textContent=sticker.visible?"Hide":"Show";modalBtnShowSticker.onclick=async()=>{if(sticker.visible){await hideSticker(sticker.sticker_id)}else{await showSticker(sticker.sticker_id)}await loadStickers();await hideStickerModal()};modalBtnBanSticker.textContent="Ban";modalBtnBanSticker.onclick=async()=>{const reason=prompt("Reason for banning this sticker?");if(reason!==null){await banSticker(sticker.sticker_id,reason);await loadStickers();await hideStickerModal()}}}modal.classList.remove("fade");modal.classList.add("show");modal.style.display="block";modal.removeAttribute("aria-hidden");modal.setAttribute("aria-modal","true");modal.setAttribute("role","dialog")}async function banSticker(stickerUuid,reason=""){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:"POST",body:JSON.stringify({type:"ban",reason:reason===""?null:reason})})}async function unbanSticker(stickerUuid){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:"POST",body:JSON.stringify({type:"unban"})})}async function hideSticker(stickerUuid){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:"POST",body:JSON.stringify({type:"hide"})})}async function showSticker(stickerUuid){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:"POST",body:JSON.stringify({type:"show"})})}function hideStickerModal(){const modal=document.getElementById("stickerModal");modal.removeAttribute("aria-modal");modal.classList.remove("show");modal.classList.add("fade");modal.style.display="none"}async function loadStickers(){const stickers=await fetchStickers();const activeContainer=document.getElementById("sticker_active");const inactiveContainer=document.getElementById("sticker_inactive");const bannedContainer=document.getElementById("sticker_banned");activeContainer.innerHTML="";inactiveContainer.innerHTML="";bannedContainer.innerHTML="";const stickerGroups={};stickers.forEach((sticker=>{if(!stickerGroups[sticker.sticker_uuid]){stickerGroups[sticker.sticker_uuid]={sticker_id:sticker.sticker_uuid,file_path:sticker.file_path,visible:sticker.visible,banned:sticker.banned,boost_factor:sticker.boost_factor,stats:sticker.stats,users:[]};const usergroup=sticker.telegram;usergroup.forEach((sticker_telegram=>{stickerGroups[sticker.sticker_uuid].users.push({telegram_user:sticker_telegram.user,telegram_id:sticker_telegram.id})}))}}));Object.values(stickerGroups).forEach((stickerGroup=>{let container;if(stickerGroup.banned){container=bannedContainer}else{container=stickerGroup.visible?activeContainer:inactiveContainer}const img=document.createElement("img");img.className="sticker";img.src=stickerGroup.file_path;img.alt="Sticker";img.onclick=()=>showStickerModal(stickerGroup);container.appendChild(img)}))}async function clearAll(){if(confirm("Are you sure you want to clear ALL stickers?")){const stickers=await fetchStickers();for(const id of stickers){await deleteSticker(id)}location.reload()}}function showTab(tab){document.getElementById("stickersTab").style.display=tab==="stickers"?"block":"none";document.getElementById("configTab").style.display=tab==="config"?"block":"none"}document.addEventListener("DOMContentLoaded",(function(){loadStickers();document.querySelectorAll(".btn-close-event").forEach((btn=>{btn.addEventListener("click",hideStickerModal)}));const modal=document.getElementById("stickerModal");modal.addEventListener("click",(function(event){if(event.target===modal){hideStickerModal()}}));document.addEventListener("keydown",(function(event){if(event.key==="Escape"&&modal.classList.contains("show")){hideStickerModal()}}));document.getElementById("deleteStickerBtn").addEventListener("click",(async()=>{const stickerId=document.getElementById("modalStickerId").value;if(confirm("Are you sure you want to delete this sticker?")){await deleteSticker(stickerId);const modal=document.getElementById("stickerModal");modal.removeAttribute("data-show");await loadStickers()}}))}));
\ No newline at end of file
+const ADMIN_TOKEN=localStorage.getItem('auth_token');if(!ADMIN_TOKEN){window.location.href='login.html';}
+const hostURL=window.location.origin;async function fetchWithAuth(url,options={}){const headers={'Content-Type':'application/json','x-api-key':ADMIN_TOKEN,...(options.headers||{})};try{const response=await fetch(url,{...options,headers});if(response.status===403){localStorage.removeItem('auth_token');window.location.href='login.html';return null;}
+return response;}catch(error){console.error('Network error:',error);throw error;}}
+async function fetchStickers(){const hostEndpoint=hostURL+'/api/stickers?size=thumb';const response=await fetchWithAuth(hostEndpoint);return await response.json();}
+async function deleteSticker(uuid){const hostEndpoint=hostURL+`/api/stickers/${uuid}`;await fetchWithAuth(hostEndpoint,{method:'DELETE'});location.reload();}
+function showStickerModal(sticker){console.log(sticker);console.log('running showStickerModal');const modal=document.getElementById('stickerModal');const modalImage=document.getElementById('modalStickerImage');const modalUsers=document.getElementById('modalUserList');const modalStickerId=document.getElementById('modalStickerId');const modalBtnShowSticker=document.getElementById('modalBtnShowSticker');const modalBtnBanSticker=document.getElementById('modalBtnBanSticker');modalImage.src=sticker.original_path||sticker.file_path;modalStickerId.value=sticker.sticker_id;modalUsers.innerHTML='';sticker.users.forEach(user=>{const userItem=document.createElement('div');userItem.className='list-group-item';userItem.innerHTML=`
+            <div class="row align-items-center">
+                <div class="col">
+                    <div class="text-body">${user.telegram_user}</div>
+                    <div class="text-muted">${user.telegram_id}</div>
+                </div>
+            </div>
+        `;modalUsers.appendChild(userItem);});if(sticker.banned){modalBtnShowSticker.classList.add('disabled');modalBtnShowSticker.textContent='Show';modalBtnBanSticker.textContent='Unban';modalBtnBanSticker.onclick=async()=>{await unbanSticker(sticker.sticker_id);await refreshStickers();await hideStickerModal();}}else{modalBtnShowSticker.classList.remove('disabled');modalBtnShowSticker.textContent=(sticker.visible)?'Hide':'Show';modalBtnShowSticker.onclick=async()=>{if(sticker.visible){await hideSticker(sticker.sticker_id);}else{await showSticker(sticker.sticker_id);}
+await refreshStickers();await hideStickerModal();};modalBtnBanSticker.textContent='Ban';modalBtnBanSticker.onclick=async()=>{const reason=prompt('Reason for banning this sticker?');if(reason!==null){await banSticker(sticker.sticker_id,reason);await refreshStickers();await hideStickerModal();}}}
+modal.classList.remove('fade');modal.classList.add('show');modal.style.display='block';modal.removeAttribute('aria-hidden');modal.setAttribute('aria-modal','true');modal.setAttribute('role','dialog');}
+async function banSticker(stickerUuid,reason=''){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:'POST',body:JSON.stringify({type:'ban',reason:(reason==='')?null:reason})});}
+async function unbanSticker(stickerUuid){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:'POST',body:JSON.stringify({type:'unban'})});}
+async function hideSticker(stickerUuid){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:'POST',body:JSON.stringify({type:'hide'})});}
+async function showSticker(stickerUuid){const hostEndpoint=hostURL+`/api/stickers/${stickerUuid}`;return await fetchWithAuth(hostEndpoint,{method:'POST',body:JSON.stringify({type:'show'})});}
+function hideStickerModal(){const modal=document.getElementById('stickerModal');modal.removeAttribute('aria-modal');modal.classList.remove('show');modal.classList.add('fade');modal.style.display='none';}
+let stickersLoaded=false;function getStickerContainer(sticker){if(sticker.banned)return document.getElementById("sticker_banned");return document.getElementById(sticker.visible?"sticker_active":"sticker_inactive");}
+function createStickerImage(uuid,sticker){const img=document.createElement('img');img.className='sticker';img.dataset.uuid=uuid;img.src=sticker.file_path;img.alt="Sticker";img.loading='lazy';img.onerror=()=>{img.onerror=null;img.src=sticker.original_path;};return img;}
+async function refreshStickers(){if(!adminStreamLive)await loadStickers();}
+async function loadStickers(){const stickers=await fetchStickers();const activeContainer=document.getElementById("sticker_active");const inactiveContainer=document.getElementById("sticker_inactive");const bannedContainer=document.getElementById("sticker_banned");activeContainer.innerHTML='';inactiveContainer.innerHTML='';bannedContainer.innerHTML='';const stickerGroups={};stickers.forEach(sticker=>{if(!stickerGroups[sticker.sticker_uuid]){stickerGroups[sticker.sticker_uuid]={sticker_id:sticker.sticker_uuid,file_path:sticker.file_path,original_path:sticker.original_path,visible:sticker.visible,banned:sticker.banned,boost_factor:sticker.boost_factor,stats:sticker.stats,users:[]};const usergroup=sticker.telegram;usergroup.forEach(sticker_telegram=>{stickerGroups[sticker.sticker_uuid].users.push({telegram_user:sticker_telegram.user,telegram_id:sticker_telegram.id});});}});Object.values(stickerGroups).forEach(stickerGroup=>{const img=createStickerImage(stickerGroup.sticker_id,stickerGroup);img.onclick=()=>showStickerModal(stickerGroup);getStickerContainer(stickerGroup).appendChild(img);});stickersLoaded=true;}
+let stickerSearchController=null;let stickerSearchUuids=[];async function openSearchResult(sticker){const response=await fetchWithAuth(hostURL+`/api/stickers/${sticker.sticker_uuid}/users`);const users=response?await response.json():[];showStickerModal({sticker_id:sticker.sticker_uuid,file_path:sticker.file_path,original_path:sticker.original_path,visible:sticker.visible,banned:sticker.banned,boost_factor:sticker.boost_factor,stats:sticker.stats,users:users.map(user=>({telegram_user:user.user,telegram_id:user.id}))});}
+async function searchStickers(){if(stickerSearchController)stickerSearchController.abort();stickerSearchController=new AbortController();const params=new URLSearchParams({sort:document.getElementById('stickerSearchSort').value,size:'thumb',facets:'true',limit:'500'});const query=document.getElementById('stickerSearch').value.trim();const user=document.getElementById('stickerSearchUser').value.trim();const banned=document.getElementById('stickerSearchBanned').value;if(query)params.set('q',query);if(user)params.set('user',user);if(banned)params.set('banned',banned);const results=document.getElementById('sticker_search_results');const info=document.getElementById('sticker_search_info');results.innerHTML='';info.textContent='Searching...';stickerSearchUuids=[];document.getElementById('sticker_search_bulk').style.display='none';let response;try{response=await fetchWithAuth(hostURL+'/api/stickers/search?'+params.toString(),{signal:stickerSearchController.signal});}catch(error){return;}
+if(!response||!response.ok){info.textContent='Search failed';return;}
+const reader=response.body.getReader();const decoder=new TextDecoder();let buffer='';while(true){let chunk;try{chunk=await reader.read();}catch(error){return;}
+if(chunk.done)break;buffer+=decoder.decode(chunk.value,{stream:true});const lines=buffer.split('\n');buffer=lines.pop();for(const line of lines){if(!line)continue;const message=JSON.parse(line);if(message.type==='sticker'){const sticker=message.data;const img=document.createElement('img');img.className='sticker';img.src=sticker.file_path;img.alt=sticker.emoji||'Sticker';img.title=[sticker.emoji,sticker.set_name,`${sticker.stats.total_uses} uses`].filter(Boolean).join(' - ');img.loading='lazy';img.onerror=()=>{img.onerror=null;img.src=sticker.original_path;};img.onclick=()=>openSearchResult(sticker);results.appendChild(img);stickerSearchUuids.push(sticker.sticker_uuid);}else if(message.type==='end'){document.getElementById('sticker_search_bulk').style.display=stickerSearchUuids.length?'':'none';const facets=message.data.facets||{};const describe=facet=>Object.entries(facets[facet]||{}).map(([key,count])=>`${key}: ${count}`).join(', ');info.textContent=`${message.data.count} shown${message.data.next_cursor ? ' (more available)' : ''} - `+`banned (${describe('banned')}) - visible (${describe('visible')}) - boost (${describe('boost')})`;}}}}
+async function clearAll(){if(confirm("Are you sure you want to clear ALL stickers?")){const stickers=await fetchStickers();for(const id of stickers){await deleteSticker(id);}
+location.reload();}}
+async function loadLatency(){const response=await fetchWithAuth(hostURL+'/api/admin/latency');if(!response)return;const data=await response.json();const stageOrder=['telegram_to_bot','bot_download','bot_to_server','server_ingest','wall_delivery','wall_render','end_to_end'];const stages=Object.keys(data.stages).sort((a,b)=>stageOrder.indexOf(a)-stageOrder.indexOf(b));const tbody=document.querySelector('#latency_table tbody');tbody.innerHTML='';for(const stage of stages){const stats=data.stages[stage];const row=document.createElement('tr');for(const value of[stage,stats.count,stats.p50,stats.p95,stats.p99,stats.max]){const cell=document.createElement('td');cell.textContent=value;row.appendChild(cell);}
+tbody.appendChild(row);}}
+function fillTable(selector,rows){const tbody=document.querySelector(selector+' tbody');tbody.innerHTML='';for(const cells of rows){const row=document.createElement('tr');for(const value of cells){const cell=document.createElement('td');if(value instanceof Node){cell.appendChild(value);}else{cell.textContent=value;}
+row.appendChild(cell);}
+tbody.appendChild(row);}}
+async function loadStats(){const[summaryResponse,activityResponse,stickersResponse,usersResponse]=await Promise.all([fetchWithAuth(hostURL+'/api/stats'),fetchWithAuth(hostURL+'/api/stats/activity?resolution=hour&limit=24'),fetchWithAuth(hostURL+'/api/stats/leaderboard?kind=stickers&size=thumb&limit=10'),fetchWithAuth(hostURL+'/api/stats/leaderboard?kind=users&limit=10')]);if(!summaryResponse||!activityResponse||!stickersResponse||!usersResponse)return;const summary=await summaryResponse.json();document.getElementById('stats_summary').textContent=`${summary.totals.uses} stickers sent - ${summary.totals.stickers} different stickers - `+`${summary.totals.users} users - ${summary.current_minute.uses} in the last minute`;const buckets=(await activityResponse.json()).buckets.reverse();const busiest=Math.max(1,...buckets.map(bucket=>bucket.uses));fillTable('#stats_activity_table',buckets.map(bucket=>{const bar=document.createElement('div');bar.className='progress progress-sm';bar.innerHTML=`<div class="progress-bar" style="width: ${100 * bucket.uses / busiest}%"></div>`;return[new Date(bucket.bucket_start).toLocaleString([],{month:'short',day:'numeric',hour:'2-digit',minute:'2-digit'}),bucket.uses,bucket.active_users,bucket.new_users,bucket.new_stickers,bar];}));fillTable('#stats_stickers_table',(await stickersResponse.json()).entries.map(entry=>{const image=document.createElement('img');image.src=hostURL+'/'+entry.file_path;image.className='avatar avatar-sm';image.loading='lazy';return[image,entry.total_uses,entry.unique_users];}));fillTable('#stats_users_table',(await usersResponse.json()).entries.map(entry=>[`${entry.user} (${entry.id})`,entry.total_stickers,entry.unique_stickers]));}
+async function applyBulkAction(){const action=document.getElementById('stickerSearchBulkAction').value;let reason=null;if(action==='ban'){reason=prompt(`Reason for banning these ${stickerSearchUuids.length} stickers?`);if(reason===null)return;}else if(!confirm(`${action} ${stickerSearchUuids.length} stickers?`)){return;}
+const response=await fetchWithAuth(hostURL+'/api/stickers/bulk',{method:'POST',body:JSON.stringify({type:action,reason:reason,sticker_uuids:stickerSearchUuids})});if(!response)return;const result=await response.json();if(!response.ok){alert(result.detail||'Bulk action failed');return;}
+await refreshStickers();await searchStickers();document.getElementById('sticker_search_info').textContent+=` - last action: ${result.changed} changed, ${result.skipped} skipped`;}
+let usersNextCursor=null;let usersSearchTimer=null;async function banUser(userId,reason=''){return await fetchWithAuth(hostURL+`/api/users/${userId}/ban?reason=${encodeURIComponent(reason)}`,{method:'POST'});}
+async function unbanUser(userId){return await fetchWithAuth(hostURL+`/api/users/${userId}/unban`,{method:'POST'});}
+function createUserRow(user){const row=document.createElement('tr');row.dataset.userid=user.userid;row.dataset.lastMessage=user.last_message||'';const name=document.createElement('td');name.innerHTML='<div></div><div class="text-muted"></div>';name.children[0].textContent=user.fullusername||'';name.children[1].textContent='@'+(user.username||user.userid);row.appendChild(name);for(const value of[user.last_message?new Date(user.last_message).toLocaleString():'-',user.stats.total_stickers,user.stats.unique_stickers]){const cell=document.createElement('td');cell.textContent=value;row.appendChild(cell);}
+const actions=document.createElement('td');const button=document.createElement('button');button.className=user.banned?'btn btn-sm btn-secondary':'btn btn-sm btn-danger';button.textContent=user.banned?'Unban':'Ban';button.onclick=async()=>{await(user.banned?unbanUser(user.userid):banUser(user.userid));if(!adminStreamLive)await loadUsers();};actions.appendChild(button);row.appendChild(actions);return row;}
+async function loadUsers(append=false){const params=new URLSearchParams({sort:document.getElementById('usersSort').value,limit:'50'});const search=document.getElementById('usersSearch').value.trim();const banned=document.getElementById('usersBanned').value;if(search)params.set('search',search);if(banned)params.set('banned',banned);if(append&&usersNextCursor)params.set('cursor',usersNextCursor);const response=await fetchWithAuth(hostURL+'/api/users?'+params.toString());if(!response)return;const data=await response.json();const tbody=document.querySelector('#users_table tbody');if(!append)tbody.innerHTML='';for(const user of data.users){tbody.appendChild(createUserRow(user));}
+usersNextCursor=data.next_cursor;document.getElementById('usersMoreBtn').style.display=usersNextCursor?'':'none';}
+const ADMIN_STREAM_RECONNECT_MS=5000;let adminStreamLive=false;let adminStreamBuffer=null;function connectAdminStream(){const socket=new WebSocket(hostURL.replace(/^http/,'ws')+'/ws/admin');socket.onopen=()=>socket.send(JSON.stringify({type:'auth',api_key:ADMIN_TOKEN}));socket.onmessage=event=>handleAdminStreamMessage(JSON.parse(event.data));socket.onclose=event=>{adminStreamLive=false;if(event.code===4001){localStorage.removeItem('auth_token');window.location.href='login.html';return;}
+if(!stickersLoaded)reloadListings();setTimeout(connectAdminStream,ADMIN_STREAM_RECONNECT_MS);};}
+function handleAdminStreamMessage(message){switch(message.type){case'admin_hello':adminStreamLive=true;showConnectedClients(message.data.counts);reloadListings();break;case'admin_delta':if(adminStreamBuffer){adminStreamBuffer.push(message.data);}else{applyAdminDelta(message.data);}
+break;case'admin_resync':reloadListings();break;}}
+async function reloadListings(){if(adminStreamBuffer)return;adminStreamBuffer=[];try{await Promise.all([loadStickers(),loadUsers()]);}finally{const buffered=adminStreamBuffer;adminStreamBuffer=null;buffered.forEach(applyAdminDelta);}}
+function applyAdminDelta(delta){delta.stickers.forEach(updateStickerImage);delta.users.forEach(updateUserRow);if(delta.counts)showConnectedClients(delta.counts);}
+function updateStickerImage(sticker){const existing=document.querySelector(`img.sticker[data-uuid="${sticker.sticker_uuid}"]`);const container=getStickerContainer(sticker);if(existing){existing.onclick=()=>openSearchResult(sticker);if(existing.parentElement!==container)container.appendChild(existing);return;}
+const img=createStickerImage(sticker.sticker_uuid,sticker);img.onclick=()=>openSearchResult(sticker);container.appendChild(img);}
+function updateUserRow(user){const tbody=document.querySelector('#users_table tbody');const existing=tbody.querySelector(`tr[data-userid="${user.userid}"]`);const row=createUserRow(user);const latestFirst=document.getElementById('usersSort').value==='last_message'&&!document.getElementById('usersSearch').value.trim()&&!document.getElementById('usersBanned').value;if(latestFirst&&(!existing||existing.dataset.lastMessage!==row.dataset.lastMessage)){if(existing)existing.remove();tbody.prepend(row);}else if(existing){existing.replaceWith(row);}}
+function showConnectedClients(counts){document.getElementById('connected_clients').textContent=`Walls: ${counts.walls} - Bots: ${counts.bots} - Admins: ${counts.admins}`;}
+function showTab(tab){document.getElementById('stickersTab').style.display=(tab==='stickers')?'block':'none';document.getElementById('configTab').style.display=(tab==='config')?'block':'none';}
+document.addEventListener('DOMContentLoaded',function(){connectAdminStream();loadLatency();document.getElementById('refreshLatencyBtn').addEventListener('click',loadLatency);loadStats();document.getElementById('refreshStatsBtn').addEventListener('click',loadStats);document.getElementById('stickerSearchBtn').addEventListener('click',searchStickers);document.getElementById('stickerSearchBulkBtn').addEventListener('click',applyBulkAction);document.getElementById('stickerSearch').addEventListener('keydown',event=>{if(event.key==='Enter')searchStickers();});document.getElementById('usersMoreBtn').addEventListener('click',()=>loadUsers(true));document.getElementById('usersSort').addEventListener('change',()=>loadUsers());document.getElementById('usersBanned').addEventListener('change',()=>loadUsers());document.getElementById('usersSearch').addEventListener('input',()=>{clearTimeout(usersSearchTimer);usersSearchTimer=setTimeout(()=>loadUsers(),300);});document.querySelectorAll('.btn-close-event').forEach(btn=>{btn.addEventListener('click',hideStickerModal);})
+const modal=document.getElementById('stickerModal');modal.addEventListener('click',function(event){if(event.target===modal){hideStickerModal();}});document.addEventListener('keydown',function(event){if(event.key==='Escape'&&modal.classList.contains('show')){hideStickerModal();}});document.getElementById('deleteStickerBtn').addEventListener('click',async()=>{const stickerId=document.getElementById('modalStickerId').value;if(confirm("Are you sure you want to delete this sticker?")){await deleteSticker(stickerId);const modal=document.getElementById('stickerModal');modal.removeAttribute('data-show');await loadStickers();}});});
\ No newline at end of file
@@ -29,7 +29,8 @@ let config = {
     },
 
     stickers:{
-        maxCount: 150,
+        maxCount: 150,  // Updated by the server (wall_budget) based on the render performance
+        variantSize: 256,  // Sticker size requested to the server (96, 128, 256 or null for the original)
         maxCountOffset: 20, // offset the total stickers %
         sizeMax: 180,
         sizeMin: 100,
@@ -81,6 +82,18 @@ let config = {
         }
     },
 
+    stats: {
+        reportInterval: 5000  // How often (ms) the render stats are sent to the server
+    },
+
+    atlas: {
+        enable: true  // Load the top stickers from the server sprite sheets (fewer requests)
+    },
+
+    network: {
+        compact: true  // Ask for the binary (MessagePack) messages - the server falls back to JSON if it can't
+    },
+
     mouse: {
         enable: true,
         throwMultiplier: 1,
@@ -187,6 +200,25 @@ let worldWalls = [];
 let mouse;
 let mouseConstraint;
 
+// Render statistics - reported to the server so it can adjust the sticker budget
+const FrameStats = {
+    frames: 0,
+    lastReset: performance.now(),
+
+    tick() {
+        this.frames++;
+    },
+
+    // Returns the FPS since the last call and starts a new measure window
+    collect() {
+        const now = performance.now();
+        const fps = (this.frames * 1000) / Math.max(now - this.lastReset, 1);
+        this.frames = 0;
+        this.lastReset = now;
+        return Math.round(fps * 10) / 10;
+    }
+};
+
 
 
 
@@ -201,7 +233,7 @@ const StorageManager = {
         let stickersData = this.getAllStickers();
         stickersData.push({
             id: sticker.id,
-            path: sticker.img.src,
+            path: sticker.path || sticker.img.src,
             position: sticker.body.position,
             angle: sticker.body.angle,
             velocity: sticker.body.velocity
@@ -218,6 +250,14 @@ const StorageManager = {
         Debug.debug('storage', 'Removed sticker:', stickerId);
     },
 
+    // Remove many stickers (one localStorage write)
+    removeStickers(stickerIds) {
+        const removeIds = new Set(stickerIds);
+        const stickersData = this.getAllStickers().filter(s => !removeIds.has(s.id));
+        localStorage.setItem(this.STORAGE_KEY, JSON.stringify(stickersData));
+        Debug.debug('storage', 'Removed stickers:', removeIds.size);
+    },
+
     // Get all stored stickers
     getAllStickers() {
         const data = localStorage.getItem(this.STORAGE_KEY);
@@ -356,6 +396,41 @@ const AnimationManager = {
 };
 
 
+// Atlas pages (sprite sheets) - each page is downloaded once and the stickers are cut from it
+const AtlasCache = {
+    pages: new Map(),
+
+    loadPage(pageUrl) {
+        if (!this.pages.has(pageUrl)) {
+            this.pages.set(pageUrl, loadStickerImage(pageUrl).catch(error => {
+                this.pages.delete(pageUrl);
+                throw error;
+            }));
+        }
+        return this.pages.get(pageUrl);
+    },
+
+    // Returns a canvas with the sticker - a canvas can be drawn like an image
+    async getFrame(frame) {
+        const page = await this.loadPage(frame.page);
+        const frameCanvas = document.createElement('canvas');
+        frameCanvas.width = frame.w;
+        frameCanvas.height = frame.h;
+        frameCanvas.getContext('2d').drawImage(page, frame.x, frame.y, frame.w, frame.h, 0, 0, frame.w, frame.h);
+        return frameCanvas;
+    },
+
+    // Forget pages that are not used anymore (the server replaces pages when the top changes)
+    prune(usedPages) {
+        this.pages.forEach((_, pageUrl) => {
+            if (!usedPages.has(pageUrl)) {
+                this.pages.delete(pageUrl);
+            }
+        });
+    }
+};
+
+
 const StickerManager = {
     hasSticker(stickerId) {
         return stickers.some(sticker => sticker.id === stickerId);
@@ -375,6 +450,108 @@ const StickerManager = {
 };
 
 
+// Compact wall messages (binary frames, MessagePack) - see server/wall_protocol.py
+// Decoded back to the JSON messages, the sticker handle is used as sticker_id
+const WallProtocol = {
+    types: ['wall_clear', 'wall_reload', 'wall_restart', 'wall_sync', 'wall_ignore', 'sticker_add',
+        'sticker_remove', 'sticker_add_batch', 'sticker_remove_batch', 'bot_info', 'wall_budget'],
+    textDecoder: new TextDecoder(),
+
+    decodeFrame(buffer) {
+        const [type, data] = this.unpack(new DataView(buffer));
+        const messageType = typeof type === 'number' ? this.types[type] : type;
+        switch (messageType) {
+            case 'sticker_add':
+                return { type: messageType, data: this.expandSticker(data) };
+            case 'sticker_remove':
+                return { type: messageType, data: { sticker_id: data } };
+            case 'sticker_add_batch':
+                return { type: messageType, data: { stickers: data.map(sticker => this.expandSticker(sticker)) } };
+            case 'sticker_remove_batch':
+                return { type: messageType, data: { sticker_ids: data } };
+            case 'wall_sync':
+                // [stickers, atlas pages] - the atlas page of a sticker is an index in the pages
+                return { type: messageType, data: data[0].map(sticker => this.expandSticker(sticker, data[1])) };
+            default:
+                return { type: messageType, data: data };
+        }
+    },
+
+    // [handle, path, boost_factor, atlas, trace_id] -> wall message sticker
+    expandSticker([handle, path, boostFactor, atlas, traceId], pages = null) {
+        const sticker = { sticker_id: handle, path: path, boost_factor: boostFactor };
+        if (typeof path === 'string') {
+            sticker.path = path.startsWith('/') ? path.slice(1) : `stickers/${path}`;
+        }
+        if (atlas) {
+            sticker.atlas = { page: pages ? pages[atlas[0]] : atlas[0], x: atlas[1], y: atlas[2], w: atlas[3], h: atlas[4] };
+        }
+        if (traceId) {
+            sticker.trace_id = traceId;
+        }
+        return sticker;
+    },
+
+    // MessagePack decoder - only what the server sends (no bin / ext types)
+    unpack(view) {
+        let offset = 0;
+        const readString = (length) => {
+            const value = this.textDecoder.decode(new Uint8Array(view.buffer, view.byteOffset + offset, length));
+            offset += length;
+            return value;
+        };
+        const readArray = (length) => {
+            const value = new Array(length);
+            for (let index = 0; index < length; index++) {
+                value[index] = read();
+            }
+            return value;
+        };
+        const readMap = (length) => {
+            const value = {};
+            for (let index = 0; index < length; index++) {
+                const key = read();
+                value[key] = read();
+            }
+            return value;
+        };
+        const read = () => {
+            const byte = view.getUint8(offset++);
+            let value;
+            if (byte <= 0x7f) return byte;
+            if (byte >= 0xe0) return byte - 0x100;
+            if ((byte & 0xf0) === 0x80) return readMap(byte & 0x0f);
+            if ((byte & 0xf0) === 0x90) return readArray(byte & 0x0f);
+            if ((byte & 0xe0) === 0xa0) return readString(byte & 0x1f);
+            switch (byte) {
+                case 0xc0: return null;
+                case 0xc2: return false;
+                case 0xc3: return true;
+                case 0xca: value = view.getFloat32(offset); offset += 4; return value;
+                case 0xcb: value = view.getFloat64(offset); offset += 8; return value;
+                case 0xcc: value = view.getUint8(offset); offset += 1; return value;
+                case 0xcd: value = view.getUint16(offset); offset += 2; return value;
+                case 0xce: value = view.getUint32(offset); offset += 4; return value;
+                case 0xcf: value = Number(view.getBigUint64(offset)); offset += 8; return value;
+                case 0xd0: value = view.getInt8(offset); offset += 1; return value;
+                case 0xd1: value = view.getInt16(offset); offset += 2; return value;
+                case 0xd2: value = view.getInt32(offset); offset += 4; return value;
+                case 0xd3: value = Number(view.getBigInt64(offset)); offset += 8; return value;
+                case 0xd9: value = view.getUint8(offset); offset += 1; return readString(value);
+                case 0xda: value = view.getUint16(offset); offset += 2; return readString(value);
+                case 0xdb: value = view.getUint32(offset); offset += 4; return readString(value);
+                case 0xdc: value = view.getUint16(offset); offset += 2; return readArray(value);
+                case 0xdd: value = view.getUint32(offset); offset += 4; return readArray(value);
+                case 0xde: value = view.getUint16(offset); offset += 2; return readMap(value);
+                case 0xdf: value = view.getUint32(offset); offset += 4; return readMap(value);
+                default: throw new Error(`Unsupported MessagePack type 0x${byte.toString(16)}`);
+            }
+        };
+        return read();
+    }
+};
+
+
 // #############################################################################
 // Websock class
 // #############################################################################
@@ -385,9 +562,32 @@ class WebSocketClient {
         this.reconnectDelay = 1000; // Start with 1 second
         this.messageDiv = document.getElementById('messageDIV');
         this.messageCard = document.getElementById('messageCard');
+        this.statsTimer = null;
         this.connect();
     }
 
+    send(data) {
+        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+            this.ws.send(JSON.stringify(data));
+        }
+    }
+
+    startStatsReporter() {
+        if (this.statsTimer) {
+            clearInterval(this.statsTimer);
+        }
+        FrameStats.collect(); // Reset the measure window
+        this.statsTimer = setInterval(() => {
+            this.send({
+                type: 'wall_stats',
+                data: {
+                    fps: FrameStats.collect(),
+                    bodies: stickers.length
+                }
+            });
+        }, config.stats.reportInterval);
+    }
+
     updateMessage(message, isConnecting = false) {
         // if (this.messageDiv) {
         if (this.messageCard) {
@@ -484,6 +684,26 @@ class WebSocketClient {
         }
     }
 
+    getWebSocketParams() {
+        const params = new URLSearchParams();
+        if (config.atlas.enable) {
+            params.set('atlas', '1');
+        }
+        if (config.stickers.variantSize) {
+            params.set('size', config.stickers.variantSize);
+        }
+        if (config.network.compact) {
+            params.set('encoding', 'msgpack');
+        }
+        // Wall channel (room, screen...) from the page URL: index.html?channel=stage
+        const channel = new URLSearchParams(window.location.search).get('channel');
+        if (channel) {
+            params.set('channel', channel);
+        }
+        const query = params.toString();
+        return query ? `?${query}` : '';
+    }
+
     getWebSocketUrl() {
         const hostname = window.location.hostname;
         const port = window.location.port;
@@ -503,7 +723,8 @@ class WebSocketClient {
 
     connect() {
         this.updateMessage("Please wait...", true);
-        this.ws = new WebSocket(this.getWebSocketUrl());
+        this.ws = new WebSocket(this.getWebSocketUrl() + this.getWebSocketParams());
+        this.ws.binaryType = 'arraybuffer';  // Compact messages - text frames are still JSON
 
         this.ws.onopen = () => {
             Debug.info('network', 'WebSocket Connected');
@@ -511,9 +732,12 @@ class WebSocketClient {
             this.reconnectDelay = 1000;
             // Request bot info when connected
             this.ws.send(JSON.stringify({ type: 'get_bot_info' }));
+            this.startStatsReporter();
         };
 
         this.ws.onclose = () => {
+            clearInterval(this.statsTimer);
+            this.statsTimer = null;
             if (this.reconnectAttempts < this.maxReconnectAttempts) {
                 // Debug.warn('network', `WebSocket Reconnecting... Attempt ${this.reconnectAttempts + 1} - Wait: ${this.reconnectDelay * 2}`);
                 Debug.warn('network', `WebSocket Reconnecting... Attempt ${this.reconnectAttempts + 1} - Wait: ${this.reconnectDelay + 250}`);
@@ -535,7 +759,7 @@ class WebSocketClient {
 
         this.ws.onmessage = (event) => {
             try {
-                const data = JSON.parse(event.data);
+                const data = typeof event.data === 'string' ? JSON.parse(event.data) : WallProtocol.decodeFrame(event.data);
                 Debug.debug('network','Received message:', data);
 
                 switch (data.type) {
@@ -565,7 +789,18 @@ class WebSocketClient {
                             return;
                         }
                         Debug.debug('network','Adding new sticker:', data.data.path);
-                        addSticker(data.data.path, data.data.sticker_id);
+                        const receivedAt = performance.now();
+                        const placed = addSticker(data.data.path, data.data.sticker_id);
+                        if (data.data.trace_id) {
+                            // Report when the sticker is really on screen (next frame after placing it)
+                            placed.then(ok => ok && requestAnimationFrame(() => this.send({
+                                type: 'wall_render',
+                                data: {
+                                    trace_id: data.data.trace_id,
+                                    render_ms: performance.now() - receivedAt
+                                }
+                            })));
+                        }
                         break;
 
                     case 'sticker_remove':
@@ -575,6 +810,26 @@ class WebSocketClient {
                         // StickerManager.removeSticker(data.sticker_id);
                         break;
 
+                    case 'sticker_remove_batch':
+                        // Bulk moderation - many stickers in one frame
+                        Debug.debug('network','Removing stickers:', data.data.sticker_ids.length);
+                        removeStickers(data.data.sticker_ids);
+                        break;
+
+                    case 'sticker_add_batch':
+                        Debug.debug('network','Adding stickers:', data.data.stickers.length);
+                        data.data.stickers.forEach(sticker => {
+                            if (!StickerManager.hasSticker(sticker.sticker_id)) {
+                                addSticker(sticker.path, sticker.sticker_id);
+                            }
+                        });
+                        break;
+
+                    case 'wall_budget':
+                        Debug.info('network', 'Sticker budget from server:', data.data.max_stickers);
+                        applyStickerBudget(data.data.max_stickers);
+                        break;
+
                     case 'wall_sync':
                         Debug.debug('network','Sync requested - waiting 10 seconds before executing');
                         setTimeout(() => {
@@ -817,7 +1072,7 @@ function calculateProportionalSize(originalWidth, originalHeight, maxSize) {
  */
 function calculateStickerSize() {
     // Get percentage of stickers compared to limit
-    const stickerPercentage = Math.min(stickers.length / (config.stickers.maxCount - config.stickers.maxCountOffset), 1);
+    const stickerPercentage = Math.min(stickers.length / Math.max(config.stickers.maxCount - config.stickers.maxCountOffset, 1), 1);
 
     // Calculate size using linear interpolation between max and min
     StickerSize = Math.round(config.stickers.sizeMax - (stickerPercentage * (config.stickers.sizeMax - config.stickers.sizeMin)));
@@ -892,13 +1147,14 @@ function updateAllStickerBodiesSizes() {
  *
  * @param {string} stickerPath - The path to the image file used as the sticker.
  * @param {string} stickerId - Sticker String ID.
- * @return {void} This method does not return a value.
+ * @param {Object} [atlasFrame] - Optional atlas frame ({page, x, y, w, h}) to draw the sticker from.
+ * @return {Promise<boolean>} Resolves when the sticker is placed (false if it could not be loaded).
  */
-function addSticker(stickerPath,stickerId) {
+function addSticker(stickerPath,stickerId, atlasFrame = null) {
 
     if (StickerManager.hasSticker(stickerId)) {
         Debug.warn('stickers', `Attempt to add duplicate sticker: ${stickerId}`);
-        return;
+        return Promise.resolve(false);
     }
 
     // const startingX = Math.random() * (canvas.width);
@@ -929,11 +1185,7 @@ function addSticker(stickerPath,stickerId) {
 
     Debug.debug('stickers', "Starting position: ", startingX, startingY);
 
-    const img = new Image();
-
-    img.src = stickerPath;
-
-    img.onload = () => {
+    const placeSticker = (img) => {
         // update next sticker size
         calculateStickerSize();
         // Update all sizes
@@ -988,6 +1240,7 @@ function addSticker(stickerPath,stickerId) {
 
         const stickerObj = {
             id: stickerId,
+            path: stickerPath,
             img: img,
             body: body,
             scale: config.animations.flyIn.initialScale,
@@ -1010,8 +1263,27 @@ function addSticker(stickerPath,stickerId) {
 
         // Start animation
         AnimationManager.startAnimation(stickerObj);
+        return true;
+    };
+
+    const loadFailed = (error) => {
+        Debug.error('stickers', `Failed to load sticker: ${stickerId}`, error);
+        return false;
     };
 
+    let placed;
+    if (atlasFrame) {
+        // Cut the sticker from the atlas page - fallback to the sticker file if the page fails
+        placed = AtlasCache.getFrame(atlasFrame)
+            .catch(() => loadStickerImage(stickerPath))
+            .then(placeSticker)
+            .catch(loadFailed);
+    } else {
+        placed = loadStickerImage(stickerPath)
+            .then(placeSticker)
+            .catch(loadFailed);
+    }
+
     if (stickers.length > config.stickers.maxCount) {
         const oldSticker = stickers.shift();
         Composite.remove(engine.world, oldSticker.body);
@@ -1019,6 +1291,24 @@ function addSticker(stickerPath,stickerId) {
     }
 
     // Debug.debug('stickers', "Function complete");
+    return placed;
+}
+// -----------------------------------------------------------------------------
+
+// -----------------------------------------------------------------------------
+/**
+ * Loads an image and resolves when it is ready to be drawn.
+ *
+ * @param {string} imagePath - Path of the image.
+ * @return {Promise<HTMLImageElement>}
+ */
+function loadStickerImage(imagePath) {
+    return new Promise((resolve, reject) => {
+        const img = new Image();
+        img.onload = () => resolve(img);
+        img.onerror = reject;
+        img.src = imagePath;
+    });
 }
 // -----------------------------------------------------------------------------
 
@@ -1045,6 +1335,22 @@ function removeSticker(stickerId) {
     }
 }
 // -----------------------------------------------------------------------------
+// Same as removeSticker for a list - the sizes are recalculated only once
+function removeStickers(stickerIds) {
+    const removeIds = new Set(stickerIds);
+    const removed = stickers.filter(sticker => removeIds.has(sticker.id));
+    if (removed.length === 0) return;
+
+    Composite.remove(engine.world, removed.map(sticker => sticker.body));
+    stickers = stickers.filter(sticker => !removeIds.has(sticker.id));
+    StorageManager.removeStickers(removed.map(sticker => sticker.id));
+
+    calculateStickerSize();
+    updateAllStickerBodiesSizes();
+
+    Debug.debug('stickers',`Removed ${removed.length} stickers`);
+}
+// -----------------------------------------------------------------------------
 
 // -----------------------------------------------------------------------------
 function restoreStickers() {
@@ -1194,6 +1500,33 @@ function toggleMouseInteraction(enable) {
 }
 // -----------------------------------------------------------------------------
 
+// -----------------------------------------------------------------------------
+/**
+ * Applies the sticker budget sent by the server.
+ * When the budget shrinks the oldest stickers are removed; the next wall_sync
+ * from the server brings the wall to the top ranked stickers for the new budget.
+ *
+ * @param {number} maxStickers - Maximum number of stickers this wall should hold.
+ * @return {void}
+ */
+function applyStickerBudget(maxStickers) {
+    if (!Number.isInteger(maxStickers) || maxStickers <= 0) {
+        return;
+    }
+
+    config.stickers.maxCount = maxStickers;
+
+    while (stickers.length > config.stickers.maxCount) {
+        const oldSticker = stickers.shift();
+        Composite.remove(engine.world, oldSticker.body);
+        StorageManager.removeSticker(oldSticker.id);
+    }
+
+    calculateStickerSize();
+    updateAllStickerBodiesSizes();
+}
+// -----------------------------------------------------------------------------
+
 // -----------------------------------------------------------------------------
 function handleWallSync(message) {
     Debug.info('network', `Running Sync feature now...`);
@@ -1225,11 +1558,14 @@ function handleWallSync(message) {
         return true;
     });
 
+    // Forget the atlas pages the server is not using anymore
+    AtlasCache.prune(new Set(serverStickers.filter(s => s.atlas).map(s => s.atlas.page)));
+
     // Add new stickers from server that don't exist locally
     serverStickers.forEach(serverSticker => {
         const exists = stickers.some(s => s.id === serverSticker.sticker_id);
         if (!exists) {
-            addSticker(serverSticker.path, serverSticker.sticker_id)
+            addSticker(serverSticker.path, serverSticker.sticker_id, serverSticker.atlas)
 
             // // Create new sticker
             // const sticker = createSticker(
@@ -1299,6 +1635,7 @@ function handleWallSync(message) {
  */
 (function render() {
     window.requestAnimationFrame(render);
+    FrameStats.tick();
 
     canvas_context.clearRect(0, 0, canvas.width, canvas.height);
 
@@ -1 +1,80 @@
-let config={debug:{enable:true,showWalls:false,showBounds:false,showLabels:false,showWorld:false,showStickers:false,showStickerSize:false,showPhysics:false,showSticker:false,showStickerVelocity:false,showStickerPosition:false,colors:{walls:"#ee00ff",centerWall:"#ff0000",bounds:"#00ff00",center:"#ff0000",text:"#ffffff"}},bot:{username:"",fullName:""},stickers:{maxCount:150,maxCountOffset:20,sizeMax:180,sizeMin:100,hitBoxFactor:.8,physics:{enable:true,friction:.01,frictionAir:.01,restitution:.1,inertia:0,inverseInertia:0,initialSpeed:.2}},world:{enableSleeping:true,walls:{colisionEffectEnable:true,forceRestitution:0,enableCentralBlock:true},gravity:{enable:false,x:0,y:0,shiftEnable:false,shiftTime:30,stopTime:10,shiftFactor:.001},drift:{enable:false,force:5e-4}},animations:{flyIn:{duration:1e3,initialScale:.1,finalScale:1,initialAlpha:.01,finalAlpha:1},protection:{timeout:5e3,checkInterval:1e4}},mouse:{enable:true,throwMultiplier:1,constraint:{stiffness:.1,damping:0,visible:true}}};const Debug={LEVELS:{ERROR:"error",WARN:"warn",INFO:"info",DEBUG:"debug"},config:{enabled:config.debug.enable,level:"debug",prefix:"",features:{messages:true,network:true,physics:true,stickers:true,storage:true}},log(feature,level,...args){if(!this.config.enabled||!this.config.features[feature.toLowerCase()]){return}const timestamp=(new Date).toISOString().split("T")[1].split(".")[0];const prefix=`${this.config.prefix} [${timestamp}] [${feature.toUpperCase()}]`;switch(level){case this.LEVELS.ERROR:console.error(prefix,...args);break;case this.LEVELS.WARN:console.warn(prefix,...args);break;case this.LEVELS.INFO:console.info(prefix,...args);break;case this.LEVELS.DEBUG:console.debug(prefix,...args);break;default:console.log(prefix,...args)}},error(feature,...args){this.log(feature,this.LEVELS.ERROR,...args)},warn(feature,...args){this.log(feature,this.LEVELS.WARN,...args)},info(feature,...args){this.log(feature,this.LEVELS.INFO,...args)},debug(feature,...args){this.log(feature,this.LEVELS.DEBUG,...args)}};const canvas=document.getElementById("stickerCanvas");const canvas_context=canvas.getContext("2d");let stickers=[];let StickerSize=config.stickers.maxCount;let worldWallsCreatedFlag=false;let worldWalls=[];let mouse;let mouseConstraint;const StorageManager={STORAGE_KEY:"wall_stickers",saveSticker(sticker){let stickersData=this.getAllStickers();stickersData.push({id:sticker.id,path:sticker.img.src,position:sticker.body.position,angle:sticker.body.angle,velocity:sticker.body.velocity});localStorage.setItem(this.STORAGE_KEY,JSON.stringify(stickersData));Debug.debug("storage","Saved sticker:",sticker.id)},removeSticker(stickerId){let stickersData=this.getAllStickers();stickersData=stickersData.filter((s=>s.id!==stickerId));localStorage.setItem(this.STORAGE_KEY,JSON.stringify(stickersData));Debug.debug("storage","Removed sticker:",stickerId)},getAllStickers(){const data=localStorage.getItem(this.STORAGE_KEY);return data?JSON.parse(data):[]},clearStickers(){localStorage.removeItem(this.STORAGE_KEY);Debug.info("storage","Cleared all stickers from storage")}};const AnimationManager={animatingStickers:new Map,startAnimation(sticker){const startTime=performance.now();this.animatingStickers.set(sticker.id,{startTime:startTime,initialPosition:{...sticker.body.position},initialScale:config.animations.flyIn.initialScale,lastUpdateTime:startTime,isAnimating:true})},updateAnimations(currentTime){this.animatingStickers.forEach(((animation,stickerId)=>{const sticker=stickers.find((s=>s.id===stickerId));if(!sticker){this.animatingStickers.delete(stickerId);Debug.warn("animations",`Sticker not found, removing animation: ${stickerId}`);return}const elapsed=currentTime-animation.startTime;const timeSinceLastUpdate=currentTime-animation.lastUpdateTime;if(elapsed>=config.animations.protection.timeout){Debug.warn("animations",`Animation timeout for sticker: ${stickerId}`);this.forceCompleteAnimation(sticker);return}if(timeSinceLastUpdate>config.animations.protection.checkInterval){if(sticker.scale!==1||sticker.alpha!==1){Debug.warn("animations",`Possible stuck animation detected for sticker: ${stickerId}`);this.forceCompleteAnimation(sticker);return}}const progress=Math.min(elapsed/config.animations.flyIn.duration,1);const eased=this.easeInOutQuad(progress);const newScale=this.lerp(config.animations.flyIn.initialScale,config.animations.flyIn.finalScale,eased);const newAlpha=this.lerp(config.animations.flyIn.initialAlpha,config.animations.flyIn.finalAlpha,eased);if(sticker.scale!==newScale||sticker.alpha!==newAlpha){sticker.scale=newScale;sticker.alpha=newAlpha;animation.lastUpdateTime=currentTime}if(progress>=1){this.animatingStickers.delete(stickerId)}}))},completeAnimation(sticker){if(this.animatingStickers.has(sticker.id)){sticker.scale=config.animations.flyIn.finalScale;sticker.alpha=config.animations.flyIn.finalAlpha;this.animatingStickers.delete(sticker.id);Debug.debug("animations",`Animation completed normally for sticker: ${sticker.id}`)}},forceCompleteAnimation(sticker){sticker.scale=config.animations.flyIn.finalScale;sticker.alpha=config.animations.flyIn.finalAlpha;this.animatingStickers.delete(sticker.id);Debug.warn("animations",`Forced animation completion for sticker: ${sticker.id}`)},checkAllStickers(){stickers.forEach((sticker=>{if(sticker.scale!==config.animations.flyIn.finalScale||sticker.alpha!==config.animations.flyIn.finalAlpha){Debug.warn("animations",`Found stuck sticker: ${sticker.id}, forcing completion`);this.forceCompleteAnimation(sticker)}}))},lerp(start,end,t){return start*(1-t)+end*t},easeInOutQuad(t){return t<.5?2*t*t:1-Math.pow(-2*t+2,2)/2}};const StickerManager={hasSticker(stickerId){return stickers.some((sticker=>sticker.id===stickerId))},removeSticker(stickerId){const index=stickers.findIndex((sticker=>sticker.id===stickerId));if(index!==-1){const sticker=stickers[index];Composite.remove(engine.world,sticker.body);stickers.splice(index,1);StorageManager.removeSticker(stickerId);return true}return false}};class WebSocketClient{constructor(){this.reconnectAttempts=0;this.maxReconnectAttempts=99999;this.reconnectDelay=1e3;this.messageDiv=document.getElementById("messageDIV");this.messageCard=document.getElementById("messageCard");this.connect()}updateMessage(message,isConnecting=false){if(this.messageCard){if(isConnecting){this.messageCard.innerHTML=`\n                    <div class="com-info">\n                        <p>\n                            <strong>Almost there...</strong>\n                            <br>\n                            ${message}\n                        </p>\n                    </div>`}else{this.messageCard.innerHTML="";const textDiv=document.createElement("div");textDiv.classList.add("text-content");const titleH1=document.createElement("h1");titleH1.textContent="sticker wall";const textP=document.createElement("p");textP.innerHTML=`send your sticker to<br>@${config.bot.username}`;textDiv.appendChild(titleH1);textDiv.appendChild(textP);const qrDiv=document.createElement("div");qrDiv.classList.add("qr-container");qrDiv.id="qrcode";this.messageCard.appendChild(textDiv);this.messageCard.appendChild(qrDiv);const botHandle=`https://t.me/${config.bot.username}`;new QRCode(document.getElementById("qrcode"),{text:botHandle,width:100,height:100,colorDark:"#000000",colorLight:"#ffffff",correctLevel:QRCode.CorrectLevel.H})}}}getWebSocketUrl(){const hostname=window.location.hostname;const port=window.location.port;const protocol=window.location.protocol==="https:"?"wss:":"ws:";if(!hostname||hostname==="localhost"||hostname==="127.0.0.1"){return"ws://127.0.0.1:8000/ws/wall"}if(port){return`${protocol}//${hostname}:${port}/ws/wall`}else{return`${protocol}//${hostname}/ws/wall`}}connect(){this.updateMessage("Please wait...",true);this.ws=new WebSocket(this.getWebSocketUrl());this.ws.onopen=()=>{Debug.info("network","WebSocket Connected");this.reconnectAttempts=0;this.reconnectDelay=1e3;this.ws.send(JSON.stringify({type:"get_bot_info"}))};this.ws.onclose=()=>{if(this.reconnectAttempts<this.maxReconnectAttempts){Debug.warn("network",`WebSocket Reconnecting... Attempt ${this.reconnectAttempts+1} - Wait: ${this.reconnectDelay+250}`);this.updateMessage("Reconnecting to server...",true);setTimeout((()=>this.connect()),this.reconnectDelay);this.reconnectAttempts++;this.reconnectDelay+=250}else{Debug.error("network","WebSocket Failed to connect after maximum attempts");this.updateMessage("Failed to connect to server",true)}};this.ws.onerror=error=>{Debug.error("network","WebSocket Error:",error);this.updateMessage("Connection error",true)};this.ws.onmessage=event=>{try{const data=JSON.parse(event.data);Debug.debug("network","Received message:",data);switch(data.type){case"bot_info":Debug.debug("network","BOT Information:",data.data);if(data.data.username){config.bot.username=data.data.username;config.bot.fullName=data.data.full_name||data.data.username;this.updateMessage(`@${data.data.username}`)}break;case"wall_clear":removeAllStickers();break;case"wall_reload":break;case"sticker_add":if(StickerManager.hasSticker(data.data.sticker_id)){Debug.warn("stickers",`Duplicate sticker ignored: ${data.data.sticker_id}`);return}Debug.debug("network","Adding new sticker:",data.data.path);addSticker(data.data.path,data.data.sticker_id);break;case"sticker_remove":Debug.debug("network","Removing sticker:",data.data.sticker_id);removeSticker(data.data.sticker_id);break;case"wall_sync":Debug.debug("network","Sync requested - waiting 10 seconds before executing");setTimeout((()=>{handleWallSync(data)}),1e4);break;default:Debug.warn("network","Unknown sticker action:",data.type);Debug.debug("network","Unknown received message:",data)}}catch(error){Debug.error("network","Error processing message:",error)}}}}const Engine=Matter.Engine,Runner=Matter.Runner,Bodies=Matter.Bodies,Composite=Matter.Composite,Events=Matter.Events;const engine=Engine.create({enableSleeping:config.world.enableSleeping});function resizeCanvas(){canvas.width=window.innerWidth;canvas.height=window.innerHeight;Debug.debug("messages","Canvas Size set:",canvas.width,canvas.height);if(worldWallsCreatedFlag){createWalls()}}window.addEventListener("resize",resizeCanvas);resizeCanvas();const RotationManager={lastValue:null,getRandomRotation(){let value=(Math.random()*.2).toFixed(3);if(this.lastValue===null||this.lastValue<0){value=Math.abs(value)}else{value=-Math.abs(value)}this.lastValue=parseFloat(value);Debug.debug("physics","Random rotation value:",this.lastValue);return this.lastValue}};function createWalls(){if(worldWallsCreatedFlag){Composite.remove(engine.world,worldWalls);worldWalls=[]}const WallGroundBottom=Bodies.rectangle(canvas.width/2,canvas.height,canvas.width,50,{label:"groundBottom",isStatic:true,restitution:config.world.walls.forceRestitution});const WallGroundtop=Bodies.rectangle(canvas.width/2,0,canvas.width,50,{label:"groundTop",isStatic:true,restitution:config.world.walls.forceRestitution});const WallGroundRight=Bodies.rectangle(canvas.width,canvas.height/2,50,canvas.height,{label:"groundRight",isStatic:true,restitution:config.world.walls.forceRestitution});const WallGroundLeft=Bodies.rectangle(0,canvas.height/2,50,canvas.height,{label:"groundLeft",isStatic:true,restitution:config.world.walls.forceRestitution});const WallCenterBlock=Bodies.rectangle(canvas.width/2,canvas.height/2,290,120,{label:"centerBlock",isStatic:true,restitution:config.world.walls.forceRestitution});worldWalls.push(WallGroundBottom);worldWalls.push(WallGroundtop);worldWalls.push(WallGroundRight);worldWalls.push(WallGroundLeft);if(config.world.walls.enableCentralBlock){worldWalls.push(WallCenterBlock)}Composite.add(engine.world,worldWalls);worldWallsCreatedFlag=true;Debug.debug("messages","Walls created")}createWalls();function randomIntFromInterval(min,max){return Math.floor(Math.random()*(max-min+1)+min)}function calculateProportionalSize(originalWidth,originalHeight,maxSize){let newWidth,newHeight;if(originalWidth>originalHeight){newWidth=maxSize;newHeight=originalHeight/originalWidth*maxSize}else{newHeight=maxSize;newWidth=originalWidth/originalHeight*maxSize}return{width:Math.round(newWidth),height:Math.round(newHeight)}}function calculateStickerSize(){const stickerPercentage=Math.min(stickers.length/(config.stickers.maxCount-config.stickers.maxCountOffset),1);StickerSize=Math.round(config.stickers.sizeMax-stickerPercentage*(config.stickers.sizeMax-config.stickers.sizeMin));Debug.debug("stickers","Sticker percentage: ",stickerPercentage," Sticker size: ",StickerSize)}function updateAllStickerBodiesSizes(){const bodies=Composite.allBodies(engine.world).filter((body=>!body.isStatic));stickers.forEach(((sticker,index)=>{if(index>=bodies.length)return;const corrected_size=calculateProportionalSize(sticker.img.width,sticker.img.height,StickerSize*config.stickers.hitBoxFactor);const position={...sticker.body.position};const velocity={...sticker.body.velocity};const angle=sticker.body.angle;Composite.remove(engine.world,sticker.body);const newBody=Bodies.rectangle(position.x,position.y,corrected_size.width,corrected_size.height,{restitution:config.stickers.physics.restitution,frictionAir:config.stickers.physics.frictionAir,friction:config.stickers.physics.friction,inertia:Infinity,inverseInertia:config.stickers.physics.inverseInertia});Matter.Body.setPosition(newBody,position);Matter.Body.setAngle(newBody,angle);Matter.Body.setVelocity(newBody,velocity);Composite.add(engine.world,newBody);sticker.body=newBody}))}function addSticker(stickerPath,stickerId){if(StickerManager.hasSticker(stickerId)){Debug.warn("stickers",`Attempt to add duplicate sticker: ${stickerId}`);return}const side=Math.floor(Math.random()*4);let startingX,startingY;switch(side){case 0:startingX=Math.random()*canvas.width;startingY=100;break;case 1:startingX=canvas.width-100;startingY=Math.random()*canvas.height;break;case 2:startingX=Math.random()*canvas.width;startingY=canvas.height-100;break;case 3:startingX=100;startingY=Math.random()*canvas.height;break}Debug.debug("stickers","Starting position: ",startingX,startingY);const img=new Image;img.src=stickerPath;img.onload=()=>{calculateStickerSize();updateAllStickerBodiesSizes();const x=startingX;const y=startingY;const corrected_size=calculateProportionalSize(img.width,img.height,StickerSize*config.stickers.hitBoxFactor);const body=Bodies.rectangle(x,y,corrected_size.width,corrected_size.height,{restitution:config.stickers.physics.restitution,frictionAir:config.stickers.physics.frictionAir,friction:config.stickers.physics.friction,inertia:Infinity,inverseInertia:config.stickers.physics.inverseInertia});const targetX=canvas.width/2;const targetY=canvas.height/2;const angle=Math.atan2(targetY-startingY,targetX-startingX);const speed=config.stickers.physics.initialSpeed;Matter.Body.setVelocity(body,{x:Math.cos(angle)*speed,y:Math.sin(angle)*speed});Matter.Body.setAngle(body,RotationManager.getRandomRotation());Debug.debug("messages","Created sticker at: ",x,y," with angle: ",angle," and speed: ",speed,"");Composite.add(engine.world,body);const stickerObj={id:stickerId,img:img,body:body,scale:config.animations.flyIn.initialScale,alpha:config.animations.flyIn.initialAlpha};stickers.push(stickerObj);StorageManager.saveSticker(stickerObj);AnimationManager.startAnimation(stickerObj)};if(stickers.length>config.stickers.maxCount){const oldSticker=stickers.shift();Composite.remove(engine.world,oldSticker.body);StorageManager.removeSticker(oldSticker.id)}}function removeSticker(stickerId){const index=stickers.findIndex((sticker=>sticker.id===stickerId));if(index!==-1){Composite.remove(engine.world,stickers[index].body);stickers.splice(index,1);StorageManager.removeSticker(stickerId);calculateStickerSize();updateAllStickerBodiesSizes();Debug.debug("stickers",`Removed sticker: ${stickerId}`)}}function restoreStickers(){const storedStickers=StorageManager.getAllStickers();Debug.info("storage",`Restoring ${storedStickers.length} stickers`);removeAllStickers();storedStickers.forEach((storedSticker=>{addSticker(storedSticker.path,storedSticker.id)}))}function removeAllStickers(){stickers.forEach((sticker=>{Matter.World.remove(engine.world,sticker.body)}));stickers=[];StorageManager.clearStickers()}function getRandomGravity(){return Math.random()*.1-.1}function resetGravity(){engine.world.gravity.x=config.world.gravity.x;engine.world.gravity.y=config.world.gravity.y;Debug.debug("physics","Gravity back to default")}function applyRandomGravity(){Debug.debug("physics","Applying random gravity");const gravity=getRandomGravity();engine.world.gravity.x=gravity;engine.world.gravity.y=gravity*-1;setTimeout(resetGravity,1e4)}function toggleFullScreen(){if(!document.fullscreenElement){document.documentElement.requestFullscreen()}else if(document.exitFullscreen){document.exitFullscreen()}Debug.debug("messages","Functions loaded")}function initializeMouseInteraction(){mouse=Matter.Mouse.create(canvas);mouse.pixelRatio=1;mouseConstraint=Matter.MouseConstraint.create(engine,{mouse:mouse,throwMultiplier:config.mouse.constraint.throwMultiplier,constraint:{stiffness:config.mouse.constraint.stiffness,damping:config.mouse.constraint.damping,render:{visible:false}}});Matter.Composite.add(engine.world,mouseConstraint);Matter.Events.on(mouseConstraint,"mousedown",(function(event){const mousePosition=event.mouse.position;Debug.debug("physics","Mouse down at:",mousePosition)}));Matter.Events.on(mouseConstraint,"mousemove",(function(event){}));Matter.Events.on(mouseConstraint,"mouseup",(function(event){const mousePosition=event.mouse.position;Debug.debug("physics","Mouse up at:",mousePosition)}));Matter.Events.on(mouseConstraint,"enddrag",(function(event){if(event.body){const velocityMultiplier=1.5;Matter.Body.setVelocity(event.body,{x:event.body.velocity.x*velocityMultiplier,y:event.body.velocity.y*velocityMultiplier})}}));canvas.addEventListener("mousewheel",(function(event){event.preventDefault()}));canvas.addEventListener("touchmove",(function(event){event.preventDefault()}),{passive:false})}function toggleMouseInteraction(enable){if(enable&&!mouseConstraint){initializeMouseInteraction()}else if(!enable&&mouseConstraint){Matter.Composite.remove(engine.world,mouseConstraint);mouseConstraint=null}config.mouse.enable=enable}function handleWallSync(message){Debug.info("network",`Running Sync feature now...`);const serverStickers=message.data;const serverStickerIds=new Set(serverStickers.map((s=>s.sticker_id)));stickers=stickers.filter((sticker=>{if(!serverStickerIds.has(sticker.id)){removeSticker(sticker.id);Debug.info("network",`Removed sticker not in sync: ${sticker.id}`);return false}return true}));serverStickers.forEach((serverSticker=>{const exists=stickers.some((s=>s.id===serverSticker.sticker_id));if(!exists){addSticker(serverSticker.path,serverSticker.sticker_id);Debug.info("network",`Added new sticker from sync: ${serverSticker.sticker_id}`)}}))}(function render(){window.requestAnimationFrame(render);canvas_context.clearRect(0,0,canvas.width,canvas.height);AnimationManager.updateAnimations(performance.now());stickers.forEach((sticker=>{const{position:position,angle:angle}=sticker.body;canvas_context.save();canvas_context.translate(position.x,position.y);canvas_context.rotate(angle);const scale=sticker.scale||1;const alpha=sticker.alpha||1;canvas_context.globalAlpha=alpha;canvas_context.scale(scale,scale);const{width:width,height:height}=calculateProportionalSize(sticker.img.width,sticker.img.height,StickerSize);canvas_context.drawImage(sticker.img,-width/2,-height/2,width,height);if(config.debug.showPhysics){canvas_context.restore();canvas_context.save();canvas_context.strokeStyle=config.debug.colors.bounds;canvas_context.lineWidth=1;canvas_context.beginPath();canvas_context.moveTo(sticker.body.bounds.min.x,sticker.body.bounds.min.y);canvas_context.lineTo(sticker.body.bounds.max.x,sticker.body.bounds.min.y);canvas_context.lineTo(sticker.body.bounds.max.x,sticker.body.bounds.max.y);canvas_context.lineTo(sticker.body.bounds.min.x,sticker.body.bounds.max.y);canvas_context.closePath();canvas_context.stroke();canvas_context.fillStyle=config.debug.colors.center;canvas_context.beginPath();canvas_context.arc(position.x,position.y,3,0,Math.PI*2);canvas_context.fill();const velocityScale=10;canvas_context.strokeStyle="#0000ff";canvas_context.beginPath();canvas_context.moveTo(position.x,position.y);canvas_context.lineTo(position.x+sticker.body.velocity.x*velocityScale,position.y+sticker.body.velocity.y*velocityScale);canvas_context.stroke()}if(config.debug.showStickerSize){canvas_context.font="12px Arial";canvas_context.fillStyle=config.debug.colors.text;canvas_context.textAlign="center";canvas_context.textBaseline="top";const sizeText=`${Math.round(width)}x${Math.round(height)}`;canvas_context.fillText(sizeText,0,height/2);const velocity=Math.sqrt(sticker.body.velocity.x*sticker.body.velocity.x+sticker.body.velocity.y*sticker.body.velocity.y).toFixed(2);canvas_context.fillText(`v: ${velocity}`,0,height/2+12)}canvas_context.restore()}));if(config.debug.showWalls){let bodies=Composite.allBodies(engine.world);canvas_context.beginPath();for(let i=0;i<bodies.length;i+=1){let body=bodies[i];if(!body.isStatic&&!config.debug.showBounds)continue;canvas_context.save();canvas_context.beginPath();let vertices=body.vertices;canvas_context.moveTo(vertices[0].x,vertices[0].y);for(let j=1;j<vertices.length;j+=1){canvas_context.lineTo(vertices[j].x,vertices[j].y)}canvas_context.closePath();switch(body.label){case"centerBlock":canvas_context.strokeStyle=config.debug.colors.centerWall||"#ff00ff";canvas_context.fillStyle=config.debug.colors.centerWall+"40"||"#ff00ff40";break;case"groundBottom":case"groundTop":case"groundLeft":case"groundRight":canvas_context.strokeStyle=config.debug.colors.walls;canvas_context.fillStyle=config.debug.colors.walls+"40";break;default:canvas_context.strokeStyle=config.debug.colors.bounds;canvas_context.fillStyle=config.debug.colors.bounds+"40"}canvas_context.lineWidth=3;canvas_context.stroke();canvas_context.fill();if(config.debug.showLabels){canvas_context.fillStyle=config.debug.colors.text;canvas_context.font="18px Arial";canvas_context.textAlign="center";canvas_context.textBaseline="middle";canvas_context.fillText(body.isStatic?body.label:body.id,body.position.x,body.position.y)}canvas_context.restore()}}if(config.debug.showPhysics&&mouseConstraint.constraint.bodyB){const pos=mouseConstraint.constraint.bodyB.position;const offset=mouseConstraint.constraint.pointB;const mousePos=mouseConstraint.mouse.position;canvas_context.beginPath();canvas_context.moveTo(pos.x+offset.x,pos.y+offset.y);canvas_context.lineTo(mousePos.x,mousePos.y);canvas_context.strokeStyle=config.debug.colors.physics;canvas_context.stroke()}})();resetGravity();var runner=Runner.create();Runner.run(runner,engine);if(config.mouse.enable){initializeMouseInteraction()}Events.on(engine,"collisionStart",(event=>{if(!config.world.walls.colisionEffectEnable){return}event.pairs.forEach((pair=>{const bodyA=pair.bodyA;const bodyB=pair.bodyB;if(bodyA.isStatic||bodyB.isStatic){const movingBody=bodyA.isStatic?bodyB:bodyA;const speed=randomIntFromInterval(1,2);const randomAngle=Math.random()*Math.PI*2;Matter.Body.setVelocity(movingBody,{x:Math.cos(randomAngle)*speed,y:Math.sin(randomAngle)*speed})}}))}));document.addEventListener("DOMContentLoaded",(()=>{restoreStickers();new WebSocketClient}));window.addEventListener("keydown",(event=>{switch(event.key){case"1":config.debug.showPhysics=false;config.debug.showWalls=true;config.debug.showLabels=true;config.debug.showStickerSize=true;config.debug.showBounds=true;break;case"2":config.debug.showPhysics=false;config.debug.showWalls=false;config.debug.showLabels=false;config.debug.showStickerSize=false;config.debug.showBounds=false;break;case"3":config.debug.showPhysics=!config.debug.showPhysics;break;case"4":config.debug.showStickerSize=!config.debug.showStickerSize;break;case"5":config.debug.showWalls=!config.debug.showWalls;break;case"6":config.debug.showLabels=!config.debug.showLabels;break;case"7":config.debug.showBounds=!config.debug.showBounds;break}}));setInterval((()=>{AnimationManager.checkAllStickers()}),config.animations.protection.checkInterval);
\ No newline at end of file
+let config={debug:{enable:true,showWalls:false,showBounds:false,showLabels:false,showWorld:false,showStickers:false,showStickerSize:false,showPhysics:false,showSticker:false,showStickerVelocity:false,showStickerPosition:false,colors:{walls:'#ee00ff',centerWall:'#ff0000',bounds:'#00ff00',center:'#ff0000',text:'#ffffff'}},bot:{username:"",fullName:""},stickers:{maxCount:150,variantSize:256,maxCountOffset:20,sizeMax:180,sizeMin:100,hitBoxFactor:0.8,physics:{enable:true,friction:0.01,frictionAir:0.01,restitution:0.1,inertia:0,inverseInertia:0,initialSpeed:0.2}},world:{enableSleeping:true,walls:{colisionEffectEnable:true,forceRestitution:0,enableCentralBlock:true},gravity:{enable:false,x:0,y:0,shiftEnable:false,shiftTime:30,stopTime:10,shiftFactor:0.001,},drift:{enable:false,force:0.0005}},animations:{flyIn:{duration:1000,initialScale:0.1,finalScale:1,initialAlpha:0.01,finalAlpha:1},protection:{timeout:5000,checkInterval:10000}},stats:{reportInterval:5000},atlas:{enable:true},network:{compact:true},mouse:{enable:true,throwMultiplier:1,constraint:{stiffness:0.1,damping:0,visible:true}}};const Debug={LEVELS:{ERROR:'error',WARN:'warn',INFO:'info',DEBUG:'debug'},config:{enabled:config.debug.enable,level:'debug',prefix:'',features:{messages:true,network:true,physics:true,stickers:true,storage:true}},log(feature,level,...args){if(!this.config.enabled||!this.config.features[feature.toLowerCase()]){return;}
+const timestamp=new Date().toISOString().split('T')[1].split('.')[0];const prefix=`${this.config.prefix} [${timestamp}] [${feature.toUpperCase()}]`;switch(level){case this.LEVELS.ERROR:console.error(prefix,...args);break;case this.LEVELS.WARN:console.warn(prefix,...args);break;case this.LEVELS.INFO:console.info(prefix,...args);break;case this.LEVELS.DEBUG:console.debug(prefix,...args);break;default:console.log(prefix,...args);}},error(feature,...args){this.log(feature,this.LEVELS.ERROR,...args);},warn(feature,...args){this.log(feature,this.LEVELS.WARN,...args);},info(feature,...args){this.log(feature,this.LEVELS.INFO,...args);},debug(feature,...args){this.log(feature,this.LEVELS.DEBUG,...args);}};const canvas=document.getElementById('stickerCanvas');const canvas_context=canvas.getContext('2d');let stickers=[];let StickerSize=config.stickers.maxCount;let worldWallsCreatedFlag=false;let worldWalls=[];let mouse;let mouseConstraint;const FrameStats={frames:0,lastReset:performance.now(),tick(){this.frames++;},collect(){const now=performance.now();const fps=(this.frames*1000)/Math.max(now-this.lastReset,1);this.frames=0;this.lastReset=now;return Math.round(fps*10)/10;}};const StorageManager={STORAGE_KEY:'wall_stickers',saveSticker(sticker){let stickersData=this.getAllStickers();stickersData.push({id:sticker.id,path:sticker.path||sticker.img.src,position:sticker.body.position,angle:sticker.body.angle,velocity:sticker.body.velocity});localStorage.setItem(this.STORAGE_KEY,JSON.stringify(stickersData));Debug.debug('storage','Saved sticker:',sticker.id);},removeSticker(stickerId){let stickersData=this.getAllStickers();stickersData=stickersData.filter(s=>s.id!==stickerId);localStorage.setItem(this.STORAGE_KEY,JSON.stringify(stickersData));Debug.debug('storage','Removed sticker:',stickerId);},removeStickers(stickerIds){const removeIds=new Set(stickerIds);const stickersData=this.getAllStickers().filter(s=>!removeIds.has(s.id));localStorage.setItem(this.STORAGE_KEY,JSON.stringify(stickersData));Debug.debug('storage','Removed stickers:',removeIds.size);},getAllStickers(){const data=localStorage.getItem(this.STORAGE_KEY);return data?JSON.parse(data):[];},clearStickers(){localStorage.removeItem(this.STORAGE_KEY);Debug.info('storage','Cleared all stickers from storage');}};const AnimationManager={animatingStickers:new Map(),startAnimation(sticker){const startTime=performance.now();this.animatingStickers.set(sticker.id,{startTime,initialPosition:{...sticker.body.position},initialScale:config.animations.flyIn.initialScale,lastUpdateTime:startTime,isAnimating:true});},updateAnimations(currentTime){this.animatingStickers.forEach((animation,stickerId)=>{const sticker=stickers.find(s=>s.id===stickerId);if(!sticker){this.animatingStickers.delete(stickerId);Debug.warn('animations',`Sticker not found, removing animation: ${stickerId}`);return;}
+const elapsed=currentTime-animation.startTime;const timeSinceLastUpdate=currentTime-animation.lastUpdateTime;if(elapsed>=config.animations.protection.timeout){Debug.warn('animations',`Animation timeout for sticker: ${stickerId}`);this.forceCompleteAnimation(sticker);return;}
+if(timeSinceLastUpdate>config.animations.protection.checkInterval){if(sticker.scale!==1||sticker.alpha!==1){Debug.warn('animations',`Possible stuck animation detected for sticker: ${stickerId}`);this.forceCompleteAnimation(sticker);return;}}
+const progress=Math.min(elapsed/config.animations.flyIn.duration,1);const eased=this.easeInOutQuad(progress);const newScale=this.lerp(config.animations.flyIn.initialScale,config.animations.flyIn.finalScale,eased);const newAlpha=this.lerp(config.animations.flyIn.initialAlpha,config.animations.flyIn.finalAlpha,eased);if(sticker.scale!==newScale||sticker.alpha!==newAlpha){sticker.scale=newScale;sticker.alpha=newAlpha;animation.lastUpdateTime=currentTime;}
+if(progress>=1){this.animatingStickers.delete(stickerId);}});},completeAnimation(sticker){if(this.animatingStickers.has(sticker.id)){sticker.scale=config.animations.flyIn.finalScale;sticker.alpha=config.animations.flyIn.finalAlpha;this.animatingStickers.delete(sticker.id);Debug.debug('animations',`Animation completed normally for sticker: ${sticker.id}`);}},forceCompleteAnimation(sticker){sticker.scale=config.animations.flyIn.finalScale;sticker.alpha=config.animations.flyIn.finalAlpha;this.animatingStickers.delete(sticker.id);Debug.warn('animations',`Forced animation completion for sticker: ${sticker.id}`);},checkAllStickers(){stickers.forEach(sticker=>{if(sticker.scale!==config.animations.flyIn.finalScale||sticker.alpha!==config.animations.flyIn.finalAlpha){Debug.warn('animations',`Found stuck sticker: ${sticker.id}, forcing completion`);this.forceCompleteAnimation(sticker);}});},lerp(start,end,t){return start*(1-t)+end*t;},easeInOutQuad(t){return t<0.5?2*t*t:1-Math.pow(-2*t+2,2)/2;}};const AtlasCache={pages:new Map(),loadPage(pageUrl){if(!this.pages.has(pageUrl)){this.pages.set(pageUrl,loadStickerImage(pageUrl).catch(error=>{this.pages.delete(pageUrl);throw error;}));}
+return this.pages.get(pageUrl);},async getFrame(frame){const page=await this.loadPage(frame.page);const frameCanvas=document.createElement('canvas');frameCanvas.width=frame.w;frameCanvas.height=frame.h;frameCanvas.getContext('2d').drawImage(page,frame.x,frame.y,frame.w,frame.h,0,0,frame.w,frame.h);return frameCanvas;},prune(usedPages){this.pages.forEach((_,pageUrl)=>{if(!usedPages.has(pageUrl)){this.pages.delete(pageUrl);}});}};const StickerManager={hasSticker(stickerId){return stickers.some(sticker=>sticker.id===stickerId);},removeSticker(stickerId){const index=stickers.findIndex(sticker=>sticker.id===stickerId);if(index!==-1){const sticker=stickers[index];Composite.remove(engine.world,sticker.body);stickers.splice(index,1);StorageManager.removeSticker(stickerId);return true;}
+return false;}};const WallProtocol={types:['wall_clear','wall_reload','wall_restart','wall_sync','wall_ignore','sticker_add','sticker_remove','sticker_add_batch','sticker_remove_batch','bot_info','wall_budget'],textDecoder:new TextDecoder(),decodeFrame(buffer){const[type,data]=this.unpack(new DataView(buffer));const messageType=typeof type==='number'?this.types[type]:type;switch(messageType){case'sticker_add':return{type:messageType,data:this.expandSticker(data)};case'sticker_remove':return{type:messageType,data:{sticker_id:data}};case'sticker_add_batch':return{type:messageType,data:{stickers:data.map(sticker=>this.expandSticker(sticker))}};case'sticker_remove_batch':return{type:messageType,data:{sticker_ids:data}};case'wall_sync':return{type:messageType,data:data[0].map(sticker=>this.expandSticker(sticker,data[1]))};default:return{type:messageType,data:data};}},expandSticker([handle,path,boostFactor,atlas,traceId],pages=null){const sticker={sticker_id:handle,path:path,boost_factor:boostFactor};if(typeof path==='string'){sticker.path=path.startsWith('/')?path.slice(1):`stickers/${path}`;}
+if(atlas){sticker.atlas={page:pages?pages[atlas[0]]:atlas[0],x:atlas[1],y:atlas[2],w:atlas[3],h:atlas[4]};}
+if(traceId){sticker.trace_id=traceId;}
+return sticker;},unpack(view){let offset=0;const readString=(length)=>{const value=this.textDecoder.decode(new Uint8Array(view.buffer,view.byteOffset+offset,length));offset+=length;return value;};const readArray=(length)=>{const value=new Array(length);for(let index=0;index<length;index++){value[index]=read();}
+return value;};const readMap=(length)=>{const value={};for(let index=0;index<length;index++){const key=read();value[key]=read();}
+return value;};const read=()=>{const byte=view.getUint8(offset++);let value;if(byte<=0x7f)return byte;if(byte>=0xe0)return byte-0x100;if((byte&0xf0)===0x80)return readMap(byte&0x0f);if((byte&0xf0)===0x90)return readArray(byte&0x0f);if((byte&0xe0)===0xa0)return readString(byte&0x1f);switch(byte){case 0xc0:return null;case 0xc2:return false;case 0xc3:return true;case 0xca:value=view.getFloat32(offset);offset+=4;return value;case 0xcb:value=view.getFloat64(offset);offset+=8;return value;case 0xcc:value=view.getUint8(offset);offset+=1;return value;case 0xcd:value=view.getUint16(offset);offset+=2;return value;case 0xce:value=view.getUint32(offset);offset+=4;return value;case 0xcf:value=Number(view.getBigUint64(offset));offset+=8;return value;case 0xd0:value=view.getInt8(offset);offset+=1;return value;case 0xd1:value=view.getInt16(offset);offset+=2;return value;case 0xd2:value=view.getInt32(offset);offset+=4;return value;case 0xd3:value=Number(view.getBigInt64(offset));offset+=8;return value;case 0xd9:value=view.getUint8(offset);offset+=1;return readString(value);case 0xda:value=view.getUint16(offset);offset+=2;return readString(value);case 0xdb:value=view.getUint32(offset);offset+=4;return readString(value);case 0xdc:value=view.getUint16(offset);offset+=2;return readArray(value);case 0xdd:value=view.getUint32(offset);offset+=4;return readArray(value);case 0xde:value=view.getUint16(offset);offset+=2;return readMap(value);case 0xdf:value=view.getUint32(offset);offset+=4;return readMap(value);default:throw new Error(`Unsupported MessagePack type 0x${byte.toString(16)}`);}};return read();}};class WebSocketClient{constructor(){this.reconnectAttempts=0;this.maxReconnectAttempts=99999;this.reconnectDelay=1000;this.messageDiv=document.getElementById('messageDIV');this.messageCard=document.getElementById('messageCard');this.statsTimer=null;this.connect();}
+send(data){if(this.ws&&this.ws.readyState===WebSocket.OPEN){this.ws.send(JSON.stringify(data));}}
+startStatsReporter(){if(this.statsTimer){clearInterval(this.statsTimer);}
+FrameStats.collect();this.statsTimer=setInterval(()=>{this.send({type:'wall_stats',data:{fps:FrameStats.collect(),bodies:stickers.length}});},config.stats.reportInterval);}
+updateMessage(message,isConnecting=false){if(this.messageCard){if(isConnecting){this.messageCard.innerHTML=`
+                    <div class="com-info">
+                        <p>
+                            <strong>Almost there...</strong>
+                            <br>
+                            ${message}
+                        </p>
+                    </div>`;}else{this.messageCard.innerHTML='';const textDiv=document.createElement('div');textDiv.classList.add('text-content');const titleH1=document.createElement('h1');titleH1.textContent='sticker wall';const textP=document.createElement('p');textP.innerHTML=`send your sticker to<br>@${config.bot.username}`;textDiv.appendChild(titleH1);textDiv.appendChild(textP);const qrDiv=document.createElement('div');qrDiv.classList.add('qr-container');qrDiv.id='qrcode';this.messageCard.appendChild(textDiv);this.messageCard.appendChild(qrDiv);const botHandle=`https://t.me/${config.bot.username}`;new QRCode(document.getElementById("qrcode"),{text:botHandle,width:100,height:100,colorDark:"#000000",colorLight:"#ffffff",correctLevel:QRCode.CorrectLevel.H});}}}
+getWebSocketParams(){const params=new URLSearchParams();if(config.atlas.enable){params.set('atlas','1');}
+if(config.stickers.variantSize){params.set('size',config.stickers.variantSize);}
+if(config.network.compact){params.set('encoding','msgpack');}
+const channel=new URLSearchParams(window.location.search).get('channel');if(channel){params.set('channel',channel);}
+const query=params.toString();return query?`?${query}`:'';}
+getWebSocketUrl(){const hostname=window.location.hostname;const port=window.location.port;const protocol=window.location.protocol==='https:'?'wss:':'ws:';if(!hostname||hostname==='localhost'||hostname==='127.0.0.1'){return'ws://127.0.0.1:8000/ws/wall';}
+if(port){return`${protocol}//${hostname}:${port}/ws/wall`;}else{return`${protocol}//${hostname}/ws/wall`;}}
+connect(){this.updateMessage("Please wait...",true);this.ws=new WebSocket(this.getWebSocketUrl()+this.getWebSocketParams());this.ws.binaryType='arraybuffer';this.ws.onopen=()=>{Debug.info('network','WebSocket Connected');this.reconnectAttempts=0;this.reconnectDelay=1000;this.ws.send(JSON.stringify({type:'get_bot_info'}));this.startStatsReporter();};this.ws.onclose=()=>{clearInterval(this.statsTimer);this.statsTimer=null;if(this.reconnectAttempts<this.maxReconnectAttempts){Debug.warn('network',`WebSocket Reconnecting... Attempt ${this.reconnectAttempts + 1} - Wait: ${this.reconnectDelay + 250}`);this.updateMessage("Reconnecting to server...",true);setTimeout(()=>this.connect(),this.reconnectDelay);this.reconnectAttempts++;this.reconnectDelay+=250;}else{Debug.error('network','WebSocket Failed to connect after maximum attempts');this.updateMessage("Failed to connect to server",true);}};this.ws.onerror=(error)=>{Debug.error('network','WebSocket Error:',error);this.updateMessage("Connection error",true);};this.ws.onmessage=(event)=>{try{const data=typeof event.data==='string'?JSON.parse(event.data):WallProtocol.decodeFrame(event.data);Debug.debug('network','Received message:',data);switch(data.type){case'bot_info':Debug.debug('network','BOT Information:',data.data);if(data.data.username){config.bot.username=data.data.username;config.bot.fullName=data.data.full_name||data.data.username;this.updateMessage(`@${data.data.username}`);}
+break;case'wall_clear':removeAllStickers();break;case'wall_reload':break;case'sticker_add':if(StickerManager.hasSticker(data.data.sticker_id)){Debug.warn('stickers',`Duplicate sticker ignored: ${data.data.sticker_id}`);return;}
+Debug.debug('network','Adding new sticker:',data.data.path);const receivedAt=performance.now();const placed=addSticker(data.data.path,data.data.sticker_id);if(data.data.trace_id){placed.then(ok=>ok&&requestAnimationFrame(()=>this.send({type:'wall_render',data:{trace_id:data.data.trace_id,render_ms:performance.now()-receivedAt}})));}
+break;case'sticker_remove':Debug.debug('network','Removing sticker:',data.data.sticker_id);removeSticker(data.data.sticker_id);break;case'sticker_remove_batch':Debug.debug('network','Removing stickers:',data.data.sticker_ids.length);removeStickers(data.data.sticker_ids);break;case'sticker_add_batch':Debug.debug('network','Adding stickers:',data.data.stickers.length);data.data.stickers.forEach(sticker=>{if(!StickerManager.hasSticker(sticker.sticker_id)){addSticker(sticker.path,sticker.sticker_id);}});break;case'wall_budget':Debug.info('network','Sticker budget from server:',data.data.max_stickers);applyStickerBudget(data.data.max_stickers);break;case'wall_sync':Debug.debug('network','Sync requested - waiting 10 seconds before executing');setTimeout(()=>{handleWallSync(data);},10000);break;default:Debug.warn('network','Unknown sticker action:',data.type);Debug.debug('network','Unknown received message:',data);}}catch(error){Debug.error('network','Error processing message:',error);}};}}
+const Engine=Matter.Engine,Runner=Matter.Runner,Bodies=Matter.Bodies,Composite=Matter.Composite,Events=Matter.Events;const engine=Engine.create({enableSleeping:config.world.enableSleeping,});function resizeCanvas(){canvas.width=window.innerWidth;canvas.height=window.innerHeight;Debug.debug('messages','Canvas Size set:',canvas.width,canvas.height);if(worldWallsCreatedFlag){createWalls();}}
+window.addEventListener('resize',resizeCanvas);resizeCanvas();const RotationManager={lastValue:null,getRandomRotation(){let value=(Math.random()*0.2).toFixed(3);if(this.lastValue===null||this.lastValue<0){value=Math.abs(value);}else{value=-Math.abs(value);}
+this.lastValue=parseFloat(value);Debug.debug('physics',"Random rotation value:",this.lastValue);return this.lastValue;}};function createWalls(){if(worldWallsCreatedFlag){Composite.remove(engine.world,worldWalls);worldWalls=[];}
+const WallGroundBottom=Bodies.rectangle(canvas.width/2,canvas.height,canvas.width,50,{label:"groundBottom",isStatic:true,restitution:config.world.walls.forceRestitution});const WallGroundtop=Bodies.rectangle(canvas.width/2,0,canvas.width,50,{label:"groundTop",isStatic:true,restitution:config.world.walls.forceRestitution});const WallGroundRight=Bodies.rectangle(canvas.width,canvas.height/2,50,canvas.height,{label:"groundRight",isStatic:true,restitution:config.world.walls.forceRestitution});const WallGroundLeft=Bodies.rectangle(0,canvas.height/2,50,canvas.height,{label:"groundLeft",isStatic:true,restitution:config.world.walls.forceRestitution});const WallCenterBlock=Bodies.rectangle(canvas.width/2,canvas.height/2,290,120,{label:"centerBlock",isStatic:true,restitution:config.world.walls.forceRestitution});worldWalls.push(WallGroundBottom);worldWalls.push(WallGroundtop);worldWalls.push(WallGroundRight);worldWalls.push(WallGroundLeft);if(config.world.walls.enableCentralBlock){worldWalls.push(WallCenterBlock);}
+Composite.add(engine.world,worldWalls);worldWallsCreatedFlag=true;Debug.debug('messages',"Walls created");}
+createWalls();function randomIntFromInterval(min,max){return Math.floor(Math.random()*(max-min+1)+min);}
+function calculateProportionalSize(originalWidth,originalHeight,maxSize){let newWidth,newHeight;if(originalWidth>originalHeight){newWidth=maxSize;newHeight=(originalHeight/originalWidth)*maxSize;}else{newHeight=maxSize;newWidth=(originalWidth/originalHeight)*maxSize;}
+return{width:Math.round(newWidth),height:Math.round(newHeight)};}
+function calculateStickerSize(){const stickerPercentage=Math.min(stickers.length/Math.max(config.stickers.maxCount-config.stickers.maxCountOffset,1),1);StickerSize=Math.round(config.stickers.sizeMax-(stickerPercentage*(config.stickers.sizeMax-config.stickers.sizeMin)));Debug.debug('stickers',"Sticker percentage: ",stickerPercentage," Sticker size: ",StickerSize);}
+function updateAllStickerBodiesSizes(){const bodies=Composite.allBodies(engine.world).filter(body=>!body.isStatic);stickers.forEach((sticker,index)=>{if(index>=bodies.length)return;const corrected_size=calculateProportionalSize(sticker.img.width,sticker.img.height,(StickerSize*config.stickers.hitBoxFactor));const position={...sticker.body.position};const velocity={...sticker.body.velocity};const angle=sticker.body.angle;Composite.remove(engine.world,sticker.body);const newBody=Bodies.rectangle(position.x,position.y,corrected_size.width,corrected_size.height,{restitution:config.stickers.physics.restitution,frictionAir:config.stickers.physics.frictionAir,friction:config.stickers.physics.friction,inertia:Infinity,inverseInertia:config.stickers.physics.inverseInertia});Matter.Body.setPosition(newBody,position);Matter.Body.setAngle(newBody,angle);Matter.Body.setVelocity(newBody,velocity);Composite.add(engine.world,newBody);sticker.body=newBody;});}
+function addSticker(stickerPath,stickerId,atlasFrame=null){if(StickerManager.hasSticker(stickerId)){Debug.warn('stickers',`Attempt to add duplicate sticker: ${stickerId}`);return Promise.resolve(false);}
+const side=Math.floor(Math.random()*4);let startingX,startingY;switch(side){case 0:startingX=Math.random()*canvas.width;startingY=100;break;case 1:startingX=canvas.width-100;startingY=Math.random()*canvas.height;break;case 2:startingX=Math.random()*canvas.width;startingY=canvas.height-100;break;case 3:startingX=100;startingY=Math.random()*canvas.height;break;}
+Debug.debug('stickers',"Starting position: ",startingX,startingY);const placeSticker=(img)=>{calculateStickerSize();updateAllStickerBodiesSizes();const x=startingX;const y=startingY;const corrected_size=calculateProportionalSize(img.width,img.height,(StickerSize*config.stickers.hitBoxFactor));const body=Bodies.rectangle(x,y,corrected_size.width,corrected_size.height,{restitution:config.stickers.physics.restitution,frictionAir:config.stickers.physics.frictionAir,friction:config.stickers.physics.friction,inertia:Infinity,inverseInertia:config.stickers.physics.inverseInertia});const targetX=canvas.width/2;const targetY=canvas.height/2;const angle=Math.atan2(targetY-startingY,targetX-startingX);const speed=config.stickers.physics.initialSpeed;Matter.Body.setVelocity(body,{x:Math.cos(angle)*speed,y:Math.sin(angle)*speed});Matter.Body.setAngle(body,RotationManager.getRandomRotation());Debug.debug("messages","Created sticker at: ",x,y," with angle: ",angle," and speed: ",speed,"");Composite.add(engine.world,body);const stickerObj={id:stickerId,path:stickerPath,img:img,body:body,scale:config.animations.flyIn.initialScale,alpha:config.animations.flyIn.initialAlpha};stickers.push(stickerObj);StorageManager.saveSticker(stickerObj);AnimationManager.startAnimation(stickerObj);return true;};const loadFailed=(error)=>{Debug.error('stickers',`Failed to load sticker: ${stickerId}`,error);return false;};let placed;if(atlasFrame){placed=AtlasCache.getFrame(atlasFrame).catch(()=>loadStickerImage(stickerPath)).then(placeSticker).catch(loadFailed);}else{placed=loadStickerImage(stickerPath).then(placeSticker).catch(loadFailed);}
+if(stickers.length>config.stickers.maxCount){const oldSticker=stickers.shift();Composite.remove(engine.world,oldSticker.body);StorageManager.removeSticker(oldSticker.id);}
+return placed;}
+function loadStickerImage(imagePath){return new Promise((resolve,reject)=>{const img=new Image();img.onload=()=>resolve(img);img.onerror=reject;img.src=imagePath;});}
+function removeSticker(stickerId){const index=stickers.findIndex(sticker=>sticker.id===stickerId);if(index!==-1){Composite.remove(engine.world,stickers[index].body);stickers.splice(index,1);StorageManager.removeSticker(stickerId);calculateStickerSize();updateAllStickerBodiesSizes();Debug.debug('stickers',`Removed sticker: ${stickerId}`);}}
+function removeStickers(stickerIds){const removeIds=new Set(stickerIds);const removed=stickers.filter(sticker=>removeIds.has(sticker.id));if(removed.length===0)return;Composite.remove(engine.world,removed.map(sticker=>sticker.body));stickers=stickers.filter(sticker=>!removeIds.has(sticker.id));StorageManager.removeStickers(removed.map(sticker=>sticker.id));calculateStickerSize();updateAllStickerBodiesSizes();Debug.debug('stickers',`Removed ${removed.length} stickers`);}
+function restoreStickers(){const storedStickers=StorageManager.getAllStickers();Debug.info('storage',`Restoring ${storedStickers.length} stickers`);removeAllStickers();storedStickers.forEach(storedSticker=>{addSticker(storedSticker.path,storedSticker.id);});}
+function removeAllStickers(){stickers.forEach(sticker=>{Matter.World.remove(engine.world,sticker.body);});stickers=[];StorageManager.clearStickers();}
+function getRandomGravity(){return(Math.random()*0.1)-0.1;}
+function resetGravity(){engine.world.gravity.x=config.world.gravity.x;engine.world.gravity.y=config.world.gravity.y;Debug.debug('physics',"Gravity back to default");}
+function applyRandomGravity(){Debug.debug('physics',"Applying random gravity");const gravity=getRandomGravity();engine.world.gravity.x=gravity;engine.world.gravity.y=gravity*-1;setTimeout(resetGravity,10000);}
+function toggleFullScreen(){if(!document.fullscreenElement){document.documentElement.requestFullscreen();}else if(document.exitFullscreen){document.exitFullscreen();}
+Debug.debug('messages',"Functions loaded");}
+function initializeMouseInteraction(){mouse=Matter.Mouse.create(canvas);mouse.pixelRatio=1
+mouseConstraint=Matter.MouseConstraint.create(engine,{mouse:mouse,throwMultiplier:config.mouse.constraint.throwMultiplier,constraint:{stiffness:config.mouse.constraint.stiffness,damping:config.mouse.constraint.damping,render:{visible:false}}});Matter.Composite.add(engine.world,mouseConstraint);Matter.Events.on(mouseConstraint,'mousedown',function(event){const mousePosition=event.mouse.position;Debug.debug('physics','Mouse down at:',mousePosition);});Matter.Events.on(mouseConstraint,'mousemove',function(event){});Matter.Events.on(mouseConstraint,'mouseup',function(event){const mousePosition=event.mouse.position;Debug.debug('physics','Mouse up at:',mousePosition);});Matter.Events.on(mouseConstraint,'enddrag',function(event){if(event.body){const velocityMultiplier=1.5;Matter.Body.setVelocity(event.body,{x:event.body.velocity.x*velocityMultiplier,y:event.body.velocity.y*velocityMultiplier});}});canvas.addEventListener('mousewheel',function(event){event.preventDefault();});canvas.addEventListener('touchmove',function(event){event.preventDefault();},{passive:false});}
+function toggleMouseInteraction(enable){if(enable&&!mouseConstraint){initializeMouseInteraction();}else if(!enable&&mouseConstraint){Matter.Composite.remove(engine.world,mouseConstraint);mouseConstraint=null;}
+config.mouse.enable=enable;}
+function applyStickerBudget(maxStickers){if(!Number.isInteger(maxStickers)||maxStickers<=0){return;}
+config.stickers.maxCount=maxStickers;while(stickers.length>config.stickers.maxCount){const oldSticker=stickers.shift();Composite.remove(engine.world,oldSticker.body);StorageManager.removeSticker(oldSticker.id);}
+calculateStickerSize();updateAllStickerBodiesSizes();}
+function handleWallSync(message){Debug.info('network',`Running Sync feature now...`);const serverStickers=message.data;const serverStickerIds=new Set(serverStickers.map(s=>s.sticker_id));stickers=stickers.filter(sticker=>{if(!serverStickerIds.has(sticker.id)){removeSticker(sticker.id);Debug.info('network',`Removed sticker not in sync: ${sticker.id}`);return false;}
+return true;});AtlasCache.prune(new Set(serverStickers.filter(s=>s.atlas).map(s=>s.atlas.page)));serverStickers.forEach(serverSticker=>{const exists=stickers.some(s=>s.id===serverSticker.sticker_id);if(!exists){addSticker(serverSticker.path,serverSticker.sticker_id,serverSticker.atlas)
+Debug.info('network',`Added new sticker from sync: ${serverSticker.sticker_id}`);}});}
+(function render(){window.requestAnimationFrame(render);FrameStats.tick();canvas_context.clearRect(0,0,canvas.width,canvas.height);AnimationManager.updateAnimations(performance.now());stickers.forEach(sticker=>{const{position,angle}=sticker.body;canvas_context.save();canvas_context.translate(position.x,position.y);canvas_context.rotate(angle);const scale=sticker.scale||1;const alpha=sticker.alpha||1;canvas_context.globalAlpha=alpha;canvas_context.scale(scale,scale);const{width,height}=calculateProportionalSize(sticker.img.width,sticker.img.height,StickerSize);canvas_context.drawImage(sticker.img,-width/2,-height/2,width,height);if(config.debug.showPhysics){canvas_context.restore();canvas_context.save();canvas_context.strokeStyle=config.debug.colors.bounds;canvas_context.lineWidth=1;canvas_context.beginPath();canvas_context.moveTo(sticker.body.bounds.min.x,sticker.body.bounds.min.y);canvas_context.lineTo(sticker.body.bounds.max.x,sticker.body.bounds.min.y);canvas_context.lineTo(sticker.body.bounds.max.x,sticker.body.bounds.max.y);canvas_context.lineTo(sticker.body.bounds.min.x,sticker.body.bounds.max.y);canvas_context.closePath();canvas_context.stroke();canvas_context.fillStyle=config.debug.colors.center;canvas_context.beginPath();canvas_context.arc(position.x,position.y,3,0,Math.PI*2);canvas_context.fill();const velocityScale=10;canvas_context.strokeStyle='#0000ff';canvas_context.beginPath();canvas_context.moveTo(position.x,position.y);canvas_context.lineTo(position.x+sticker.body.velocity.x*velocityScale,position.y+sticker.body.velocity.y*velocityScale);canvas_context.stroke();}
+if(config.debug.showStickerSize){canvas_context.font='12px Arial';canvas_context.fillStyle=config.debug.colors.text;canvas_context.textAlign='center';canvas_context.textBaseline='top';const sizeText=`${Math.round(width)}x${Math.round(height)}`;canvas_context.fillText(sizeText,0,height/2);const velocity=Math.sqrt(sticker.body.velocity.x*sticker.body.velocity.x+
+sticker.body.velocity.y*sticker.body.velocity.y).toFixed(2);canvas_context.fillText(`v: ${velocity}`,0,(height/2)+12);}
+canvas_context.restore();});if(config.debug.showWalls){let bodies=Composite.allBodies(engine.world);canvas_context.beginPath();for(let i=0;i<bodies.length;i+=1){let body=bodies[i];if(!body.isStatic&&!config.debug.showBounds)continue;canvas_context.save();canvas_context.beginPath();let vertices=body.vertices;canvas_context.moveTo(vertices[0].x,vertices[0].y);for(let j=1;j<vertices.length;j+=1){canvas_context.lineTo(vertices[j].x,vertices[j].y);}
+canvas_context.closePath();switch(body.label){case'centerBlock':canvas_context.strokeStyle=config.debug.colors.centerWall||'#ff00ff';canvas_context.fillStyle=config.debug.colors.centerWall+'40'||'#ff00ff40';break;case'groundBottom':case'groundTop':case'groundLeft':case'groundRight':canvas_context.strokeStyle=config.debug.colors.walls;canvas_context.fillStyle=config.debug.colors.walls+'40';break;default:canvas_context.strokeStyle=config.debug.colors.bounds;canvas_context.fillStyle=config.debug.colors.bounds+'40';}
+canvas_context.lineWidth=3;canvas_context.stroke();canvas_context.fill();if(config.debug.showLabels){canvas_context.fillStyle=config.debug.colors.text;canvas_context.font='18px Arial';canvas_context.textAlign='center';canvas_context.textBaseline='middle';canvas_context.fillText((body.isStatic?body.label:body.id),body.position.x,body.position.y);}
+canvas_context.restore();}}
+if(config.debug.showPhysics&&mouseConstraint.constraint.bodyB){const pos=mouseConstraint.constraint.bodyB.position;const offset=mouseConstraint.constraint.pointB;const mousePos=mouseConstraint.mouse.position;canvas_context.beginPath();canvas_context.moveTo(pos.x+offset.x,pos.y+offset.y);canvas_context.lineTo(mousePos.x,mousePos.y);canvas_context.strokeStyle=config.debug.colors.physics;canvas_context.stroke();}})();resetGravity();var runner=Runner.create();Runner.run(runner,engine);if(config.mouse.enable){initializeMouseInteraction();}
+Events.on(engine,'collisionStart',(event)=>{if(!config.world.walls.colisionEffectEnable){return;}
+event.pairs.forEach((pair)=>{const bodyA=pair.bodyA;const bodyB=pair.bodyB;if(bodyA.isStatic||bodyB.isStatic){const movingBody=bodyA.isStatic?bodyB:bodyA;const speed=randomIntFromInterval(1,2);const randomAngle=Math.random()*Math.PI*2;Matter.Body.setVelocity(movingBody,{x:Math.cos(randomAngle)*speed,y:Math.sin(randomAngle)*speed});}});});document.addEventListener('DOMContentLoaded',()=>{restoreStickers();new WebSocketClient();});window.addEventListener('keydown',(event)=>{switch(event.key){case'1':config.debug.showPhysics=false;config.debug.showWalls=true;config.debug.showLabels=true;config.debug.showStickerSize=true;config.debug.showBounds=true;break;case'2':config.debug.showPhysics=false;config.debug.showWalls=false;config.debug.showLabels=false;config.debug.showStickerSize=false;config.debug.showBounds=false;break;case'3':config.debug.showPhysics=!config.debug.showPhysics;break;case'4':config.debug.showStickerSize=!config.debug.showStickerSize;break;case'5':config.debug.showWalls=!config.debug.showWalls;break;case'6':config.debug.showLabels=!config.debug.showLabels;break;case'7':config.debug.showBounds=!config.debug.showBounds;break;}});setInterval(()=>{AnimationManager.checkAllStickers();},config.animations.protection.checkInterval);
\ No newline at end of file
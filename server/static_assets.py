@@ -0,0 +1,137 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Static assets preparation (content hashes, precompressed copies)
+#
+# Plain functions working with file paths, executed once at startup in a
+# thread (and when the Docker image is built, so a container start finds the
+# copies up to date). The server uses the result (manifest) to fingerprint
+# the asset URLs and to serve the .gz/.br copies.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import sys
+    import gzip
+    import hashlib
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Optional - without it only the gzip copies are created
+try:
+    import brotli
+except ImportError:
+    brotli = None
+# ######################################################################
+
+
+# Text based files - the images and fonts (woff, webp, jpeg...) are already compressed
+COMPRESSIBLE_EXTENSIONS:tuple = (".html", ".js", ".css", ".svg", ".json", ".txt", ".ttf", ".ico", ".map")
+COMPRESS_MIN_SIZE:int = 1024  # bytes - below this the headers cost more than what is saved
+
+
+# ------------------------------------------------------------------------------
+def file_digest(file_path: str) -> str:
+    """Short content hash of a file (used for the URLs and the ETag)"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def write_if_changed(output_path: str, data: bytes) -> None:
+    """Write a file (atomically) only when the content is different"""
+    if os.path.exists(output_path) and os.path.getsize(output_path) == len(data):
+        with open(output_path, "rb") as f:
+            if f.read() == data:
+                os.utime(output_path)  # Still up to date with the source
+                return
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def precompress_file(source_path: str, output_base: str) -> dict:
+    """
+    Create <output_base>.gz and <output_base>.br for a file.
+
+    Returns:
+        dict: encoding -> path of the compressed copy. An encoding is left out when
+              the copy is not smaller than the original (or brotli is not installed).
+    """
+    source_mtime = os.path.getmtime(source_path)
+    compressors = {"gzip": lambda data: gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressors["br"] = lambda data: brotli.compress(data, quality=11)
+
+    data = None
+    copies = {}
+    for encoding, compress in compressors.items():
+        output_path = f"{output_base}.{'gz' if encoding == 'gzip' else 'br'}"
+
+        # Copy from a previous start still up to date - brotli 11 is slow, don't redo it
+        if os.path.exists(output_path) and os.path.getmtime(output_path) >= source_mtime:
+            copies[encoding] = output_path
+            continue
+
+        if data is None:
+            with open(source_path, "rb") as f:
+                data = f.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            continue
+        write_if_changed(output_path, compressed)
+        copies[encoding] = output_path
+
+    return copies
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def build_asset_manifest(static_directory: str, cache_directory: str, skip_directories: tuple) -> dict:
+    """
+    Hash every static asset and create the precompressed copies.
+
+    Arguments:
+        static_directory (str): The directory served by the server.
+        cache_directory (str): Where the .gz/.br copies are written (same tree as the static directory).
+        skip_directories (tuple): Top level directories to ignore (stickers, atlas... they have their own names).
+
+    Returns:
+        dict: relative path (with '/') -> {"hash": str, "encodings": {encoding: path}}
+    """
+    manifest = {}
+
+    for root, directories, files in os.walk(static_directory):
+        relative_root = os.path.relpath(root, static_directory)
+        if relative_root == ".":
+            directories[:] = [d for d in directories if d not in skip_directories]
+            relative_root = ""
+
+        for file_name in files:
+            if file_name.startswith(".") or file_name.endswith(".tmp"):
+                continue
+
+            source_path = os.path.join(root, file_name)
+            relative_path = os.path.join(relative_root, file_name).replace(os.sep, "/")
+            entry = {"hash": file_digest(source_path), "encodings": {}}
+
+            if file_name.lower().endswith(COMPRESSIBLE_EXTENSIONS) and os.path.getsize(source_path) >= COMPRESS_MIN_SIZE:
+                entry["encodings"] = precompress_file(source_path, os.path.join(cache_directory, relative_path))
+
+            manifest[relative_path] = entry
+
+    return manifest
+# ------------------------------------------------------------------------------
@@ -0,0 +1,329 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Image processing for the stickers (size variants, atlas pages, animated stickers...)
+#
+# Everything here is plain functions working with file paths, so they
+# can be executed in a thread or process pool without touching the
+# event loop, the database or the global state of the server.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import sys
+    import shutil
+
+    import math
+
+    from PIL import Image, ImageSequence
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Optional - animated (.tgs Lottie) and video (.webm) stickers
+try:
+    from rlottie_python import LottieAnimation
+except ImportError:
+    LottieAnimation = None
+
+try:
+    import av
+except ImportError:
+    av = None
+# ######################################################################
+
+
+# ------------------------------------------------------------------------------
+def fit_size(width: int, height: int, max_size: int) -> tuple:
+    """Return the size that fits in a max_size box keeping the aspect ratio"""
+    if width >= height:
+        return max_size, max(1, round(height * max_size / width))
+    return max(1, round(width * max_size / height)), max_size
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def variant_file_path(source_path: str, size: int) -> str:
+    """Path of a size variant: <dir>/<name>.webp -> <dir>/<size>/<name>.webp"""
+    directory, file_name = os.path.split(source_path)
+    name = os.path.splitext(file_name)[0]
+    return os.path.join(directory, str(size), f"{name}.webp")
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def generate_variants(source_path: str, sizes: tuple) -> list:
+    """
+    Create the resized copies (webp) of a sticker, next to the original file.
+
+    Every size is always written (even if the original is smaller) so the URL of a
+    variant is predictable. Returns the list of files written.
+    """
+    written = []
+
+    with Image.open(source_path) as image:
+        animated = getattr(image, "is_animated", False)
+        if animated:
+            frames = [frame.convert("RGBA") for frame in ImageSequence.Iterator(image)]
+            durations = [frame.info.get("duration", 100) for frame in ImageSequence.Iterator(image)]
+        else:
+            frames = [image.convert("RGBA")]
+            durations = []
+        first = frames[0]
+
+        for size in sizes:
+            width, height = fit_size(first.width, first.height, size)
+            if width < first.width or height < first.height:
+                variant = [frame.resize((width, height), Image.LANCZOS) for frame in frames]
+            else:
+                variant = frames
+
+            output_path = variant_file_path(source_path, size)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            temp_path = f"{output_path}.tmp"
+            # Small images - lower quality is not visible and saves a lot of bytes
+            quality = 80 if size < 256 else 88
+            if animated:
+                save_animated_webp(variant, durations, temp_path, quality)
+            else:
+                variant[0].save(temp_path, format="WEBP", quality=quality, method=4)
+            os.replace(temp_path, output_path)
+            written.append(output_path)
+
+    return written
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def build_atlas_page(cells: list, cell_size: int, columns: int, output_path: str) -> dict:
+    """
+    Build one atlas page (sprite sheet) and save it as webp.
+
+    Arguments:
+        cells (list): One entry per slot, (key, image path) or None for an empty slot.
+        cell_size (int): Size of each square slot in pixels.
+        columns (int): Slots per row.
+        output_path (str): Where to save the page.
+
+    Returns:
+        dict: key -> {"x", "y", "w", "h"} for every sticker placed in the page.
+              Stickers that can't be read are skipped (the wall falls back to the file).
+    """
+    rows = max(1, (len(cells) + columns - 1) // columns)
+    page = Image.new("RGBA", (columns * cell_size, rows * cell_size), (0, 0, 0, 0))
+    frames = {}
+
+    for slot, cell in enumerate(cells):
+        if cell is None:
+            continue
+
+        key, image_path = cell
+        try:
+            with Image.open(image_path) as image:
+                if getattr(image, "is_animated", False):
+                    continue  # A sprite sheet can't animate - the wall loads the file
+                image = image.convert("RGBA")
+                width, height = fit_size(image.width, image.height, cell_size)
+                image = image.resize((width, height), Image.LANCZOS)
+        except Exception:
+            continue
+
+        x = (slot % columns) * cell_size
+        y = (slot // columns) * cell_size
+        page.paste(image, (x, y))
+        frames[key] = {"x": x, "y": y, "w": width, "h": height}
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.tmp"
+    page.save(temp_path, format="WEBP", quality=90, method=4)
+    os.replace(temp_path, output_path)  # Never serve a half written page
+
+    return frames
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def detect_sticker_format(data: bytes) -> str | None:
+    """Sticker format from the first bytes: "webp", "tgs" (gzip Lottie), "webm" or None"""
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[:2] == b"\x1f\x8b":
+        return "tgs"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    return None
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def save_animated_webp(frames: list, durations: list, output_path: str, quality: int) -> None:
+    """Save a list of RGBA frames as an animated webp (loops forever)"""
+    frames[0].save(
+        output_path,
+        format="WEBP",
+        save_all=True,
+        append_images=frames[1:],
+        duration=durations,
+        loop=0,
+        quality=quality,
+        method=4
+    )
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def read_tgs_frames(source_path: str, max_size: int, max_frames: int, max_fps: int) -> tuple:
+    """Render a .tgs (Lottie) sticker. Returns (frames, durations in ms)"""
+    if LottieAnimation is None:
+        raise RuntimeError("rlottie-python is not installed - can't read .tgs stickers")
+
+    animation = LottieAnimation.from_tgs(source_path)
+    try:
+        total_frames = animation.lottie_animation_get_totalframe()
+        frame_rate = animation.lottie_animation_get_framerate() or 30
+        width, height = fit_size(*animation.lottie_animation_get_size(), max_size)
+
+        # Skip frames to respect the fps and frame caps (the whole loop is kept)
+        step = max(1, math.ceil(frame_rate / max_fps), math.ceil(total_frames / max_frames))
+        frames = [
+            animation.render_pillow_frame(frame_num=frame_num, width=width, height=height).convert("RGBA")
+            for frame_num in range(0, total_frames, step)
+        ][:max_frames]
+    finally:
+        animation.lottie_animation_destroy()
+
+    return frames, [round(1000 * step / frame_rate)] * len(frames)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def frame_to_image(frame) -> Image.Image:
+    """RGBA image of a decoded video frame (keeps the alpha plane of yuva420p)"""
+    image = frame.to_image().convert("RGBA")
+    if frame.format.name == "yuva420p":
+        plane = frame.planes[3]
+        alpha = Image.frombuffer("L", (frame.width, frame.height), bytes(plane), "raw", "L", plane.line_size, 1)
+        image.putalpha(alpha)
+    return image
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def read_webm_frames(source_path: str, max_size: int, max_frames: int, max_fps: int) -> tuple:
+    """Decode a .webm (VP9) sticker. Returns (frames, durations in ms)"""
+    if av is None:
+        raise RuntimeError("av is not installed - can't read .webm stickers")
+
+    frames = []
+    times = []
+    with av.open(source_path) as container:
+        stream = container.streams.video[0]
+        # The native vp9 decoder drops the alpha channel - libvpx keeps it
+        try:
+            decoder = av.CodecContext.create("libvpx-vp9", "r")
+        except Exception:
+            decoder = stream.codec_context
+
+        next_time = 0.0
+        for packet in container.demux(stream):
+            for frame in decoder.decode(packet):
+                frame_time = float(frame.pts * stream.time_base) if frame.pts is not None else next_time
+                if frame_time < next_time:
+                    continue  # Over the fps cap
+                image = frame_to_image(frame)
+                width, height = fit_size(image.width, image.height, max_size)
+                if width < image.width or height < image.height:
+                    image = image.resize((width, height), Image.LANCZOS)
+                frames.append(image)
+                times.append(frame_time)
+                next_time = frame_time + 1 / max_fps
+                if len(frames) >= max_frames:
+                    break
+            if len(frames) >= max_frames:
+                break
+
+    if not frames:
+        raise ValueError(f"No frames decoded from {source_path}")
+
+    # Each frame lasts until the next one (the last one gets the average)
+    durations = [max(20, round(1000 * (b - a))) for a, b in zip(times, times[1:])]
+    durations.append(round(sum(durations) / len(durations)) if durations else 100)
+    return frames, durations
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def transcode_animated(source_path: str, source_format: str, output_path: str,
+                       max_size: int, max_frames: int, max_fps: int) -> dict:
+    """
+    Transcode an animated (.tgs) or video (.webm) sticker to an animated webp.
+
+    The browsers decode animated webp natively, so the wall draws it like any other
+    sticker. Resolution, frame count and fps are capped to keep the walls smooth.
+
+    Returns:
+        dict: {"frames", "width", "height"} of the written file.
+    """
+    if source_format == "tgs":
+        frames, durations = read_tgs_frames(source_path, max_size, max_frames, max_fps)
+    elif source_format == "webm":
+        frames, durations = read_webm_frames(source_path, max_size, max_frames, max_fps)
+    else:
+        raise ValueError(f"Unsupported animated sticker format: {source_format}")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.tmp"
+    save_animated_webp(frames, durations, temp_path, quality=80)
+    os.replace(temp_path, output_path)
+
+    return {"frames": len(frames), "width": frames[0].width, "height": frames[0].height}
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def perceptual_hash(source_path: str) -> int:
+    """
+    64 bit difference hash (dHash) of a sticker (first frame of an animated one).
+
+    The image is put on a white background, reduced to 9x8 grey pixels and each bit
+    tells if a pixel is brighter than its right neighbour - re-encoding, resizing or
+    small color changes keep most of the bits.
+    """
+    with Image.open(source_path) as image:
+        frame = image.convert("RGBA")
+
+    background = Image.new("RGBA", frame.size, (255, 255, 255, 255))
+    background.alpha_composite(frame)
+    pixels = list(background.convert("L").resize((9, 8), Image.LANCZOS).getdata())
+
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (pixels[row * 9 + column] > pixels[row * 9 + column + 1])
+    return value
+# ------------------------------------------------------------------------------
+def store_sticker_file(output_path: str, data: bytes | None = None, source_path: str | None = None) -> int | None:
+    """
+    Write a sticker file (the bytes, or a copy of source_path) and hash it - the ingest
+    needs both before its database write, one pool task instead of two.
+
+    Returns:
+        int: perceptual hash of the file, None if the image can't be read
+    """
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    temp_path = f"{output_path}.tmp"
+    if data is not None:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+    else:
+        shutil.copyfile(source_path, temp_path)
+    os.replace(temp_path, output_path)
+
+    try:
+        return perceptual_hash(output_path)
+    except Exception:
+        return None
+# ------------------------------------------------------------------------------
@@ -0,0 +1,128 @@
+# ######################################################################
+# Application: Backend - Sticker wall
+# Description: Compact encoding of the wall messages (MessagePack)
+#
+# A wall asks for it with /ws/wall?encoding=msgpack and then gets binary
+# frames instead of JSON text. Each frame is [type code, data]:
+#
+#   sticker      [handle, path, boost_factor, atlas, trace_id]  (trailing nils dropped)
+#   sticker_add             sticker
+#   sticker_remove          handle
+#   sticker_add_batch       [sticker, ...]
+#   sticker_remove_batch    [handle, ...]
+#   wall_sync               [[sticker, ...], [atlas page, ...]]
+#   anything else           data as it is
+#
+# The handle is a small integer the server gives to each sticker instead of
+# the 36 characters uuid (a sticker without row keeps its uuid), the path is
+# relative to "stickers/" (a path outside of it starts with "/") and the
+# atlas frame is [page, x, y, w, h] - in a sync the page is its index in the
+# list of pages sent once with the stickers.
+# The decoder is in static/js/wall.js (WallProtocol).
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import sys
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+
+# Optional - without it every wall gets JSON
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+# ######################################################################
+
+
+ENCODING_JSON:str = "json"
+ENCODING_MSGPACK:str = "msgpack"
+STICKER_PATH_PREFIX:str = "stickers/"
+
+# Never change a code - the walls already loaded keep the old table until they reload
+MESSAGE_TYPE_CODES:dict = {
+    "wall_clear": 0,
+    "wall_reload": 1,
+    "wall_restart": 2,
+    "wall_sync": 3,
+    "wall_ignore": 4,
+    "sticker_add": 5,
+    "sticker_remove": 6,
+    "sticker_add_batch": 7,
+    "sticker_remove_batch": 8,
+    "bot_info": 9,
+    "wall_budget": 10,
+}
+
+
+# ------------------------------------------------------------------------------
+def get_encoding(requested: str | None) -> str:
+    """Encoding used for a wall - JSON unless it asked for MessagePack and the module is installed"""
+    if requested == ENCODING_MSGPACK and msgpack is not None:
+        return ENCODING_MSGPACK
+    return ENCODING_JSON
+# ------------------------------------------------------------------------------
+def message_sticker_uuids(message: dict) -> list:
+    """Sticker uuids of a wall message - they need a handle before encode_compact"""
+    message_type = getattr(message.get("type"), "value", message.get("type"))
+    data = message.get("data")
+    if message_type in ("sticker_add", "sticker_remove"):
+        return [data["sticker_id"]]
+    if message_type == "sticker_add_batch":
+        return [sticker["sticker_id"] for sticker in data["stickers"]]
+    if message_type == "sticker_remove_batch":
+        return list(data["sticker_ids"])
+    if message_type == "wall_sync":
+        return [sticker["sticker_id"] for sticker in data]
+    return []
+# ------------------------------------------------------------------------------
+def compact_path(path: str | None) -> str | None:
+    if path is None:
+        return None
+    return path[len(STICKER_PATH_PREFIX):] if path.startswith(STICKER_PATH_PREFIX) else "/" + path
+# ------------------------------------------------------------------------------
+def compact_sticker(sticker: dict, handles: dict, pages: dict | None = None) -> list:
+    """Sticker as an array - with pages (atlas page -> index, filled here) the atlas page is an index"""
+    atlas = sticker.get("atlas")
+    if atlas:
+        page = atlas["page"] if pages is None else pages.setdefault(atlas["page"], len(pages))
+        atlas = [page, atlas["x"], atlas["y"], atlas["w"], atlas["h"]]
+    entry = [
+        handles[sticker["sticker_id"]],
+        compact_path(sticker.get("path")),
+        sticker.get("boost_factor"),
+        atlas,
+        sticker.get("trace_id")
+    ]
+    while entry[-1] is None:
+        entry.pop()
+    return entry
+# ------------------------------------------------------------------------------
+def encode_compact(message: dict, handles: dict) -> bytes:
+    """
+    MessagePack frame of a wall message.
+
+    Arguments:
+        message (dict): Wall message as sent in JSON
+        handles (dict): sticker uuid -> handle, for every uuid of message_sticker_uuids
+    """
+    message_type = getattr(message.get("type"), "value", message.get("type"))
+    data = message.get("data")
+    if message_type == "sticker_add":
+        data = compact_sticker(data, handles)
+    elif message_type == "sticker_remove":
+        data = handles[data["sticker_id"]]
+    elif message_type == "sticker_add_batch":
+        data = [compact_sticker(sticker, handles) for sticker in data["stickers"]]
+    elif message_type == "sticker_remove_batch":
+        data = [handles[sticker_uuid] for sticker_uuid in data["sticker_ids"]]
+    elif message_type == "wall_sync":
+        pages = {}
+        stickers = [compact_sticker(sticker, handles, pages) for sticker in data]
+        data = [stickers, list(pages)]
+    return msgpack.packb([MESSAGE_TYPE_CODES.get(message_type, message_type), data])
+# ------------------------------------------------------------------------------
@@ -0,0 +1,349 @@
+# ######################################################################
+# Application: Sticker wall - Benchmarks
+# Description: Microbenchmarks of the hot server functions with synthetic data
+#
+# The stickers, telegram_users and telegram_user_stickers tables are filled
+# with N synthetic rows each (10k, 100k, 1M by default), then every case runs
+# in its own process against a copy of that database, with a time budget so
+# a scaling cliff shows as a timeout instead of a benchmark that never ends.
+#
+# Example:
+#   python tools/benchmark.py --sizes 10000,100000 --output before.json
+#   python tools/benchmark.py --sizes 10000,100000 --compare before.json
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import io
+    import sys
+    import json
+    import time
+    import uuid
+    import base64
+    import queue
+    import random
+    import shutil
+    import sqlite3
+    import tempfile
+    import logging
+    import argparse
+    import hashlib
+    import platform
+    import statistics
+    import subprocess
+    import multiprocessing
+
+    from datetime import datetime, timedelta
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+SERVER_DIRECTORY:str = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+CACHE_DIRECTORY:str = os.path.join(os.path.expanduser("~"), ".cache", "stickerwall-benchmark")
+BOT_API_KEY:str = "benchmark-bot-key"
+CASES:tuple = ("wall_sync", "list_stickers", "validate_api_key", "ingest_new", "ingest_repeat", "sticker_action")
+
+
+# ------------------------------------------------------------------------------
+# Synthetic data
+# ------------------------------------------------------------------------------
+def timestamp(value: datetime) -> str:
+    # Same text format SQLAlchemy uses for the datetime columns in SQLite
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+# ------------------------------------------------------------------------------
+def get_server_metadata():
+    """SQLModel metadata of the server models (the server is imported once, nothing is started)"""
+    if "server" not in sys.modules:
+        # The server module mounts ./static when imported - give it an empty one
+        previous_directory = os.getcwd()
+        with tempfile.TemporaryDirectory() as import_directory:
+            os.makedirs(os.path.join(import_directory, "static"))
+            os.chdir(import_directory)
+            sys.path.insert(0, SERVER_DIRECTORY)
+            logging.basicConfig(level=logging.WARNING)
+            import server  # noqa: F401 - registers the models
+            os.chdir(previous_directory)
+
+    from sqlmodel import SQLModel
+    return SQLModel.metadata
+# ------------------------------------------------------------------------------
+def get_schema_fingerprint() -> str:
+    """Short hash of the tables and indexes of the models - a database of another schema is not reused"""
+    from sqlalchemy.dialects import sqlite
+    from sqlalchemy.schema import CreateIndex, CreateTable
+
+    dialect = sqlite.dialect()
+    statements = []
+    for table in get_server_metadata().sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        statements += sorted(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes)
+    return hashlib.sha1("\n".join(statements).encode()).hexdigest()[:12]
+# ------------------------------------------------------------------------------
+def generate_database(database_path: str, rows: int, seed: int) -> None:
+    """Create the schema (from the server models) and fill the tables with `rows` rows each"""
+    from sqlmodel import create_engine
+
+    temp_path = f"{database_path}.tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    get_server_metadata().create_all(create_engine(f"sqlite:///{temp_path}"))
+
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    # Popularity is skewed like in a real event - a few stickers and users do most of the traffic
+    skewed = lambda count: int(count * rng.random() ** 3) + 1
+
+    connection = sqlite3.connect(temp_path)
+    connection.execute("PRAGMA journal_mode=OFF")
+    connection.execute("PRAGMA synchronous=OFF")
+    batch = 50000
+
+    for offset in range(0, rows, batch):
+        connection.executemany(
+            "INSERT INTO stickers (sticker_uuid, sticker_id, sticker_path, created_at, visible, banned, reason, boost_factor) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    str(uuid.UUID(int=rng.getrandbits(128))), f"bench-sticker-{i}", f"stickers/bench-sticker-{i}.webp",
+                    timestamp(start + timedelta(seconds=i)), rng.random() < 0.9, rng.random() < 0.01, None,
+                    rng.randrange(5) if rng.random() < 0.2 else 0
+                )
+                for i in range(offset, min(rows, offset + batch))
+            ]
+        )
+        connection.executemany(
+            "INSERT INTO telegram_users (userid, username, fullusername, last_chatid, created_at, last_message, banned, reason, admin, policy) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    100000000 + i, f"user{i}", f"Bench User {i}", None, timestamp(start + timedelta(seconds=i)),
+                    timestamp(start + timedelta(seconds=i + rng.randrange(86400))), rng.random() < 0.01, None, False, None
+                )
+                for i in range(offset, min(rows, offset + batch))
+            ]
+        )
+        connection.executemany(
+            "INSERT INTO telegram_user_stickers (user_id, sticker_id, sent_at, blocked_by_policy) VALUES (?, ?, ?, ?)",
+            [
+                (skewed(rows), skewed(rows), timestamp(start + timedelta(seconds=i)), False)
+                for i in range(offset, min(rows, offset + batch))
+            ]
+        )
+        connection.commit()
+
+    connection.close()
+    os.replace(temp_path, database_path)
+# ------------------------------------------------------------------------------
+def get_database(rows: int, seed: int, regenerate: bool) -> str:
+    os.makedirs(CACHE_DIRECTORY, exist_ok=True)
+    # Keyed by the schema too: --compare runs the commits before and after a schema change
+    database_path = os.path.join(CACHE_DIRECTORY, f"bench-{rows}-{seed}-{get_schema_fingerprint()}.db")
+    if regenerate or not os.path.exists(database_path):
+        print(f"Generating {rows} rows per table...", flush=True)
+        started = time.perf_counter()
+        generate_database(database_path, rows, seed)
+        print(f"  done in {time.perf_counter() - started:.1f}s", flush=True)
+    return database_path
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Cases - executed in a child process, with the server imported in a work directory
+# ------------------------------------------------------------------------------
+def sticker_message(sticker_id: str) -> str:
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new("RGBA", (512, 512), (200, 30, 30, 255)).save(buffer, format="WEBP")
+    return json.dumps({
+        "type": "sticker",
+        "telegram_user_id": 1, "telegram_username": "bench", "telegram_full_username": "Bench",
+        "sticker_id": sticker_id,
+        "sticker_data": base64.b64encode(buffer.getvalue()).decode(),
+        "file_extension": "webp"
+    })
+# ------------------------------------------------------------------------------
+def run_case(case: str, work_directory: str, repeat: int, results) -> None:
+    os.chdir(work_directory)
+    sys.path.insert(0, SERVER_DIRECTORY)
+    os.environ["BOT_SERVER_WEBSOCKET_API_KEY"] = BOT_API_KEY
+    os.environ["INITIAL_ADMIN_PASSWORD"] = "benchmark"
+
+    # Configured before the server does it - the ingest logs every sticker
+    logging.basicConfig(level=logging.WARNING)
+    import server
+    from sqlmodel import Session, select
+    from fastapi.testclient import TestClient
+
+    timings = []
+
+    def measure(function, *args):
+        started = time.perf_counter()
+        function(*args)
+        timings.append(time.perf_counter() - started)
+
+    with TestClient(server.app) as client:
+        time.sleep(1)  # Let the startup tasks (atlas, static assets) finish
+
+        with Session(server.engine) as session:
+            sticker_uuids = session.exec(select(server.Sticker.sticker_uuid).limit(1000)).all()
+
+        if case == "wall_sync":
+            for _ in range(repeat):
+                measure(server.generate_wall_sync_payload)
+
+        elif case == "list_stickers":
+            for _ in range(repeat):
+                measure(client.portal.call, server.list_stickers, None, True)
+
+        elif case == "validate_api_key":
+            with Session(server.engine) as session:
+                key = server.create_api_key(session, "benchmark").key
+            for _ in range(repeat):
+                with Session(server.engine) as session:
+                    measure(server.validate_api_key, session, key)
+
+        elif case in ("ingest_new", "ingest_repeat"):
+            with client.websocket_connect("/ws/wall") as wall:
+                for _ in range(3):
+                    wall.receive_json()  # Bot info, budget and sync
+                with client.websocket_connect("/ws/telegram", headers={"x-api-key": BOT_API_KEY}) as bot:
+                    for i in range(repeat):
+                        message = sticker_message(f"bench-new-{i}" if case == "ingest_new" else "bench-repeat")
+                        started = time.perf_counter()
+                        bot.send_text(message)
+                        while wall.receive_json().get("type") != "sticker_add":
+                            pass  # The sticker is on its way to the walls
+                        timings.append(time.perf_counter() - started)
+
+        elif case == "sticker_action":
+            async def toggle(sticker_uuid, action):
+                return await server.handle_sticker_action(sticker_uuid, server.StickerActionRequest(type=action), True)
+            for i in range(repeat):
+                measure(client.portal.call, toggle, sticker_uuids[i % len(sticker_uuids)], "hide" if i % 2 == 0 else "show")
+
+    results.put(timings)
+# ------------------------------------------------------------------------------
+def summarize(timings: list) -> dict:
+    values = sorted(timings)
+    return {
+        "runs": len(values),
+        "min_ms": round(values[0] * 1000, 3),
+        "median_ms": round(statistics.median(values) * 1000, 3),
+        "p95_ms": round(values[min(len(values) - 1, int(0.95 * len(values)))] * 1000, 3),
+        "mean_ms": round(statistics.fmean(values) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3)
+    }
+# ------------------------------------------------------------------------------
+def benchmark_case(case: str, database_path: str, repeat: int, budget: float) -> dict:
+    """Run a case in a child process (fresh copy of the database) with a time budget"""
+    work_directory = os.path.join(CACHE_DIRECTORY, f"work-{os.getpid()}")
+    shutil.rmtree(work_directory, ignore_errors=True)
+    os.makedirs(os.path.join(work_directory, "data"))
+    os.makedirs(os.path.join(work_directory, "static", "stickers"))
+    shutil.copyfile(database_path, os.path.join(work_directory, "data", "database.db"))
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=run_case, args=(case, work_directory, repeat, results))
+    process.start()
+    deadline = time.monotonic() + budget
+    try:
+        while time.monotonic() < deadline:
+            try:
+                timings = results.get(timeout=1)
+                process.join(timeout=30)
+                return summarize(timings)
+            except queue.Empty:
+                if not process.is_alive() and results.empty():
+                    return {"error": f"exit code {process.exitcode}"}
+        return {"timeout_s": budget}
+    finally:
+        if process.is_alive():
+            process.kill()
+            process.join()
+        shutil.rmtree(work_directory, ignore_errors=True)
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVER_DIRECTORY, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+# ------------------------------------------------------------------------------
+def print_comparison(previous: dict, current: dict) -> None:
+    """Median of each case against a previous result file (> 1.5x slower is flagged)"""
+    print(f"\nCompared with {previous.get('commit')} ({previous.get('timestamp')})")
+    for size, cases in current["results"].items():
+        for case, stats in cases.items():
+            old = previous.get("results", {}).get(size, {}).get(case)
+            if not old or "median_ms" not in old or "median_ms" not in stats:
+                continue
+            ratio = stats["median_ms"] / old["median_ms"] if old["median_ms"] else 0
+            flag = "  <-- slower" if ratio > 1.5 else ""
+            print(f"  {size:>8} {case:<18} {old['median_ms']:>10.3f} -> {stats['median_ms']:>10.3f} ms  x{ratio:.2f}{flag}")
+# ------------------------------------------------------------------------------
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sticker wall server microbenchmarks")
+    parser.add_argument("--sizes", default="10000,100000,1000000", help="Rows per table, comma separated")
+    parser.add_argument("--cases", default=",".join(CASES), help=f"Cases to run ({', '.join(CASES)})")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per case")
+    parser.add_argument("--budget", type=float, default=120, help="Seconds allowed per case before it is marked as timeout")
+    parser.add_argument("--seed", type=int, default=42, help="Seed of the synthetic data")
+    parser.add_argument("--regenerate", action="store_true", help="Generate the databases again")
+    parser.add_argument("--output", help="Result file (default: benchmark-<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Previous result file to compare with")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    cases = [case for case in args.cases.split(",") if case]
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        print(f"Unknown cases: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "seed": args.seed,
+        "results": {}
+    }
+
+    for size in sizes:
+        database_path = get_database(size, args.seed, args.regenerate)
+        report["results"][str(size)] = {}
+        for case in cases:
+            stats = benchmark_case(case, database_path, args.repeat, args.budget)
+            report["results"][str(size)][case] = stats
+            if "timeout_s" in stats:
+                print(f"{size:>8} {case:<18} TIMEOUT after {args.budget}s", flush=True)
+            elif "error" in stats:
+                print(f"{size:>8} {case:<18} FAILED ({stats['error']})", flush=True)
+            else:
+                print(f"{size:>8} {case:<18} median {stats['median_ms']:>10.3f} ms  p95 {stats['p95_ms']:>10.3f} ms", flush=True)
+
+    output = args.output or f"benchmark-{report['commit'] or 'nogit'}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(json.load(f), report)
+# ------------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    main()
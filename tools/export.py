@@ -0,0 +1,81 @@
+# ######################################################################
+# Application: Sticker wall - Export
+# Description: Export the stickers, users or sticker history to CSV / JSON Lines
+#
+# Reads the server database directly (the server can keep running) in
+# batches, so the memory use is the same for a thousand or millions of
+# rows. Same files as the /api/admin/export endpoints.
+#
+# Example:
+#   python tools/export.py telegram_user_stickers --since 2026-06-01 --until 2026-06-08 --gzip
+#   python tools/export.py stickers --format jsonl --output -
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import sys
+    import argparse
+
+    from datetime import datetime
+    from sqlalchemy import create_engine
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+SERVER_DIRECTORY:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIRECTORY)
+import data_export  # noqa: E402 - from the server directory
+
+
+# ------------------------------------------------------------------------------
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Sticker wall data export")
+    parser.add_argument("table", choices=tuple(data_export.EXPORT_TABLES))
+    parser.add_argument("--format", choices=tuple(data_export.EXPORT_FORMATS), default="csv")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="From this time (ISO, included)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="Up to this time (ISO, excluded)")
+    parser.add_argument("--gzip", action="store_true", help="Compress the file")
+    parser.add_argument("--archived", action="store_true", help="History: include the rows in the archive files")
+    parser.add_argument("--database", default=os.path.join(SERVER_DIRECTORY, "data", "database.db"))
+    parser.add_argument("--archive-directory", default=os.path.join(SERVER_DIRECTORY, "data", "archive"))
+    parser.add_argument("--output", help="Output file, - for stdout (default: <table>-<time>.<format> here)")
+    return parser.parse_args()
+# ------------------------------------------------------------------------------
+def main() -> None:
+    args = parse_arguments()
+    if not os.path.exists(args.database):
+        print(f"Database not found: {args.database}")
+        sys.exit(1)
+
+    engine = create_engine(f"sqlite:///{os.path.abspath(args.database)}")
+    chunks = data_export.export(
+        engine, args.table, args.format, args.since, args.until, args.gzip,
+        archive_directory=args.archive_directory if args.archived else None
+    )
+
+    if args.output == "-":
+        output = sys.stdout.buffer
+    else:
+        output = open(args.output or data_export.get_export_file_name(args.table, args.format, args.gzip), "wb")
+    try:
+        size = 0
+        for chunk in chunks:
+            data = chunk if isinstance(chunk, bytes) else chunk.encode("utf-8")
+            output.write(data)
+            size += len(data)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+    if output is not sys.stdout.buffer:
+        print(f"{output.name}: {size} bytes")
+# ------------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# ######################################################################
+# Application: Sticker wall - Sticker import
+# Description: Import a directory or archive of sticker files before an event
+#
+# Sources are directories, .zip or .tar(.gz) archives or single files (webp,
+# tgs, webm - any other image Pillow can open is converted to webp). A JSON
+# file next to the stickers in the Telegram getStickerSet format ({"name",
+# "stickers": [{"file_id", "file_unique_id", "emoji"}]}) gives the sticker
+# id, emoji and pack of the files named by file_id or file_unique_id - the
+# bot uses the same ids, so later sends of these stickers boost them.
+#
+# Files with the same content are imported once, stickers already in the
+# database are skipped (a second run only imports what is new). The files,
+# variants and perceptual hashes are made in a process pool and the rows are
+# inserted in batches, each batch in one short transaction - the server can
+# keep running. --warm then tells it to rebuild its atlas / snapshot and
+# synchronize the walls.
+#
+# Example:
+#   python tools/import_stickers.py ~/packs/HappyCats.zip ~/packs/more --set-name Party
+#   python tools/import_stickers.py ~/packs --warm http://127.0.0.1:8000 --api-key $TOKEN
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import io
+    import os
+    import sys
+    import json
+    import time
+    import uuid
+    import sqlite3
+    import hashlib
+    import tarfile
+    import zipfile
+    import argparse
+    import tempfile
+    import urllib.request
+
+    from datetime import datetime
+    from concurrent.futures import ProcessPoolExecutor
+
+    from PIL import Image
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+SERVER_DIRECTORY:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+sys.path.insert(0, SERVER_DIRECTORY)
+import near_duplicates     # noqa: E402 - from the server directory
+import sticker_processing  # noqa: E402
+
+# Same as the server - the walls and the admin ask for these
+STICKER_VARIANT_SIZES:tuple = (96, 128, 256)
+ANIMATED_MAX_SIZE:int = int(os.getenv("ANIMATED_STICKER_MAX_SIZE", 256))
+ANIMATED_MAX_FRAMES:int = int(os.getenv("ANIMATED_STICKER_MAX_FRAMES", 60))
+ANIMATED_MAX_FPS:int = int(os.getenv("ANIMATED_STICKER_MAX_FPS", 20))
+NEAR_DUPLICATE_DISTANCE:int = int(os.getenv("NEAR_DUPLICATE_DISTANCE", 6))
+IMAGE_MAX_SIZE:int = 512  # Telegram sticker size - other images are reduced to it
+ARCHIVE_EXTENSIONS:tuple = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+# ------------------------------------------------------------------------------
+# Sources
+# ------------------------------------------------------------------------------
+def read_manifest(data: bytes) -> dict:
+    """File name (without extension) -> {"sticker_id", "emoji", "set_name"} of a Telegram sticker set export"""
+    try:
+        manifest = json.loads(data)
+    except ValueError:
+        return {}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("stickers"), list):
+        return {}
+
+    entries = {}
+    for sticker in manifest["stickers"]:
+        sticker_id = sticker.get("file_id") or sticker.get("file_unique_id")
+        if not sticker_id:
+            continue
+        entry = {"sticker_id": sticker_id, "emoji": sticker.get("emoji"), "set_name": sticker.get("set_name") or manifest.get("name")}
+        for key in (sticker.get("file_id"), sticker.get("file_unique_id")):
+            if key:
+                entries[key] = entry
+    return entries
+# ------------------------------------------------------------------------------
+def read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+# ------------------------------------------------------------------------------
+def iter_source_files(path: str):
+    """(name, read function) of every file of a source - directory, archive or single file"""
+    if os.path.isdir(path):
+        for directory, directories, files in os.walk(path):
+            directories.sort()
+            for file_name in sorted(files):
+                file_path = os.path.join(directory, file_name)
+                yield file_name, lambda file_path=file_path: read_file(file_path)
+    elif path.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.infolist():
+                if not member.is_dir():
+                    yield os.path.basename(member.filename), lambda member=member: archive.read(member)
+    elif path.lower().endswith(ARCHIVE_EXTENSIONS):
+        with tarfile.open(path) as archive:
+            for member in archive:
+                if member.isfile():
+                    yield os.path.basename(member.name), lambda member=member: archive.extractfile(member).read()
+    else:
+        yield os.path.basename(path), lambda: read_file(path)
+# ------------------------------------------------------------------------------
+def iter_stickers(paths: list, set_name: str | None):
+    """(name, data, metadata) of every sticker file - the JSON files of a source are read first"""
+    for path in paths:
+        manifest = {}
+        for name, read in iter_source_files(path):
+            if name.lower().endswith(".json"):
+                manifest.update(read_manifest(read()))
+
+        for name, read in iter_source_files(path):
+            if name.startswith(".") or name.lower().endswith(".json"):
+                continue
+            metadata = manifest.get(os.path.splitext(name)[0], {})
+            yield name, read(), {"set_name": set_name, **{key: value for key, value in metadata.items() if value}}
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Files (process pool - one call per sticker)
+# ------------------------------------------------------------------------------
+def prepare_sticker(job: tuple) -> dict:
+    """Write the webp file and its variants, hash it. {"sticker_id", "sticker_path", "perceptual_hash"} or {"error"}"""
+    sticker_id, data, static_directory = job
+    file_path = os.path.join(static_directory, "stickers", f"{sticker_id}.webp")
+    temp_path = f"{file_path}.tmp"
+    sticker_format = sticker_processing.detect_sticker_format(data)
+
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if sticker_format == "webp":
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, file_path)
+        elif sticker_format in ("tgs", "webm"):
+            with tempfile.NamedTemporaryFile(suffix=f".{sticker_format}", delete=False) as f:
+                f.write(data)
+            try:
+                sticker_processing.transcode_animated(
+                    f.name, sticker_format, file_path, ANIMATED_MAX_SIZE, ANIMATED_MAX_FRAMES, ANIMATED_MAX_FPS
+                )
+            finally:
+                os.remove(f.name)
+        else:
+            with Image.open(io.BytesIO(data)) as image:
+                image = image.convert("RGBA")
+            size = sticker_processing.fit_size(image.width, image.height, IMAGE_MAX_SIZE)
+            if size != image.size:
+                image = image.resize(size, Image.LANCZOS)
+            image.save(temp_path, format="WEBP", quality=88, method=4)
+            os.replace(temp_path, file_path)
+
+        sticker_processing.generate_variants(file_path, STICKER_VARIANT_SIZES)
+        perceptual_hash = near_duplicates.hash_to_text(sticker_processing.perceptual_hash(file_path))
+    except Exception as e:
+        return {"sticker_id": sticker_id, "error": f"{type(e).__name__}: {e}"}
+
+    return {"sticker_id": sticker_id, "sticker_path": f"stickers/{sticker_id}.webp", "perceptual_hash": perceptual_hash}
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Database
+# ------------------------------------------------------------------------------
+def timestamp(value: datetime) -> str:
+    # Same text format SQLAlchemy uses for the datetime columns in SQLite
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+# ------------------------------------------------------------------------------
+def get_known_sticker_ids(connection, sticker_ids: list) -> set:
+    known = set()
+    for start in range(0, len(sticker_ids), 500):
+        chunk = sticker_ids[start:start + 500]
+        known.update(row[0] for row in connection.execute(
+            f"SELECT sticker_id FROM stickers WHERE sticker_id IN ({','.join('?' * len(chunk))})", chunk
+        ))
+    return known
+# ------------------------------------------------------------------------------
+def load_banned_hashes(connection):
+    """Index of the banned stickers' hashes - an import close to one is stored banned, like in the server"""
+    index = near_duplicates.MultiIndexHashTable(NEAR_DUPLICATE_DISTANCE)
+    rows = connection.execute("SELECT sticker_uuid, perceptual_hash FROM stickers WHERE banned = 1 AND perceptual_hash IS NOT NULL")
+    for sticker_uuid, perceptual_hash in rows:
+        index.add(near_duplicates.hash_from_text(perceptual_hash), sticker_uuid)
+    return index
+# ------------------------------------------------------------------------------
+def insert_stickers(connection, rows: list) -> None:
+    """One transaction per batch - the server waits at most for one batch"""
+    with connection:
+        connection.executemany(
+            "INSERT INTO stickers (sticker_uuid, sticker_id, sticker_path, created_at, visible, banned, reason, "
+            "                      boost_factor, emoji, set_name, perceptual_hash) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+            rows
+        )
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def warm_server(url: str, api_key: str) -> str:
+    request = urllib.request.Request(f"{url.rstrip('/')}/api/wall/warm", method="POST", headers={"x-api-key": api_key})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        return json.loads(response.read())["message"]
+# ------------------------------------------------------------------------------
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Sticker wall bulk sticker import")
+    parser.add_argument("sources", nargs="+", help="Directories, .zip / .tar(.gz) archives or sticker files")
+    parser.add_argument("--set-name", help="Sticker pack of the stickers without one in a Telegram export")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--batch", type=int, default=500, help="Stickers per database transaction")
+    parser.add_argument("--database", default=os.path.join(SERVER_DIRECTORY, "data", "database.db"))
+    parser.add_argument("--static-directory", default=os.path.join(SERVER_DIRECTORY, "static"))
+    parser.add_argument("--warm", metavar="URL", help="Server to warm after the import (atlas, snapshot, walls)")
+    parser.add_argument("--api-key", default=os.getenv("STICKERWALL_API_KEY"), help="Admin token for --warm")
+    return parser.parse_args()
+# ------------------------------------------------------------------------------
+def main() -> None:
+    args = parse_arguments()
+    if not os.path.exists(args.database):
+        print(f"Database not found: {args.database} (start the server once to create it)")
+        sys.exit(1)
+    if args.warm and not args.api_key:
+        print("--warm needs --api-key (or STICKERWALL_API_KEY)")
+        sys.exit(1)
+
+    connection = sqlite3.connect(args.database, timeout=30)
+    banned_hashes = load_banned_hashes(connection)
+    counts = {"imported": 0, "duplicates": 0, "known": 0, "rejected": 0, "near_duplicates": 0}
+    seen_digests = set()
+    seen_ids = set()
+    started = time.perf_counter()
+
+    def import_batch(pool, batch: list) -> None:
+        known = get_known_sticker_ids(connection, [sticker_id for sticker_id, _, _ in batch])
+        counts["known"] += len(known)
+        batch = [item for item in batch if item[0] not in known]
+        jobs = [(sticker_id, data, args.static_directory) for sticker_id, data, _ in batch]
+
+        rows = []
+        now = datetime.now()
+        for (sticker_id, _, metadata), result in zip(batch, pool.map(prepare_sticker, jobs, chunksize=8)):
+            if "error" in result:
+                print(f"  {metadata['name']}: not imported ({result['error']})")
+                counts["rejected"] += 1
+                continue
+            banned, reason = False, None
+            nearest = banned_hashes.find_nearest(near_duplicates.hash_from_text(result["perceptual_hash"]))
+            if nearest:
+                banned, reason = True, f"Near duplicate of banned sticker {nearest[2]} ({nearest[0]} bits)"
+                counts["near_duplicates"] += 1
+            rows.append((
+                str(uuid.uuid4()), sticker_id, result["sticker_path"], timestamp(now), not banned, banned, reason,
+                metadata.get("emoji"), metadata.get("set_name"), result["perceptual_hash"]
+            ))
+        insert_stickers(connection, rows)
+        counts["imported"] += len(rows)
+        print(f"  {counts['imported']} imported ({time.perf_counter() - started:.1f}s)", flush=True)
+
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        batch = []
+        for name, data, metadata in iter_stickers(args.sources, args.set_name):
+            digest = hashlib.sha256(data).hexdigest()
+            # Files without a Telegram id get one from their content - importing them again finds them
+            sticker_id = metadata.pop("sticker_id", None) or f"import-{digest[:32]}"
+            if digest in seen_digests or sticker_id in seen_ids:
+                counts["duplicates"] += 1
+                continue
+            seen_digests.add(digest)
+            seen_ids.add(sticker_id)
+            batch.append((sticker_id, data, {"name": name, **metadata}))
+            if len(batch) >= args.batch:
+                import_batch(pool, batch)
+                batch = []
+        if batch:
+            import_batch(pool, batch)
+    connection.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Imported {counts['imported']} sticker(s) in {elapsed:.1f}s ({counts['imported'] / max(elapsed, 0.001):.0f}/s): "
+          f"{counts['duplicates']} duplicate file(s), {counts['known']} already in the database, "
+          f"{counts['rejected']} rejected, {counts['near_duplicates']} stored banned (near duplicate of a banned sticker)")
+
+    if args.warm:
+        try:
+            print(warm_server(args.warm, args.api_key))
+        except Exception as e:
+            print(f"Could not warm the server: {e}")
+            sys.exit(1)
+# ------------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+# ######################################################################
+# Application: Sticker wall - Load test
+# Description: Simulated bots and walls against a local server
+#
+# Starts (by default) a fresh server on 127.0.0.1 in a temporary copy of the
+# server directory, connects M headless walls on /ws/wall and N fake bots on
+# /ws/telegram, sends synthetic stickers following a load profile and reports
+# throughput, delivery latency (bot send -> wall receive), dropped messages
+# and the server memory.
+#
+# Example:
+#   python tools/loadtest.py --bots 4 --walls 10 --profile burst --duration 60
+#
+# Localhost only - never point this at a real event server.
+# ######################################################################
+
+# ######################################################################
+# Import Modules
+# ######################################################################
+try:
+    import os
+    import io
+    import sys
+    import json
+    import time
+    import uuid
+    import base64
+    import random
+    import shutil
+    import socket
+    import asyncio
+    import argparse
+    import tempfile
+    import subprocess
+    import urllib.request
+
+    from urllib.parse import urlparse
+    from websockets.asyncio.client import connect
+    from PIL import Image
+
+except Exception as e:
+    print(f"Error importing modules: {e}")
+    sys.exit(1)
+# ######################################################################
+
+
+LOCAL_HOSTS:tuple = ("127.0.0.1", "localhost", "::1")
+SERVER_DIRECTORY:str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server")
+
+
+# ------------------------------------------------------------------------------
+# Load profiles - stickers per second (all bots together) at a time of the test
+# ------------------------------------------------------------------------------
+def profile_rate(args, elapsed: float) -> float:
+    if args.profile == "steady":
+        return args.rate
+    if args.profile == "ramp":
+        # From 0 to the burst rate along the whole test
+        return args.burst_rate * min(1.0, elapsed / args.duration)
+    if args.profile == "spike":
+        # One burst at the start, then the normal rate
+        return args.burst_rate if elapsed < args.burst_length else args.rate
+    if args.profile == "burst":
+        # A burst every burst_every seconds (a popular moment during the event)
+        return args.burst_rate if (elapsed % args.burst_every) < args.burst_length else args.rate
+    raise ValueError(f"Unknown profile: {args.profile}")
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+# ------------------------------------------------------------------------------
+def make_sticker_payloads(count: int, size: int, rng: random.Random) -> list:
+    """Synthetic webp stickers (random colored shapes) as base64"""
+    payloads = []
+    for _ in range(count):
+        image = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        color = tuple(rng.randrange(256) for _ in range(3)) + (255,)
+        margin = rng.randrange(size // 8, size // 3)
+        image.paste(color, (margin, margin, size - margin, size - margin))
+        buffer = io.BytesIO()
+        image.save(buffer, format="WEBP", quality=80)
+        payloads.append(base64.b64encode(buffer.getvalue()).decode())
+    return payloads
+# ------------------------------------------------------------------------------
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+# ------------------------------------------------------------------------------
+def read_rss_mb(pid: int) -> float | None:
+    """Resident memory of a process (Linux /proc) in MB"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Server
+# ------------------------------------------------------------------------------
+def start_server(port: int, api_key: str, log_path: str | None) -> tuple:
+    """Run a fresh server (empty database and stickers) in a temporary directory"""
+    work_directory = tempfile.mkdtemp(prefix="stickerwall-loadtest-")
+    shutil.copytree(
+        SERVER_DIRECTORY, work_directory, dirs_exist_ok=True,
+        ignore=shutil.ignore_patterns("data", "static_cache", "atlas", "__pycache__", "*.webp", "node_modules")
+    )
+    os.makedirs(os.path.join(work_directory, "data"), exist_ok=True)
+
+    env = dict(os.environ)
+    env.update({
+        "BOT_SERVER_WEBSOCKET_API_KEY": api_key,
+        "INITIAL_ADMIN_PASSWORD": uuid.uuid4().hex,
+    })
+    log = open(log_path, "w") if log_path else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, "-O", "-m", "uvicorn", "server:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=work_directory, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, work_directory
+# ------------------------------------------------------------------------------
+def wait_for_server(base_url: str, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f"{base_url}/metrics", timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+# Clients
+# ------------------------------------------------------------------------------
+class LoadTest:
+    def __init__(self, args, ws_url: str, server_pid: int | None):
+        self.args = args
+        self.ws_url = ws_url
+        self.server_pid = server_pid
+        self.rng = random.Random(args.seed)
+        self.payloads = make_sticker_payloads(args.unique_stickers, args.sticker_size, self.rng)
+        self.queue = asyncio.Queue()
+
+        self.sent = {}              # trace id -> send time
+        self.send_errors = 0
+        self.received = {}          # wall index -> count of traced stickers received
+        self.latencies = []         # seconds, bot send -> wall receive
+        self.memory = []            # (elapsed, rss MB)
+
+    # --------------------------------------------------------------------------
+    async def run_wall(self, index: int, ready: asyncio.Event) -> None:
+        self.received[index] = 0
+        async with connect(f"{self.ws_url}/ws/wall", max_size=None) as websocket:
+            ready.set()
+            async for raw in websocket:
+                received_at = time.perf_counter()
+                message = json.loads(raw)
+                if message.get("type") != "sticker_add":
+                    continue
+                trace_id = message["data"].get("trace_id")
+                sent_at = self.sent.get(trace_id)
+                if sent_at is None:
+                    continue
+                self.received[index] += 1
+                self.latencies.append(received_at - sent_at)
+                if self.args.report_render:
+                    await websocket.send(json.dumps({
+                        "type": "wall_render", "data": {"trace_id": trace_id, "render_ms": 0}
+                    }))
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    def sticker_message(self) -> tuple:
+        sticker_index = self.rng.randrange(len(self.payloads))
+        user_id = 900000 + self.rng.randrange(self.args.users)
+        trace_id = uuid.uuid4().hex
+        now = time.time()
+        message = {
+            "type": "sticker",
+            "telegram_username": f"loadtest{user_id}",
+            "telegram_full_username": f"Load Test {user_id}",
+            "telegram_user_id": user_id,
+            "sticker_id": f"loadtest-{sticker_index}",
+            "sticker_data": self.payloads[sticker_index],
+            "file_extension": "webp",
+            "trace": {"id": trace_id, "telegram_at": now, "bot_received_at": now, "bot_sent_at": now}
+        }
+        return trace_id, json.dumps(message)
+
+    async def send_one(self, websocket) -> None:
+        trace_id, payload = self.sticker_message()
+        self.sent[trace_id] = time.perf_counter()
+        try:
+            await websocket.send(payload)
+        except Exception:
+            self.send_errors += 1
+            del self.sent[trace_id]
+
+    async def run_bot(self, index: int) -> None:
+        headers = {"x-api-key": self.args.api_key}
+        if self.args.connect_per_message:
+            # Like the real bot - one connection per sticker
+            while True:
+                await self.queue.get()
+                try:
+                    async with connect(f"{self.ws_url}/ws/telegram", additional_headers=headers) as websocket:
+                        await self.send_one(websocket)
+                except Exception:
+                    self.send_errors += 1
+        else:
+            async with connect(f"{self.ws_url}/ws/telegram", additional_headers=headers, max_size=None) as websocket:
+                while True:
+                    await self.queue.get()
+                    await self.send_one(websocket)
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    async def generate_load(self) -> None:
+        """Put send tickets in the queue following the profile (Poisson arrivals)"""
+        started = time.perf_counter()
+        while True:
+            elapsed = time.perf_counter() - started
+            if elapsed >= self.args.duration:
+                return
+            rate = profile_rate(self.args, elapsed)
+            if rate <= 0:
+                await asyncio.sleep(0.05)
+                continue
+            await asyncio.sleep(min(1.0, self.rng.expovariate(rate)))
+            self.queue.put_nowait(True)
+
+    async def sample_memory(self) -> None:
+        started = time.perf_counter()
+        while self.server_pid:
+            rss = read_rss_mb(self.server_pid)
+            if rss is not None:
+                self.memory.append((round(time.perf_counter() - started, 1), round(rss, 1)))
+            await asyncio.sleep(0.5)
+    # --------------------------------------------------------------------------
+
+    # --------------------------------------------------------------------------
+    async def run(self) -> dict:
+        ready_events = [asyncio.Event() for _ in range(self.args.walls)]
+        walls = [asyncio.create_task(self.run_wall(i, ready)) for i, ready in enumerate(ready_events)]
+        await asyncio.wait_for(asyncio.gather(*(event.wait() for event in ready_events)), timeout=30)
+
+        memory_task = asyncio.create_task(self.sample_memory())
+        bots = [asyncio.create_task(self.run_bot(i)) for i in range(self.args.bots)]
+
+        started = time.perf_counter()
+        await self.generate_load()
+        # Let the bots empty the queue, then give the walls time to receive everything
+        while not self.queue.empty() and time.perf_counter() - started < self.args.duration + self.args.drain:
+            await asyncio.sleep(0.05)
+        send_time = time.perf_counter() - started
+        await asyncio.sleep(self.args.drain)
+
+        for task in bots + walls + [memory_task]:
+            task.cancel()
+        await asyncio.gather(*bots, *walls, memory_task, return_exceptions=True)
+
+        return self.report(send_time)
+
+    def report(self, send_time: float) -> dict:
+        sent = len(self.sent)
+        expected = sent * self.args.walls
+        delivered = sum(self.received.values())
+        memory = [rss for _, rss in self.memory]
+        return {
+            "config": {
+                key: getattr(self.args, key) for key in (
+                    "bots", "walls", "profile", "duration", "rate", "burst_rate", "burst_every",
+                    "burst_length", "unique_stickers", "users", "seed", "connect_per_message"
+                )
+            },
+            "sent": sent,
+            "send_errors": self.send_errors,
+            "send_throughput": round(sent / send_time, 1) if send_time else 0,
+            "deliveries": delivered,
+            "delivery_throughput": round(delivered / send_time, 1) if send_time else 0,
+            "dropped": expected - delivered,
+            "dropped_ratio": round((expected - delivered) / expected, 4) if expected else 0,
+            "latency_ms": {
+                "p50": round(percentile(self.latencies, 0.50) * 1000, 1),
+                "p95": round(percentile(self.latencies, 0.95) * 1000, 1),
+                "p99": round(percentile(self.latencies, 0.99) * 1000, 1),
+                "max": round(max(self.latencies) * 1000, 1) if self.latencies else 0
+            },
+            "server_memory_mb": {
+                "start": memory[0] if memory else None,
+                "peak": max(memory) if memory else None,
+                "end": memory[-1] if memory else None,
+                "samples": self.memory
+            }
+        }
+    # --------------------------------------------------------------------------
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def print_report(report: dict) -> None:
+    config = report["config"]
+    latency = report["latency_ms"]
+    memory = report["server_memory_mb"]
+    print()
+    print(f"Profile {config['profile']} - {config['bots']} bots, {config['walls']} walls, {config['duration']}s")
+    print(f"  Sent:        {report['sent']} stickers ({report['send_throughput']}/s), {report['send_errors']} errors")
+    print(f"  Delivered:   {report['deliveries']} ({report['delivery_throughput']}/s)")
+    print(f"  Dropped:     {report['dropped']} ({report['dropped_ratio'] * 100:.2f}%)")
+    print(f"  Latency ms:  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    if memory["peak"] is not None:
+        print(f"  Server RSS:  start {memory['start']} MB  peak {memory['peak']} MB  end {memory['end']} MB")
+# ------------------------------------------------------------------------------
+
+
+# ------------------------------------------------------------------------------
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Sticker wall load test (localhost only)")
+    parser.add_argument("--bots", type=int, default=2, help="Fake bot connections")
+    parser.add_argument("--walls", type=int, default=5, help="Headless wall clients")
+    parser.add_argument("--profile", choices=("steady", "burst", "spike", "ramp"), default="steady")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds sending stickers")
+    parser.add_argument("--rate", type=float, default=5, help="Stickers per second (all bots)")
+    parser.add_argument("--burst-rate", type=float, default=50, help="Stickers per second during a burst")
+    parser.add_argument("--burst-every", type=float, default=20, help="Seconds between bursts (burst profile)")
+    parser.add_argument("--burst-length", type=float, default=3, help="Seconds of each burst")
+    parser.add_argument("--unique-stickers", type=int, default=50, help="Different stickers sent")
+    parser.add_argument("--sticker-size", type=int, default=512, help="Sticker size in pixels")
+    parser.add_argument("--users", type=int, default=100, help="Different fake Telegram users")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (same seed, same load)")
+    parser.add_argument("--drain", type=float, default=5, help="Seconds to wait for the last messages")
+    parser.add_argument("--connect-per-message", action="store_true", help="New bot connection per sticker (like bot.py)")
+    parser.add_argument("--report-render", action="store_true", help="Walls answer wall_render (fills /api/admin/latency)")
+    parser.add_argument("--url", help="Use a running local server (http://127.0.0.1:8000) instead of starting one")
+    parser.add_argument("--api-key", help="Bot API key of the running server (--url)")
+    parser.add_argument("--server-pid", type=int, help="PID of the running server, for the memory samples (--url)")
+    parser.add_argument("--server-log", help="Write the output of the started server to this file")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    return parser.parse_args()
+# ------------------------------------------------------------------------------
+def main() -> None:
+    args = parse_arguments()
+
+    process = work_directory = None
+    if args.url:
+        if urlparse(args.url).hostname not in LOCAL_HOSTS:
+            print("Refusing to run against a non local server")
+            sys.exit(1)
+        if not args.api_key:
+            print("--api-key is required with --url")
+            sys.exit(1)
+        base_url = args.url.rstrip("/")
+        server_pid = args.server_pid
+    else:
+        port = free_port()
+        args.api_key = uuid.uuid4().hex
+        process, work_directory = start_server(port, args.api_key, args.server_log)
+        base_url = f"http://127.0.0.1:{port}"
+        server_pid = process.pid
+
+    try:
+        wait_for_server(base_url)
+        ws_url = base_url.replace("http://", "ws://", 1).replace("https://", "wss://", 1)
+        report = asyncio.run(LoadTest(args, ws_url, server_pid).run())
+    finally:
+        if process:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+# ------------------------------------------------------------------------------
+
+
+if __name__ == "__main__":
+    main()